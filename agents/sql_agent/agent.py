@@ -12,26 +12,68 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import SequentialAgent
-from .config import DATAPLEX_ENABLED
-from .schema_inspector import create_schema_inspector
+from .config import (
+    BIGQUERY_DATASET,
+    DATAPLEX_ENABLED,
+    SCHEMA_CACHE_ENABLED,
+    SCHEMA_PRUNING_ENABLED,
+    RESULT_STREAMING_ENABLED,
+    RESULT_MAX_ROWS,
+    RESULT_MAX_BYTES,
+    TRACING_ENABLED,
+    TRACE_EXPORTER,
+    TRACE_JSONL_PATH,
+    SINGLE_FLIGHT_ENABLED,
+    SINGLE_FLIGHT_WAIT_SECONDS,
+    SQL_BYTE_BUDGET_ENABLED,
+    SQL_MAX_BYTES_PER_USER,
+)
+from .schema_inspector import create_schema_inspector, create_cached_schema_inspector
+from .schema_pruner import create_schema_pruner
 from .semantic_enricher import create_semantic_enricher
 from .sql_generator_loop import create_sql_generator_loop
-from .final_responder import create_final_responder
+from .final_responder import create_final_responder, result_pager
+from .result_pager import create_continuation_callback
+from .single_flight import SingleFlight, SingleFlightAgent, create_single_flight_callbacks
+from .tracing import create_pipeline_tracer, instrument
+from .lazy import lazy_singletons
+
+question_flights = SingleFlight(max_age=SINGLE_FLIGHT_WAIT_SECONDS)
 
 def create_root_agent():
     sub_agents = [
-        create_schema_inspector(),
+        create_cached_schema_inspector() if SCHEMA_CACHE_ENABLED else create_schema_inspector(),
         create_sql_generator_loop(),
         create_final_responder()
     ]
+    if SCHEMA_PRUNING_ENABLED:
+        sub_agents.insert(1, create_schema_pruner())
     if DATAPLEX_ENABLED:
         sub_agents.insert(0, create_semantic_enricher())
 
-    return SequentialAgent(
+    before_callbacks, after_callbacks = [], []
+    if RESULT_STREAMING_ENABLED:
+        before_callbacks.append(create_continuation_callback(result_pager, RESULT_MAX_ROWS, RESULT_MAX_BYTES))
+    if SINGLE_FLIGHT_ENABLED:
+        join_in_flight, share_result = create_single_flight_callbacks(
+            question_flights, f"{BIGQUERY_DATASET}:dataplex={DATAPLEX_ENABLED}", SINGLE_FLIGHT_WAIT_SECONDS,
+            # A shared run is charged to one user, so users with their own byte budgets don't share runs.
+            per_user=SQL_BYTE_BUDGET_ENABLED and SQL_MAX_BYTES_PER_USER > 0,
+            pager=result_pager if RESULT_STREAMING_ENABLED else None,
+        )
+        before_callbacks.append(join_in_flight)
+        after_callbacks.append(share_result)
+
+    root_agent = SingleFlightAgent(
         name="sql_agent",
         description="An agent that can answer questions about Google Trends data using BigQuery.",
-        sub_agents=sub_agents
+        sub_agents=sub_agents,
+        before_agent_callback=before_callbacks or None,
+        after_agent_callback=after_callbacks or None,
+        flight=question_flights if SINGLE_FLIGHT_ENABLED else None,
     )
+    if TRACING_ENABLED:
+        instrument(root_agent, create_pipeline_tracer(TRACE_EXPORTER, TRACE_JSONL_PATH))
+    return root_agent
 
-root_agent = create_root_agent()
\ No newline at end of file
+__getattr__ = lazy_singletons(__name__, root_agent=create_root_agent)
\ No newline at end of file
@@ -25,3 +25,155 @@ TOOLBOX_URL = f"http://{TOOLBOX_HOST}:{TOOLBOX_PORT}/mcp"
 mcp_connection_params = StreamableHTTPConnectionParams(url=TOOLBOX_URL)
 
 DATAPLEX_ENABLED = os.environ.get("DATAPLEX_ENABLED", "false").lower() == "true"
+
+BIGQUERY_DATASET = os.getenv("BIGQUERY_DATASET", "bigquery-public-data.google_trends")
+
+SCHEMA_CACHE_ENABLED = os.environ.get("SCHEMA_CACHE_ENABLED", "true").lower() == "true"
+SCHEMA_CACHE_DIR = os.getenv("SCHEMA_CACHE_DIR", ".cache/schema")
+SCHEMA_CACHE_SIZE = int(os.getenv("SCHEMA_CACHE_SIZE", "256"))
+
+# "deterministic" dry-runs the SQL in code; "llm" keeps the gemini-2.5-flash validator.
+SQL_VALIDATOR_MODE = os.getenv("SQL_VALIDATOR_MODE", "deterministic").lower()
+
+# "hybrid" accepts successful dry runs in code and only asks the LLM for guidance on failures.
+SQL_REVIEWER_MODE = os.getenv("SQL_REVIEWER_MODE", "hybrid").lower()
+
+SQL_PREVALIDATION_ENABLED = os.environ.get("SQL_PREVALIDATION_ENABLED", "true").lower() == "true"
+
+SQL_CACHE_ENABLED = os.environ.get("SQL_CACHE_ENABLED", "true").lower() == "true"
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "512"))
+SQL_CACHE_SIMILARITY = float(os.getenv("SQL_CACHE_SIMILARITY", "0.85"))
+# "hashed" uses a local hashed n-gram embedding; "genai" uses the Gemini embeddings API.
+SQL_CACHE_EMBEDDINGS = os.getenv("SQL_CACHE_EMBEDDINGS", "hashed").lower()
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", ".cache/results")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_MAX_MEMORY_MB = int(os.getenv("RESULT_CACHE_MAX_MEMORY_MB", "64"))
+RESULT_CACHE_MAX_DISK_MB = int(os.getenv("RESULT_CACHE_MAX_DISK_MB", "512"))
+
+# Registers the generator's static prompt plus schema as Gemini cached content, one per model, static
+# prompt and schema fingerprint, shared across sessions. Prompts under the model's caching minimum
+# (estimated; 1024 tokens for 2.5 Flash, 4096 for 2.5 Pro) are sent uncached, as is everything when
+# caching fails. PROMPT_CACHE_MIN_TOKENS overrides minimums as `model=tokens` pairs (comma-separated).
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+PROMPT_CACHE_MIN_TOKENS = {
+    model.strip(): int(tokens)
+    for model, _, tokens in (pair.partition("=") for pair in os.getenv("PROMPT_CACHE_MIN_TOKENS", "").split(","))
+    if model.strip() and tokens.strip()
+}
+
+# "loop" generates one query per iteration; "parallel" generates SQL_CANDIDATES queries concurrently.
+SQL_GENERATION_MODE = os.getenv("SQL_GENERATION_MODE", "loop").lower()
+SQL_CANDIDATES = int(os.getenv("SQL_CANDIDATES", "3"))
+SQL_CANDIDATE_WINDOW = float(os.getenv("SQL_CANDIDATE_WINDOW", "1.0"))
+
+SQL_LOOP_MAX_ITERATIONS = int(os.getenv("SQL_LOOP_MAX_ITERATIONS", "5"))
+# Ends the SQL loop early on a repeated query or dry-run error, or when the question's deadline or token budget is spent.
+SQL_LOOP_ADAPTIVE_ENABLED = os.environ.get("SQL_LOOP_ADAPTIVE_ENABLED", "true").lower() == "true"
+SQL_LOOP_DEADLINE_SECONDS = float(os.getenv("SQL_LOOP_DEADLINE_SECONDS", "90"))
+# Prompt plus output tokens per question; 0 disables the budget.
+SQL_LOOP_TOKEN_BUDGET = int(os.getenv("SQL_LOOP_TOKEN_BUDGET", "200000"))
+# Tried in order on a repetition before giving up: "widen_schema" and "switch_model" (to SQL_LOOP_FALLBACK_MODEL).
+SQL_LOOP_STRATEGIES = [s.strip() for s in os.getenv("SQL_LOOP_STRATEGIES", "widen_schema,switch_model").split(",") if s.strip()]
+SQL_LOOP_FALLBACK_MODEL = os.getenv("SQL_LOOP_FALLBACK_MODEL", "")
+
+# Fixes mechanical SQL mistakes (table paths, misspelled names, CAST, UNNEST joins) named by a failed
+# validation in code and validates again, up to SQL_REPAIR_MAX_ATTEMPTS times, before asking the LLM.
+SQL_REPAIR_ENABLED = os.environ.get("SQL_REPAIR_ENABLED", "true").lower() == "true"
+SQL_REPAIR_MAX_ATTEMPTS = int(os.getenv("SQL_REPAIR_MAX_ATTEMPTS", "2"))
+# Minimum similarity (0-1) for replacing an unknown table or column name with a known one.
+SQL_REPAIR_NAME_CUTOFF = float(os.getenv("SQL_REPAIR_NAME_CUTOFF", "0.75"))
+
+# How the schema is written into the SQL generator's prompt: "compact" (DDL-like text) or "json" (as inspected).
+SCHEMA_PROMPT_FORMAT = os.getenv("SCHEMA_PROMPT_FORMAT", "compact").lower()
+
+# Sends questions over one table without join or window phrasings to SQL_ROUTER_FAST_MODEL and the rest,
+# or any question after a failed validation, to SQL_ROUTER_STRONG_MODEL.
+SQL_MODEL_ROUTING_ENABLED = os.environ.get("SQL_MODEL_ROUTING_ENABLED", "true").lower() == "true"
+SQL_ROUTER_FAST_MODEL = os.getenv("SQL_ROUTER_FAST_MODEL", "gemini-2.5-flash")
+SQL_ROUTER_STRONG_MODEL = os.getenv("SQL_ROUTER_STRONG_MODEL", "gemini-2.5-pro")
+SQL_ROUTER_MAX_FAST_TABLES = int(os.getenv("SQL_ROUTER_MAX_FAST_TABLES", "1"))
+SQL_ROUTER_MAX_FAST_CUES = int(os.getenv("SQL_ROUTER_MAX_FAST_CUES", "0"))
+# Above this failure rate over recent fast-routed questions, every question takes the strong route.
+SQL_ROUTER_MAX_FAST_FAILURE_RATE = float(os.getenv("SQL_ROUTER_MAX_FAST_FAILURE_RATE", "0.3"))
+
+# Treats SQL whose dry run would scan more than the byte budget as invalid (0 disables a limit).
+SQL_BYTE_BUDGET_ENABLED = os.environ.get("SQL_BYTE_BUDGET_ENABLED", "true").lower() == "true"
+SQL_MAX_BYTES_PER_QUERY = int(os.getenv("SQL_MAX_BYTES_PER_QUERY", str(10 * 1024**3)))
+# Bytes of accepted queries a user may run per SQL_USER_BYTES_WINDOW_SECONDS.
+SQL_MAX_BYTES_PER_USER = int(os.getenv("SQL_MAX_BYTES_PER_USER", "0"))
+SQL_USER_BYTES_WINDOW_SECONDS = float(os.getenv("SQL_USER_BYTES_WINDOW_SECONDS", "86400"))
+
+# Drops tables and columns unrelated to the question before SQL generation.
+SCHEMA_PRUNING_ENABLED = os.environ.get("SCHEMA_PRUNING_ENABLED", "true").lower() == "true"
+# Tables with at most this many columns are never column-pruned.
+SCHEMA_PRUNING_MAX_COLUMNS = int(os.getenv("SCHEMA_PRUNING_MAX_COLUMNS", "12"))
+# "lexical" scores by token overlap only; "hashed" adds the local hashed n-gram embedding.
+SCHEMA_PRUNING_SCORING = os.getenv("SCHEMA_PRUNING_SCORING", "lexical").lower()
+
+# Executes the final SQL in code, streams capped result pages and gives the LLM only a sample.
+RESULT_STREAMING_ENABLED = os.environ.get("RESULT_STREAMING_ENABLED", "true").lower() == "true"
+RESULT_PAGE_ROWS = int(os.getenv("RESULT_PAGE_ROWS", "50"))
+RESULT_MAX_ROWS = int(os.getenv("RESULT_MAX_ROWS", "200"))
+RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", "65536"))
+RESULT_SAMPLE_ROWS = int(os.getenv("RESULT_SAMPLE_ROWS", "20"))
+# Default rendering of result rows ("markdown", "csv" or "json"); `result_format` in state overrides it.
+RESULT_FORMAT = os.getenv("RESULT_FORMAT", "markdown").lower()
+# Adds a short LLM summary after the table; `result_narrative` in state overrides it.
+RESULT_NARRATIVE = os.environ.get("RESULT_NARRATIVE", "true").lower() == "true"
+
+# Shares a pool of MCP sessions to the toolbox across all stages and requests.
+MCP_POOL_ENABLED = os.environ.get("MCP_POOL_ENABLED", "true").lower() == "true"
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("MCP_POOL_HEALTH_CHECK_SECONDS", "30"))
+# Tool calls in flight per toolbox server across all pooled sessions (0 for no limit).
+MCP_MAX_CONCURRENT_CALLS = int(os.getenv("MCP_MAX_CONCURRENT_CALLS", "16"))
+# Read-only tools whose concurrent calls with identical arguments share one call (comma-separated).
+MCP_COALESCED_TOOLS = [t.strip() for t in os.getenv(
+    "MCP_COALESCED_TOOLS", "list_tables,get_table_info,search_entries,lookup_entry"
+).split(",") if t.strip()]
+
+# Identical questions (normalized, same configuration and result format) asked while one is being
+# answered wait for that run, up to SINGLE_FLIGHT_WAIT_SECONDS, and share its answer.
+SINGLE_FLIGHT_ENABLED = os.environ.get("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "180"))
+
+# Records spans per agent, LLM call and MCP tool call, and writes `timing_summary` to session state.
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() == "true"
+# Where finished spans go: "none", "jsonl" (TRACE_JSONL_PATH), "otel" (the configured OpenTelemetry provider) or "both".
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", ".cache/traces.jsonl")
+
+# "code" searches and looks up Dataplex entries concurrently without an LLM; "index" answers from the
+# local Dataplex index first and falls back to "code" on a miss; "llm" keeps the gemini-2.5-pro searcher.
+SEMANTIC_ENRICHER_MODE = os.getenv("SEMANTIC_ENRICHER_MODE", "code").lower()
+DATAPLEX_SEARCH_PAGE_SIZE = int(os.getenv("DATAPLEX_SEARCH_PAGE_SIZE", "10"))
+DATAPLEX_LOOKUP_CONCURRENCY = int(os.getenv("DATAPLEX_LOOKUP_CONCURRENCY", "8"))
+# Comma-separated aspect type names; when set, lookups fetch only these aspects.
+DATAPLEX_ASPECT_TYPES = [t.strip() for t in os.getenv("DATAPLEX_ASPECT_TYPES", "").split(",") if t.strip()]
+DATAPLEX_SUMMARY_ENABLED = os.environ.get("DATAPLEX_SUMMARY_ENABLED", "false").lower() == "true"
+# SQLite snapshot of Dataplex entries built by `poe sync-dataplex`, used by the "index" enricher mode.
+DATAPLEX_INDEX_PATH = os.getenv("DATAPLEX_INDEX_PATH", ".cache/dataplex_index.sqlite")
+DATAPLEX_INDEX_LIMIT = int(os.getenv("DATAPLEX_INDEX_LIMIT", "5"))
+DATAPLEX_INDEX_SIMILARITY = float(os.getenv("DATAPLEX_INDEX_SIMILARITY", "0.3"))
+
+# "glossary" matches the question against known business terms and column names and
+# only calls the LLM when nothing matches; "llm" always uses the gemini-2.5-flash extractor.
+TERM_EXTRACTOR_MODE = os.getenv("TERM_EXTRACTOR_MODE", "glossary").lower()
+# Optional JSON file with extra glossary terms and synonyms: {"terms": [...], "synonyms": {"term": [...]}}.
+TERM_GLOSSARY_PATH = os.getenv("TERM_GLOSSARY_PATH", "")
+TERM_FUZZY_CUTOFF = float(os.getenv("TERM_FUZZY_CUTOFF", "0.85"))
+
+# HTTP serving entry point (`poe serve`): requests share one event loop, at most
+# SERVE_MAX_CONCURRENT_REQUESTS at a time. Up to SERVE_MAX_QUEUED_REQUESTS more wait for a slot
+# (for at most SERVE_QUEUE_TIMEOUT_SECONDS); beyond that requests are rejected with 429.
+SERVE_MAX_CONCURRENT_REQUESTS = int(os.getenv("SERVE_MAX_CONCURRENT_REQUESTS", "32"))
+SERVE_MAX_QUEUED_REQUESTS = int(os.getenv("SERVE_MAX_QUEUED_REQUESTS", "64"))
+SERVE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SERVE_QUEUE_TIMEOUT_SECONDS", "30"))
+SERVE_REQUEST_TIMEOUT_SECONDS = float(os.getenv("SERVE_REQUEST_TIMEOUT_SECONDS", "300"))
+# Gemini calls in flight across all requests (0 for no limit).
+SERVE_MAX_CONCURRENT_LLM_CALLS = int(os.getenv("SERVE_MAX_CONCURRENT_LLM_CALLS", "16"))
+# On shutdown, in-flight requests get this long to finish; new ones are refused with 503.
+SERVE_DRAIN_SECONDS = float(os.getenv("SERVE_DRAIN_SECONDS", "30"))
@@ -0,0 +1,172 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from collections import deque
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from .mcp_tools import parse_json_text, strip_code_fence
+
+BUDGET_EXCEEDED = "budget exceeded"
+_LAYOUT_KEYS = (
+    "TimePartitioning", "timePartitioning", "RangePartitioning", "rangePartitioning", "Clustering", "clustering"
+)
+
+
+def format_bytes(num_bytes):
+    value = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if value < 1024 or unit == "TiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def partition_columns(table_schema):
+    """Partitioning columns of a `get_table_info` result; `_PARTITIONTIME` for ingestion-time tables."""
+    if not isinstance(table_schema, dict):
+        return []
+    columns = []
+    for key in ("TimePartitioning", "timePartitioning", "RangePartitioning", "rangePartitioning"):
+        partitioning = table_schema.get(key)
+        if isinstance(partitioning, dict):
+            columns.append(partitioning.get("Field") or partitioning.get("field") or "_PARTITIONTIME")
+    return columns
+
+
+def cluster_columns(table_schema):
+    """Clustering columns of a `get_table_info` result."""
+    if not isinstance(table_schema, dict):
+        return []
+    clustering = table_schema.get("Clustering") or table_schema.get("clustering")
+    if not isinstance(clustering, dict):
+        return []
+    return list(clustering.get("Fields") or clustering.get("fields") or [])
+
+
+def table_layout(table_info):
+    """The partitioning and clustering specs of a `get_table_info` result, for `table_layouts`."""
+    if not isinstance(table_info, dict):
+        return {}
+    return {key: table_info[key] for key in _LAYOUT_KEYS if table_info.get(key)}
+
+
+def _table_name(ref):
+    return str(ref).strip("`").replace("/", ".").split(".")[-1].lower()
+
+
+def cost_guidance(sql, schema, layouts=None):
+    """
+    Says what makes `sql` expensive: partitioned tables read without a filter
+    on their partition column, clustered tables read without a filter on any
+    cluster column, and `SELECT *`. Partitioning and clustering come from
+    `layouts` (`table_layouts` state, taken from `get_table_info`) and
+    otherwise from `schema`. Falls back to general advice when nothing
+    applies or the SQL can't be parsed.
+    """
+    parsed = parse_json_text(schema) if isinstance(schema, str) else schema
+    tables = {
+        _table_name(ref): table_schema
+        for ref, table_schema in (parsed.items() if isinstance(parsed, dict) else [])
+    }
+    tables.update((_table_name(ref), layout) for ref, layout in (layouts or {}).items() if layout)
+    try:
+        expression = sqlglot.parse_one(strip_code_fence(sql), dialect="bigquery")
+    except SqlglotError:
+        expression = None
+
+    advice = []
+    if expression is not None:
+        filtered = {
+            column.name.lower()
+            for condition in [*expression.find_all(exp.Where), *expression.find_all(exp.Join)]
+            for column in condition.find_all(exp.Column)
+        }
+        for table in expression.find_all(exp.Table):
+            table_schema = tables.get(table.name.lower())
+            for column in partition_columns(table_schema):
+                if column.lower() not in filtered:
+                    advice.append(
+                        f"Add a WHERE filter with literal bounds on the partition column `{column}`"
+                        f" of `{table.name}`, so only the partitions the question needs are scanned."
+                    )
+            clustered = cluster_columns(table_schema)
+            if clustered and not any(column.lower() in filtered for column in clustered):
+                advice.append(
+                    f"Filter `{table.name}` on its cluster column"
+                    f" {', '.join(f'`{column}`' for column in clustered)} where the question allows,"
+                    " so fewer blocks are read."
+                )
+        if any(
+            isinstance(projection, exp.Star) or isinstance(projection.this, exp.Star)
+            for select in expression.find_all(exp.Select)
+            for projection in select.expressions
+        ):
+            advice.append("Select only the columns the question needs instead of `SELECT *`.")
+    if not advice:
+        advice.append(
+            "Read fewer columns and a narrower range of rows: filter on partition or"
+            " cluster columns and drop columns the answer doesn't use."
+        )
+    return " ".join(dict.fromkeys(advice))
+
+
+class ByteBudget:
+    """
+    Byte limits checked against dry-run estimates: `max_query_bytes` per
+    query, and `max_user_bytes` per user over a rolling `window_seconds`
+    (counting the queries `charge` has recorded). A limit of 0 is off.
+    """
+
+    def __init__(self, max_query_bytes=0, max_user_bytes=0, window_seconds=86400):
+        self.max_query_bytes = max_query_bytes
+        self.max_user_bytes = max_user_bytes
+        self.window_seconds = window_seconds
+        self._charges = {}
+        self._lock = threading.Lock()
+
+    def spent(self, user_id):
+        with self._lock:
+            charges = self._charges.get(user_id)
+            if not charges:
+                return 0
+            cutoff = time.time() - self.window_seconds
+            while charges and charges[0][0] < cutoff:
+                charges.popleft()
+            return sum(num_bytes for _, num_bytes in charges)
+
+    def charge(self, user_id, num_bytes):
+        if self.max_user_bytes and num_bytes:
+            with self._lock:
+                self._charges.setdefault(user_id, deque()).append((time.time(), num_bytes))
+
+    def check(self, num_bytes, user_id=None):
+        """The reason `num_bytes` is over budget, or None (also when the estimate is unknown)."""
+        if num_bytes is None:
+            return None
+        if self.max_query_bytes and num_bytes > self.max_query_bytes:
+            return (
+                f"The query would process {format_bytes(num_bytes)}, over the"
+                f" {format_bytes(self.max_query_bytes)} per-query budget."
+            )
+        if self.max_user_bytes:
+            remaining = self.max_user_bytes - self.spent(user_id)
+            if num_bytes > remaining:
+                return (
+                    f"The query would process {format_bytes(num_bytes)}, but only"
+                    f" {format_bytes(max(remaining, 0))} of this user's"
+                    f" {format_bytes(self.max_user_bytes)} budget is left."
+                )
+        return None
@@ -0,0 +1,174 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from .dataplex_metadata import describe_entry, field_value, table_entries, table_ref
+from .sql_cache import hashed_embedding
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT PRIMARY KEY,
+    table_ref TEXT NOT NULL,
+    update_time TEXT,
+    description TEXT,
+    columns_json TEXT,
+    rules_json TEXT,
+    embedding BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    name UNINDEXED, body, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _fts_query(terms):
+    tokens = {token for term in terms for token in re.findall(r"\w+", term.lower())}
+    return " OR ".join(f'"{token}"' for token in sorted(tokens))
+
+
+def _document(ref, description, columns, rules):
+    words = [ref.replace(".", " ").replace("_", " "), description]
+    for column, text in list(columns.items()) + list(rules.items()):
+        words += [column, column.replace("_", " "), text]
+    return " ".join(words)
+
+
+class DataplexIndex:
+    """
+    A local SQLite snapshot of Dataplex table entries and their aspects, with
+    an FTS5 index over table names, column names, business terms and rules
+    and a matrix of hashed embeddings for fuzzy matches. `search` returns the
+    same (description, columns, rules) triples the live enricher builds.
+    """
+
+    def __init__(self, path, embed=hashed_embedding):
+        self.path = path
+        self.embed = embed
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._matrix = None
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def update_time(self, name):
+        row = self._conn.execute("SELECT update_time FROM entries WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, entry):
+        """Adds or replaces one looked-up entry; returns False for non-table entries."""
+        name = field_value(entry, "name")
+        if not name or not table_entries([entry]):
+            return False
+        ref = table_ref(entry)
+        description, columns, rules = describe_entry(entry)
+        document = _document(ref, description, columns, rules)
+        embedding = np.asarray(self.embed(document), dtype=np.float32).tobytes()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, ref, str(field_value(entry, "updateTime", "update_time") or ""),
+                 description, json.dumps(columns), json.dumps(rules), embedding),
+            )
+            self._conn.execute("DELETE FROM entries_fts WHERE name = ?", (name,))
+            self._conn.execute("INSERT INTO entries_fts VALUES (?, ?)", (name, document))
+        self._matrix = None
+        return True
+
+    def _embeddings(self):
+        if self._matrix is None:
+            rows = self._conn.execute("SELECT name, embedding FROM entries").fetchall()
+            names = [name for name, _ in rows]
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in rows]
+            self._matrix = (names, np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32))
+        return self._matrix
+
+    def search(self, terms, limit=5, min_similarity=0.3):
+        """
+        Full-text matches for any of `terms`, best first; when nothing
+        matches, the nearest entries by embedding similarity above
+        `min_similarity`. Returns {table ref: (description, columns, rules)}.
+        """
+        query = _fts_query(terms)
+        names = []
+        if query:
+            names = [row[0] for row in self._conn.execute(
+                "SELECT name FROM entries_fts WHERE entries_fts MATCH ? ORDER BY bm25(entries_fts) LIMIT ?",
+                (query, limit),
+            )]
+        if not names and terms:
+            all_names, matrix = self._embeddings()
+            if len(all_names):
+                scores = matrix @ np.asarray(self.embed(" ".join(terms)), dtype=np.float32)
+                order = np.argsort(-scores)[:limit]
+                names = [all_names[i] for i in order if scores[i] >= min_similarity]
+
+        tables = {}
+        for name in names:
+            ref, description, columns, rules = self._conn.execute(
+                "SELECT table_ref, description, columns_json, rules_json FROM entries WHERE name = ?", (name,)
+            ).fetchone()
+            tables[ref] = (description, json.loads(columns), json.loads(rules))
+        return tables
+
+    def glossary_terms(self):
+        """Column names and their business terms or descriptions across all entries."""
+        terms = []
+        for (columns,) in self._conn.execute("SELECT columns_json FROM entries"):
+            for column, text in json.loads(columns).items():
+                terms += [column, text]
+        return list(dict.fromkeys(term for term in terms if term))
+
+    def get_state(self, key):
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, value))
+
+
+def sync_index(index, search, lookup, query="system=bigquery type=table", now=None):
+    """
+    Incrementally refreshes `index`. `search(query)` returns search results
+    and `lookup(name)` a full entry, both as dicts (from the Dataplex client or
+    the MCP toolbox). Only entries updated since the last sync are searched
+    for, and entries whose update time hasn't changed are not looked up again.
+    Returns the number of entries written.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    last_sync = index.get_state("last_sync")
+    if last_sync:
+        # Dataplex filters update time by date, so re-read the last day and skip unchanged entries.
+        query = f"{query} updatetime>={last_sync[:10]}"
+
+    written = 0
+    for name, entry in table_entries(search(query)).items():
+        update_time = str(field_value(entry, "updateTime", "update_time") or "")
+        if update_time and update_time == index.update_time(name):
+            continue
+        if index.upsert(lookup(name)):
+            written += 1
+    index.set_state("last_sync", now.isoformat())
+    return written
@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .mcp_tools import parse_json_text
+
+
+def field_value(data, *keys):
+    """Reads a field that the toolbox may return in camelCase or snake_case."""
+    for key in keys:
+        if isinstance(data, dict) and data.get(key) is not None:
+            return data[key]
+    return None
+
+
+def parse_terms(extracted_terms):
+    """The term extractor's output as a list of strings."""
+    terms = extracted_terms
+    if isinstance(terms, str):
+        parsed = parse_json_text(terms)
+        terms = parsed if parsed is not None else terms.split(",")
+    if not isinstance(terms, list):
+        return []
+    return list(dict.fromkeys(str(term).strip() for term in terms if str(term).strip()))
+
+
+def table_entries(search_results):
+    """BigQuery table entries from `search_entries` results, as {entry name: entry}."""
+    parsed = parse_json_text(search_results) if isinstance(search_results, str) else search_results
+    if isinstance(parsed, dict):
+        parsed = field_value(parsed, "results", "entries") or []
+    entries = {}
+    for result in parsed or []:
+        entry = field_value(result, "dataplexEntry", "dataplex_entry") or result
+        name = field_value(entry, "name")
+        fqn = field_value(entry, "fullyQualifiedName", "fully_qualified_name") or ""
+        if name and fqn.startswith("bigquery:") and fqn.count(".") == 2:
+            entries.setdefault(name, entry)
+    return entries
+
+
+def table_ref(entry):
+    return field_value(entry, "fullyQualifiedName", "fully_qualified_name").removeprefix("bigquery:")
+
+
+def entry_parent(entry_name):
+    """`projects/{p}/locations/{l}` for an entry name."""
+    return "/".join(entry_name.split("/")[:4])
+
+
+def describe_entry(entry):
+    """
+    Extracts (table description, column descriptions, business rules) from a
+    looked-up entry's aspects. Column aspects are attached at
+    `schema.fields.<column>`; the system schema aspect carries column descriptions.
+    """
+    source = field_value(entry, "entrySource", "entry_source") or {}
+    table_description = field_value(source, "description") or ""
+    columns, rules = {}, {}
+    for aspect in (field_value(entry, "aspects") or {}).values():
+        data = field_value(aspect, "data") or {}
+        path = field_value(aspect, "path") or ""
+        for field in field_value(data, "fields") or []:
+            if field_value(field, "description"):
+                columns.setdefault(field_value(field, "name"), field_value(field, "description"))
+        if not path.startswith("schema.fields."):
+            continue
+        column = path.removeprefix("schema.fields.")
+        if field_value(data, "business_term", "businessTerm"):
+            columns[column] = field_value(data, "business_term", "businessTerm")
+        rule = field_value(data, "rule_description", "ruleDescription")
+        if rule:
+            formula = field_value(data, "rule_formula", "ruleFormula")
+            rules[column] = f"{rule} Formula: `{column} {formula}`." if formula else rule
+    return table_description, columns, rules
+
+
+def build_semantic_context(tables):
+    """Renders {table ref: (description, columns, rules)} as the Markdown `semantic_context`."""
+    sections = {"## Relevant Tables": [], "## Column Descriptions": [], "## Business Rules": []}
+    for table_ref, (description, columns, rules) in tables.items():
+        sections["## Relevant Tables"].append(
+            f"- `{table_ref}`" + (f": {description}" if description else "")
+        )
+        table_id = table_ref.split(".")[-1]
+        sections["## Column Descriptions"] += [
+            f"- `{column}`: {text} (table `{table_id}`)" for column, text in columns.items()
+        ]
+        sections["## Business Rules"] += [
+            f"- `{column}`: {text} (table `{table_id}`)" for column, text in rules.items()
+        ]
+    return "\n\n".join(
+        "\n".join([heading] + (lines or ["- None found."])) for heading, lines in sections.items()
+    )
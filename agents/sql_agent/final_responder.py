@@ -12,15 +12,198 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from .config import mcp_connection_params
+import json
+from typing import Any, AsyncGenerator, Optional
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools.tool_context import ToolContext
+from google.genai.types import Content, Part
+from .config import (
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_MAX_MEMORY_MB,
+    RESULT_CACHE_MAX_DISK_MB,
+    RESULT_STREAMING_ENABLED,
+    RESULT_PAGE_ROWS,
+    RESULT_MAX_ROWS,
+    RESULT_MAX_BYTES,
+    RESULT_SAMPLE_ROWS,
+    RESULT_FORMAT,
+    RESULT_NARRATIVE,
+)
+from .mcp_pool import create_mcp_toolset
+from .mcp_tools import McpToolError, run_mcp_tool, strip_code_fence, tool_result_text
+from .result_cache import ResultCache, create_result_cache_callbacks
+from .result_renderer import RESULT_FORMATS, infer_column_types, requested_format
+from .sql_cache import user_question
+from .result_pager import (
+    ResultPager, continuation_note, page_texts, parse_rows, summarize_rows, take_rows
+)
+from .lazy import lazy_singletons
+
+result_cache = ResultCache(
+    cache_dir=RESULT_CACHE_DIR,
+    ttl_seconds=RESULT_CACHE_TTL,
+    max_memory_bytes=RESULT_CACHE_MAX_MEMORY_MB << 20,
+    max_disk_bytes=RESULT_CACHE_MAX_DISK_MB << 20,
+)
+result_pager = ResultPager()
+
+NARRATIVE_INSTRUCTION = """
+You are the Final Responder.
+The validated SQL has already been executed and its first rows have been shown
+to the user as tables. Do not repeat the table.
+If `valid_sql` is empty, tell the user that a valid query could not be produced
+and, if `loop_termination` is set, why the attempts stopped.
+If `result_error` is set, explain that the query failed to run.
+Otherwise, answer the user's question in at most three sentences using the sample rows
+and the summary statistics, which cover every row the query returned.
+
+`result_question`: {result_question?}
+`valid_sql`: {valid_sql?}
+`loop_termination`: {loop_termination?}
+`result_error`: {result_error?}
+`result_sample`: {result_sample?}
+`result_summary`: {result_summary?}
+"""
+
+
+class StreamingResponder(BaseAgent):
+    """
+    Executes `valid_sql` in code and streams the rows to the user as rendered
+    pages, up to `max_rows`/`max_bytes`; the rest are held behind a
+    continuation token. Only `sample_rows` rows and per-column summary stats
+    are handed to the narrative LLM (its single sub-agent), which is skipped
+    entirely when the narrative is turned off.
+
+    The format and narrative can be chosen per request with the `result_format`
+    and `result_narrative` state keys, or a hint like "as CSV" in the question.
+    """
+
+    toolset: Any
+    pager: Any
+    page_rows: int = 50
+    max_rows: int = 200
+    max_bytes: int = 65536
+    sample_rows: int = 20
+    result_format: str = "markdown"
+    narrative: bool = True
+    before_tool_callback: Optional[Any] = None
+    after_tool_callback: Optional[Any] = None
+
+    def _event(self, ctx, text=None, state_delta=None):
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=Content(role="model", parts=[Part(text=text)]) if text else None,
+            actions=EventActions(state_delta=state_delta or {}),
+        )
+
+    def _options(self, ctx):
+        state = ctx.session.state
+        result_format = state.get("result_format") or requested_format(user_question(ctx))
+        if result_format not in RESULT_FORMATS:
+            result_format = self.result_format
+        narrative = state.get("result_narrative")
+        return result_format, self.narrative if narrative is None else bool(narrative)
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        result_format, narrative = self._options(ctx)
+        sql = strip_code_fence(ctx.session.state.get("valid_sql"))
+        state_delta = {
+            "result_error": None, "result_sample": None, "result_summary": None, "result_page": None
+        }
+        if not sql and not narrative:
+            reason = ctx.session.state.get("loop_termination")
+            yield self._event(ctx, "A valid SQL query could not be produced for this question" + (
+                f" (stopped: {reason.replace('_', ' ')})." if reason else "."
+            ))
+        if sql:
+            tool_context = ToolContext(ctx)
+            try:
+                result = await run_mcp_tool(
+                    self.toolset, tool_context, "execute_sql", {"sql": sql, "dry_run": False},
+                    self.before_tool_callback, self.after_tool_callback
+                )
+                text = tool_result_text(result)
+            except McpToolError as e:
+                text, state_delta["result_error"] = None, str(e)
+                if not narrative:
+                    yield self._event(ctx, f"The query failed to run: {e}")
+            state_delta.update(tool_context.actions.state_delta)
+
+            rows = parse_rows(text) if text else None
+            if text == "" or rows == []:
+                yield self._event(ctx, "The query returned no rows.")
+            elif text is not None and rows is None:
+                # Not row data (e.g. a DML summary): hand over a bounded prefix instead.
+                state_delta["result_sample"] = text[:self.max_bytes]
+                if not narrative:
+                    yield self._event(ctx, f"```\n{text[:self.max_bytes]}\n```")
+            elif rows:
+                column_types = infer_column_types(rows)
+                delivered, remaining = take_rows(rows, self.max_rows, self.max_bytes)
+                for page in page_texts(delivered, 0, len(rows), self.page_rows, result_format, column_types):
+                    yield self._event(ctx, page)
+                token = self.pager.put(
+                    remaining, len(delivered), result_format, column_types
+                ) if remaining else None
+                if token:
+                    yield self._event(ctx, continuation_note(len(delivered), len(rows), token))
+                state_delta.update(
+                    result_sample=json.dumps(rows[:self.sample_rows], default=str),
+                    result_summary=json.dumps(summarize_rows(rows), default=str),
+                    result_page={
+                        "rows_total": len(rows), "rows_shown": len(delivered),
+                        "continuation_token": token, "format": result_format,
+                    },
+                )
+
+        state_delta["result_question"] = user_question(ctx)
+        yield self._event(ctx, state_delta=state_delta)
+        if narrative:
+            async for event in self.sub_agents[0].run_async(ctx):
+                yield event
+
 
 def create_final_responder():
-    sql_tools = McpToolset(
-        connection_params=mcp_connection_params,
-        tool_filter=['execute_sql']
-    )
+    sql_tools = create_mcp_toolset(['execute_sql'])
+
+    before_tool_callback, after_tool_callback = None, None
+    if RESULT_CACHE_ENABLED:
+        table_info_tools = create_mcp_toolset(['get_table_info'])
+        before_tool_callback, after_tool_callback = create_result_cache_callbacks(
+            result_cache, table_info_tools
+        )
+
+    if RESULT_STREAMING_ENABLED:
+        narrator = LlmAgent(
+            model="gemini-2.5-pro",
+            name="final_responder_llm",
+            description="Summarizes query results for the user.",
+            instruction=NARRATIVE_INSTRUCTION,
+            include_contents="none"
+        )
+        return StreamingResponder(
+            name="final_responder",
+            description="Executes the final SQL and responds to the user.",
+            toolset=sql_tools,
+            pager=result_pager,
+            page_rows=RESULT_PAGE_ROWS,
+            max_rows=RESULT_MAX_ROWS,
+            max_bytes=RESULT_MAX_BYTES,
+            sample_rows=RESULT_SAMPLE_ROWS,
+            result_format=RESULT_FORMAT,
+            narrative=RESULT_NARRATIVE,
+            before_tool_callback=before_tool_callback,
+            after_tool_callback=after_tool_callback,
+            sub_agents=[narrator]
+        )
 
     return LlmAgent(
         model="gemini-2.5-pro",
@@ -33,7 +216,9 @@ Execute the SQL using the `execute_sql` tool with `dry_run=False`.
 Format the results in a clear, human-readable way.
 Present the formatted results to the user as your final answer.
 """,
-        tools=[sql_tools]
+        tools=[sql_tools],
+        before_tool_callback=before_tool_callback,
+        after_tool_callback=after_tool_callback
     )
 
-final_responder = create_final_responder()
\ No newline at end of file
+__getattr__ = lazy_singletons(__name__, final_responder=create_final_responder)
\ No newline at end of file
@@ -0,0 +1,33 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+
+def lazy_singletons(module_name, **factories):
+    """
+    Returns a module-level `__getattr__` that builds each named singleton on
+    first access and stores it on the module, so it is built once per import
+    of the module (and so once per configuration, since config is read at import).
+    """
+    module = sys.modules[module_name]
+
+    def __getattr__(name):
+        if name not in factories:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        value = factories[name]()
+        setattr(module, name, value)
+        return value
+
+    return __getattr__
@@ -0,0 +1,224 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from mcp import ClientSession
+from google.adk.tools.mcp_tool.mcp_session_manager import MCPSessionManager, StdioConnectionParams
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from .config import (
+    mcp_connection_params,
+    MCP_POOL_ENABLED,
+    MCP_POOL_SIZE,
+    MCP_POOL_HEALTH_CHECK_SECONDS,
+    MCP_MAX_CONCURRENT_CALLS,
+    MCP_COALESCED_TOOLS,
+)
+from .single_flight import SingleFlight, call_key
+
+logger = logging.getLogger(__name__)
+
+
+class McpSessionPool(MCPSessionManager):
+    """
+    A process-wide replacement for each toolset's own MCPSessionManager.
+    Keeps up to `size` initialised sessions per header set alive and hands
+    them out round-robin, so stages and concurrent requests share handshakes.
+    Sessions idle for longer than `health_check_seconds` are pinged before
+    reuse, and closed or unresponsive sessions are replaced. At most
+    `max_concurrent_calls` tool calls (0 for no limit) run at once across
+    all of the pool's sessions; further calls wait for a free slot.
+    Concurrent calls to one of `coalesced_tools` with identical arguments
+    share a single call.
+    """
+
+    def __init__(self, connection_params, size=2, health_check_seconds=30.0, ping_timeout=5.0,
+                 max_concurrent_calls=0, coalesced_tools=()):
+        super().__init__(connection_params=connection_params)
+        self.size = size
+        self.health_check_seconds = health_check_seconds
+        self.ping_timeout = ping_timeout
+        self._call_slots = asyncio.Semaphore(max_concurrent_calls) if max_concurrent_calls else None
+        self.coalesced_tools = set(coalesced_tools)
+        self._flights = SingleFlight()
+        self._pool = {}
+        self._next = {}
+        self.stats = {
+            "handshakes": 0,
+            "handshake_seconds_total": 0.0,
+            "handshake_seconds_last": 0.0,
+            "reuses": 0,
+            "reconnects": 0,
+            "health_check_failures": 0,
+            "calls_in_flight": 0,
+            "calls_waited": 0,
+        }
+
+    def _wrap_calls(self, session):
+        call_tool = session.call_tool
+
+        async def limited_call_tool(name, arguments=None, **kwargs):
+            if self._call_slots is None:
+                return await call_tool(name, arguments, **kwargs)
+            if self._call_slots.locked():
+                self.stats["calls_waited"] += 1
+            async with self._call_slots:
+                self.stats["calls_in_flight"] += 1
+                try:
+                    return await call_tool(name, arguments, **kwargs)
+                finally:
+                    self.stats["calls_in_flight"] -= 1
+
+        async def pooled_call_tool(name, arguments=None, **kwargs):
+            if name not in self.coalesced_tools:
+                return await limited_call_tool(name, arguments, **kwargs)
+            return await self._flights.do(
+                call_key(name, arguments), lambda: limited_call_tool(name, arguments, **kwargs)
+            )
+
+        session.call_tool = pooled_call_tool
+        return session
+
+    async def _connect(self, merged_headers):
+        exit_stack = AsyncExitStack()
+        try:
+            transports = await exit_stack.enter_async_context(self._create_client(merged_headers))
+            if isinstance(self._connection_params, StdioConnectionParams):
+                session = ClientSession(
+                    *transports[:2],
+                    read_timeout_seconds=timedelta(seconds=self._connection_params.timeout),
+                )
+            else:
+                session = ClientSession(*transports[:2])
+            session = await exit_stack.enter_async_context(session)
+            await session.initialize()
+        except Exception:
+            await exit_stack.aclose()
+            raise
+        if self._call_slots is not None or self.coalesced_tools:
+            session = self._wrap_calls(session)
+        return session, exit_stack
+
+    async def _close_entry(self, entry):
+        try:
+            await entry["exit_stack"].aclose()
+        except Exception as e:
+            logger.warning("Error closing pooled MCP session: %s", e)
+
+    async def _is_healthy(self, entry):
+        if self._is_session_disconnected(entry["session"]):
+            return False
+        if time.monotonic() - entry["checked_at"] < self.health_check_seconds:
+            return True
+        try:
+            await asyncio.wait_for(entry["session"].send_ping(), self.ping_timeout)
+        except Exception:
+            self.stats["health_check_failures"] += 1
+            return False
+        entry["checked_at"] = time.monotonic()
+        return True
+
+    async def _new_entry(self, merged_headers):
+        started = time.perf_counter()
+        session, exit_stack = await self._connect(merged_headers)
+        elapsed = time.perf_counter() - started
+        self.stats["handshakes"] += 1
+        self.stats["handshake_seconds_total"] += elapsed
+        self.stats["handshake_seconds_last"] = elapsed
+        logger.debug("MCP handshake took %.3fs", elapsed)
+        return {"session": session, "exit_stack": exit_stack, "checked_at": time.monotonic()}
+
+    async def create_session(self, headers=None):
+        merged_headers = self._merge_headers(headers)
+        key = self._generate_session_key(merged_headers)
+        async with self._session_lock:
+            entries = self._pool.setdefault(key, [])
+            if len(entries) < self.size:
+                entries.append(await self._new_entry(merged_headers))
+                return entries[-1]["session"]
+
+            index = self._next.get(key, 0) % len(entries)
+            self._next[key] = index + 1
+            entry = entries[index]
+            if not await self._is_healthy(entry):
+                await self._close_entry(entry)
+                entries[index] = await self._new_entry(merged_headers)
+                self.stats["reconnects"] += 1
+                return entries[index]["session"]
+            self.stats["reuses"] += 1
+            return entry["session"]
+
+    def metrics(self):
+        handshakes = self.stats["handshakes"]
+        return {
+            **self.stats,
+            "pool_size": sum(len(entries) for entries in self._pool.values()),
+            "calls_coalesced": self._flights.stats["coalesced"],
+            "handshake_seconds_avg": self.stats["handshake_seconds_total"] / handshakes if handshakes else 0.0,
+        }
+
+    async def close(self):
+        async with self._session_lock:
+            for entries in self._pool.values():
+                for entry in entries:
+                    await self._close_entry(entry)
+            self._pool.clear()
+
+
+class PooledMcpToolset(McpToolset):
+    """An McpToolset whose sessions come from a shared McpSessionPool."""
+
+    def __init__(self, *, pool, tool_filter=None):
+        super().__init__(connection_params=pool._connection_params, tool_filter=tool_filter)
+        self._mcp_session_manager = pool
+
+    async def close(self):
+        # The pool outlives any single toolset; see close_mcp_pools().
+        return None
+
+
+_pools = {}
+
+
+def get_mcp_pool(connection_params=mcp_connection_params):
+    """Returns the process-wide pool for `connection_params`' server."""
+    key = getattr(connection_params, "url", None) or repr(connection_params)
+    if key not in _pools:
+        _pools[key] = McpSessionPool(
+            connection_params,
+            size=MCP_POOL_SIZE,
+            health_check_seconds=MCP_POOL_HEALTH_CHECK_SECONDS,
+            max_concurrent_calls=MCP_MAX_CONCURRENT_CALLS,
+            coalesced_tools=MCP_COALESCED_TOOLS,
+        )
+    return _pools[key]
+
+
+def create_mcp_toolset(tool_filter=None, connection_params=mcp_connection_params):
+    if not MCP_POOL_ENABLED:
+        return McpToolset(connection_params=connection_params, tool_filter=tool_filter)
+    return PooledMcpToolset(pool=get_mcp_pool(connection_params), tool_filter=tool_filter)
+
+
+def mcp_pool_metrics():
+    return {url: pool.metrics() for url, pool in _pools.items()}
+
+
+async def close_mcp_pools():
+    for pool in list(_pools.values()):
+        await pool.close()
+    _pools.clear()
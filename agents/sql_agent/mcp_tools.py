@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import inspect
+import json
+import re
+from google.adk.tools.tool_context import ToolContext
+from .tracing import end_tool_span, start_tool_span
+
+_FENCE_RE = re.compile(r"```(?:\w+)?\s*\n?(.*?)```", re.DOTALL)
+
+
+class McpToolError(Exception):
+    """Raised when an MCP tool call returns an error result."""
+
+
+async def run_mcp_tool(toolset, tool_context, tool_name, args, before_tool_callback=None, after_tool_callback=None):
+    """
+    Runs a toolbox tool and returns its raw result, applying ADK-style
+    before/after tool callbacks (sync or async) as an LlmAgent would.
+    """
+    tools = {tool.name: tool for tool in await toolset.get_tools()}
+    if tool_name not in tools:
+        raise McpToolError(f"Tool '{tool_name}' is not available in this toolset.")
+
+    tool = tools[tool_name]
+    result = None
+    if before_tool_callback:
+        result = before_tool_callback(tool, args, tool_context)
+        result = await result if inspect.isawaitable(result) else result
+    if result is None:
+        span = start_tool_span(tool_name, args, tool_context)
+        result = await tool.run_async(args=args, tool_context=tool_context)
+        end_tool_span(span, tool_context, result)
+        if after_tool_callback:
+            replaced = after_tool_callback(tool, args, tool_context, result)
+            replaced = await replaced if inspect.isawaitable(replaced) else replaced
+            result = replaced if replaced is not None else result
+    return result
+
+
+def tool_result_text(result):
+    """Joins the text parts of a tool result, raising McpToolError on errors."""
+    text = "\n".join(
+        part.get("text", "")
+        for part in result.get("content", [])
+        if part.get("type") == "text"
+    )
+    if result.get("isError") or "error" in result:
+        raise McpToolError(text or str(result.get("error")))
+    return text
+
+
+async def call_mcp_tool(toolset, ctx, tool_name, **args):
+    """
+    Calls a toolbox tool directly, without going through an LLM turn. `ctx`
+    is an InvocationContext or, from inside a tool callback, a ToolContext.
+    Returns the text content of the result and raises McpToolError when the
+    tool reports an error.
+    """
+    tool_context = ctx if isinstance(ctx, ToolContext) else ToolContext(ctx)
+    return tool_result_text(await run_mcp_tool(toolset, tool_context, tool_name, args))
+
+
+def strip_code_fence(text):
+    """Returns the body of the first markdown code block, or the text itself."""
+    if not text:
+        return ""
+    match = _FENCE_RE.search(text)
+    return (match.group(1) if match else text).strip()
+
+
+def parse_json_text(text):
+    """Parses JSON tool or model output, tolerating a surrounding code fence."""
+    try:
+        return json.loads(strip_code_fence(text))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,178 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import time
+from collections import deque
+from .mcp_tools import parse_json_text
+from .sql_cache import user_question
+from .sql_prevalidator import table_columns
+
+logger = logging.getLogger(__name__)
+
+_ROUTE_KEY = "model_route"
+# Phrasings that usually need a join or subquery, and ones that need window functions.
+JOIN_CUES = re.compile(
+    r"\b(join(?:ed)?|combin(?:e|ed|ing)|across|together with|along with|match(?:ing)?|both)\b",
+    re.IGNORECASE,
+)
+WINDOW_CUES = re.compile(
+    r"\b(rank(?:ed|ing)?|running|cumulative|moving average|rolling|previous|prior|lag|lead|"
+    r"growth|change[sd]?|compared?|versus|vs\.?|percent(?:age)?|share|ratio|"
+    r"median|percentile|top \d+ (?:\w+ )?(?:per|in each|for each)|year over year|week over week)\b",
+    re.IGNORECASE,
+)
+
+
+def question_complexity(question, schema):
+    """Features the route is chosen from: tables in the (pruned) schema, nested fields and cue phrases."""
+    parsed = parse_json_text(schema) if isinstance(schema, str) else schema
+    tables = parsed if isinstance(parsed, dict) else {}
+    return {
+        "tables": len(tables),
+        "nested": any(
+            column_type.startswith(("ARRAY", "STRUCT"))
+            for table in tables.values()
+            for column_type in (table_columns(table) or {}).values()
+        ),
+        "join_cues": len(JOIN_CUES.findall(question or "")),
+        "window_cues": len(WINDOW_CUES.findall(question or "")),
+    }
+
+
+class ModelRouter:
+    """
+    Sends simple questions to `fast_model` and the rest to `strong_model`.
+    A question is simple when its schema has at most `max_fast_tables`
+    tables and no nested fields, and it has at most `max_fast_cues` join or
+    window phrasings. While the fast route's questions failed more often than
+    `max_fast_failure_rate` over the last `window` of them (once `min_samples`
+    have finished), every question takes the strong route. `stats` records
+    questions, validated queries, escalations, iterations and seconds per
+    route.
+    """
+
+    def __init__(
+        self, fast_model="gemini-2.5-flash", strong_model="gemini-2.5-pro",
+        max_fast_tables=1, max_fast_cues=0, max_fast_failure_rate=0.3, min_samples=20, window=100,
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.max_fast_tables = max_fast_tables
+        self.max_fast_cues = max_fast_cues
+        self.max_fast_failure_rate = max_fast_failure_rate
+        self.min_samples = min_samples
+        self._fast_outcomes = deque(maxlen=window)
+        self.stats = {}
+
+    def fast_failure_rate(self):
+        if len(self._fast_outcomes) < self.min_samples:
+            return None
+        return 1 - sum(self._fast_outcomes) / len(self._fast_outcomes)
+
+    def route(self, features):
+        """("fast" or "strong", model) for a question's `question_complexity` features."""
+        simple = (
+            features["tables"] <= self.max_fast_tables
+            and not features["nested"]
+            and features["join_cues"] + features["window_cues"] <= self.max_fast_cues
+        )
+        failure_rate = self.fast_failure_rate()
+        if simple and (failure_rate is None or failure_rate <= self.max_fast_failure_rate):
+            return "fast", self.fast_model
+        return "strong", self.strong_model
+
+    def record(self, route, valid, escalated, iterations, seconds):
+        stats = self.stats.setdefault(route, {
+            "questions": 0, "valid": 0, "escalated": 0, "iterations": 0, "seconds": 0.0,
+        })
+        stats["questions"] += 1
+        stats["valid"] += bool(valid)
+        stats["escalated"] += bool(escalated)
+        stats["iterations"] += iterations
+        stats["seconds"] += seconds
+        if route == "fast":
+            # An escalated question was answered by the strong model; it counts against the fast route.
+            self._fast_outcomes.append(bool(valid) and not escalated)
+
+    def metrics(self):
+        return {
+            route: {
+                **stats,
+                "accuracy": round(stats["valid"] / stats["questions"], 4),
+                "mean_seconds": round(stats["seconds"] / stats["questions"], 4),
+                "mean_iterations": round(stats["iterations"] / stats["questions"], 2),
+            }
+            for route, stats in self.stats.items()
+        }
+
+
+def _validations(ctx):
+    """Whether each `validation_result` written during the current question passed."""
+    return [
+        (event.actions.state_delta["validation_result"] or "").startswith("dry_run succeeded")
+        for event in ctx.session.events
+        if event.invocation_id == ctx.invocation_id and "validation_result" in (event.actions.state_delta or {})
+    ]
+
+
+def create_model_router_callbacks(router):
+    """
+    Returns (route_question, escalate_after_failure, record_route). The first
+    and last are before and after agent callbacks for `sql_loop`: they pick
+    the question's route, written to `sql_generator_model` and `model_route`
+    in state, and record its outcome with `router`. The middle one is a
+    before-model callback for the generators, to run before
+    `apply_generator_model`: once a query of a fast-routed question has
+    failed validation, the strong model takes over.
+    """
+
+    def route_question(callback_context):
+        state = callback_context.state
+        features = question_complexity(user_question(callback_context), state.get("schema"))
+        route, model = router.route(features)
+        state["sql_generator_model"] = model
+        state[_ROUTE_KEY] = {
+            "route": route, "model": model, "escalated": False, "features": features, "started": time.time(),
+        }
+        return None
+
+    def escalate_after_failure(callback_context, llm_request):
+        state = callback_context.state
+        routed = state.get(_ROUTE_KEY)
+        if not routed or routed["route"] != "fast" or routed["escalated"]:
+            return None
+        # A model switch made by the loop controller takes precedence.
+        if state.get("sql_generator_model") != router.fast_model:
+            return None
+        if not all(_validations(callback_context._invocation_context)):
+            state["sql_generator_model"] = router.strong_model
+            state[_ROUTE_KEY] = {**routed, "model": router.strong_model, "escalated": True}
+        return None
+
+    def record_route(callback_context):
+        state = callback_context.state
+        routed = state.get(_ROUTE_KEY)
+        if not routed or "seconds" in routed:
+            return None
+        validations = _validations(callback_context._invocation_context)
+        valid, iterations = any(validations), len(validations)
+        seconds = time.time() - routed["started"]
+        router.record(routed["route"], valid, routed["escalated"], iterations, seconds)
+        state[_ROUTE_KEY] = {**routed, "valid": valid, "iterations": iterations, "seconds": round(seconds, 4)}
+        logger.info("SQL generator route %s", state[_ROUTE_KEY])
+        return None
+
+    return route_question, escalate_after_failure, record_route
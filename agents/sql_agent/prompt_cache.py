@@ -0,0 +1,161 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import logging
+import time
+from .single_flight import SingleFlight
+from .sql_cache import schema_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Heading of the SQL generator's last instruction section, which holds only the session's schema.
+SCHEMA_SECTION = "`schema`:\n"
+# Gemini's minimum cached content size per model family (longest matching prefix wins).
+MIN_CACHE_TOKENS = {"gemini-2.5-pro": 4096, "gemini-2.5-flash": 1024, "gemini-2.0-flash": 1024}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+
+
+def prompt_fingerprint(model, system_instruction, schema=None):
+    """
+    Cache key of a generator prompt: the model, the static instruction before
+    `SCHEMA_SECTION` and the schema's fingerprint. Instructions without that
+    section, or without a schema, are keyed on their whole text.
+    """
+    prefix, section, _ = system_instruction.rpartition(SCHEMA_SECTION)
+    if not section or not schema:
+        return hashlib.sha256(f"{model}\n{system_instruction}".encode()).hexdigest()
+    static = hashlib.sha256(prefix.encode()).hexdigest()
+    return hashlib.sha256(f"{model}\n{static}\n{schema_fingerprint(schema)}".encode()).hexdigest()
+
+
+def min_cache_tokens(model, min_tokens=None):
+    """The smallest prompt worth caching for `model`: `min_tokens` when it's a number, else per model family."""
+    if isinstance(min_tokens, int):
+        return min_tokens
+    limits = {**MIN_CACHE_TOKENS, **(min_tokens or {})}
+    name = (model or "").rsplit("/", 1)[-1]
+    families = [family for family in limits if name.startswith(family)]
+    return limits[max(families, key=len)] if families else DEFAULT_MIN_CACHE_TOKENS
+
+
+class PromptCache:
+    """
+    Registers system instructions as Gemini cached content, shared by every
+    session: for the SQL generator, the static prompt plus the injected
+    schema, so one cache exists per model, static prompt and schema
+    fingerprint. Caches live for `ttl_seconds`; one still in use within
+    `refresh_seconds` of expiring has its TTL extended. Instructions under
+    the model's minimum (`min_cache_tokens`, estimated; `min_tokens` is a
+    number or per-model overrides) are sent as they are. When creating or extending a cache
+    fails, the request is sent uncached and that prefix is not retried for
+    `retry_seconds`.
+    """
+
+    def __init__(self, client=None, ttl_seconds=3600, min_tokens=None, refresh_seconds=120, retry_seconds=300):
+        self._client = client
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self._entries = {}
+        self._retry_after = {}
+        self._flights = SingleFlight()
+        self.stats = {"hits": 0, "created": 0, "refreshed": 0, "skipped": 0, "fallbacks": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client()
+        return self._client
+
+    async def _create(self, key, model, system_instruction):
+        from google.genai.types import CreateCachedContentConfig
+
+        cached = await self.client.aio.caches.create(model=model, config=CreateCachedContentConfig(
+            system_instruction=system_instruction,
+            ttl=f"{self.ttl_seconds}s",
+            display_name=f"sql-agent-{key[:16]}",
+        ))
+        self._entries[key] = {"name": cached.name, "expires": time.time() + self.ttl_seconds}
+        self.stats["created"] += 1
+        logger.info("Created cached content %s for a %d-character prompt", cached.name, len(system_instruction))
+        return self._entries[key]
+
+    async def _refresh(self, key, entry):
+        from google.genai.types import UpdateCachedContentConfig
+
+        await self.client.aio.caches.update(
+            name=entry["name"], config=UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+        )
+        entry["expires"] = time.time() + self.ttl_seconds
+        self.stats["refreshed"] += 1
+        return entry
+
+    async def cached_content(self, model, system_instruction, schema=None):
+        """
+        Name of a live cache holding `system_instruction` for `model`, or None
+        to send it uncached. `schema` is the session's schema it was rendered from.
+        """
+        if (len(system_instruction) + 3) // 4 < min_cache_tokens(model, self.min_tokens):
+            self.stats["skipped"] += 1
+            return None
+        now = time.time()
+        for stale in [key for key, entry in self._entries.items() if entry["expires"] <= now]:
+            del self._entries[stale]
+        key = prompt_fingerprint(model, system_instruction, schema)
+        if self._retry_after.get(key, 0) > now:
+            self.stats["fallbacks"] += 1
+            return None
+
+        entry = self._entries.get(key)
+        try:
+            if entry is None:
+                entry = await self._flights.do(key, lambda: self._create(key, model, system_instruction))
+            elif entry["expires"] - now < self.refresh_seconds:
+                entry = await self._flights.do(("refresh", key), lambda: self._refresh(key, entry))
+            else:
+                self.stats["hits"] += 1
+        except Exception as e:
+            logger.warning("Context caching unavailable, sending the prompt uncached: %s", e)
+            self._entries.pop(key, None)
+            self._retry_after[key] = now + self.retry_seconds
+            self.stats["fallbacks"] += 1
+            return None
+        return entry["name"]
+
+
+def create_prompt_cache_callback(cache):
+    """
+    Returns a before-model callback that replaces the request's system
+    instruction with a reference to `cache`'s cached content. Requests with
+    tools or an instruction that isn't plain text are left alone.
+    """
+
+    async def use_cached_prompt(callback_context, llm_request):
+        config = llm_request.config
+        if config is None or config.tools or config.cached_content:
+            return None
+        if not isinstance(config.system_instruction, str) or not config.system_instruction:
+            return None
+        schema = callback_context.state.get("schema") if callback_context else None
+        name = await cache.cached_content(llm_request.model, config.system_instruction, schema)
+        if name:
+            config.cached_content = name
+            config.system_instruction = None
+        return None
+
+    return use_cached_prompt
@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-GENERATOR_SYSTEM_PROMPT = """
+# Timezone the generator resolves relative dates in.
+DATE_TIMEZONE = "America/Los_Angeles"
+
+GENERATOR_SYSTEM_PROMPT = f"""
 Comprehensive System Instructions for BigQuery SQL Generation Agent
 
 I. Core Identity and Mandate
@@ -95,7 +98,7 @@ Use APPROX_COUNT_DISTINCT(col) for high-level analytics or ambiguous queries.
 Use COUNT(DISTINCT col) only if high precision is explicitly implied.
 
 VI. Ambiguity Resolution
-Assume date logic is relative to CURRENT_DATE('America/Los_Angeles') unless specified.
+Assume date logic is relative to CURRENT_DATE('{DATE_TIMEZONE}') unless specified.
 "last quarter" -> full previous calendar quarter.
 "this quarter" -> quarter-to-date.
 "Top 5" -> QUALIFY ROW_NUMBER() OVER (ORDER BY col DESC) <= 5.
@@ -120,6 +123,7 @@ Read the `validation_result` from the session state.
 
 - If the `validation_result` contains the string "dry_run succeeded", the SQL is valid. Call the `report_validation_result` tool with `valid=True`.
 - If the `validation_result` contains an error message, the SQL is invalid. Call the `report_validation_result` tool with `valid=False` and provide a concise, actionable `guidance` string for the generator on how to fix the specific error.
+- If the `validation_result` starts with "budget exceeded", the SQL is too expensive. Call the `report_validation_result` tool with `valid=False` and pass on its cost guidance.
 """
 
 SCHEMA_INSPECTOR_DATAPLEX_PROMPT = """
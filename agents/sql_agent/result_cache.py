@@ -0,0 +1,263 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from .mcp_tools import McpToolError, call_mcp_tool, parse_json_text, strip_code_fence
+from .prompts import DATE_TIMEZONE
+from .schema_cache import table_fingerprint
+from .schema_inspector import split_table_ref
+
+_BYTES_PROCESSED_RE = re.compile(r'"?totalBytesProcessed"?\s*[:=]\s*"?(\d+)', re.IGNORECASE)
+_VOLATILE_FUNCTIONS = (
+    exp.Rand, exp.Uuid, exp.CurrentTimestamp, exp.CurrentDatetime, exp.CurrentTime, exp.SessionUser,
+)
+_VOLATILE_NAMES = ("RAND", "GENERATE_UUID", "CURRENT_TIMESTAMP", "CURRENT_DATETIME", "CURRENT_TIME", "SESSION_USER")
+_PENDING_KEY = "temp:result_cache_key"
+
+
+def bytes_processed(text):
+    """Extracts `totalBytesProcessed` from a dry-run result, or None."""
+    match = _BYTES_PROCESSED_RE.search(text or "")
+    return int(match.group(1)) if match else None
+
+
+def normalize_sql(sql):
+    """Canonical SQL text, so formatting and keyword-case differences share a key."""
+    sql = strip_code_fence(sql)
+    try:
+        return sqlglot.parse_one(sql, dialect="bigquery").sql(dialect="bigquery")
+    except SqlglotError:
+        return " ".join(sql.split())
+
+
+def referenced_tables(sql):
+    """Fully-qualified `project.dataset.table` names read by `sql`."""
+    try:
+        expression = sqlglot.parse_one(strip_code_fence(sql), dialect="bigquery")
+    except SqlglotError:
+        return None
+    cte_names = {cte.alias.lower() for cte in expression.find_all(exp.CTE)}
+    return sorted({
+        ".".join(part for part in (table.catalog, table.db, table.name) if part)
+        for table in expression.find_all(exp.Table)
+        if table.name and table.name.lower() not in cte_names
+    })
+
+
+def _parse(sql):
+    try:
+        return sqlglot.parse_one(strip_code_fence(sql), dialect="bigquery")
+    except SqlglotError:
+        return None
+
+
+def is_cacheable(sql):
+    expression = _parse(sql)
+    if expression is None:
+        upper = normalize_sql(sql).upper()
+        return not any(f"{name}(" in upper for name in _VOLATILE_NAMES + ("CURRENT_DATE",))
+    if any(True for _ in expression.find_all(*_VOLATILE_FUNCTIONS)):
+        return False
+    return all(node.this is None or isinstance(node.this, exp.Literal) for node in expression.find_all(exp.CurrentDate))
+
+
+def current_dates(sql, now=None):
+    """
+    The dates `CURRENT_DATE` calls in `sql` resolve to at `now`, one per
+    timezone. A call without a timezone is keyed on both UTC (what BigQuery
+    uses) and the timezone the generator's prompt assumes.
+    """
+    expression = _parse(sql)
+    if expression is None:
+        return []
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    timezones = set()
+    for node in expression.find_all(exp.CurrentDate):
+        timezones.update([node.this.name] if node.this is not None else ["UTC", DATE_TIMEZONE])
+    dates = []
+    for timezone in sorted(timezones):
+        try:
+            dates.append(f"{timezone}={now.astimezone(ZoneInfo(timezone)).date().isoformat()}")
+        except (ZoneInfoNotFoundError, ValueError):
+            dates.append(f"{timezone}={now.date().isoformat()}")
+    return dates
+
+
+class ResultCache:
+    """
+    Query results keyed by normalised SQL plus the last-modified fingerprints
+    of every referenced table. Entries expire after `ttl_seconds`; the
+    in-memory LRU and the on-disk store are each capped in bytes.
+    """
+
+    def __init__(self, cache_dir=None, ttl_seconds=3600, max_memory_bytes=64 << 20, max_disk_bytes=512 << 20):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+
+    @staticmethod
+    def make_key(sql, table_fingerprints, now=None):
+        payload = json.dumps([normalize_sql(sql), sorted(table_fingerprints.items()), current_dates(sql, now)])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, entry, size):
+        if key in self._entries:
+            self._memory_bytes -= self._entries.pop(key)[1]
+        if size > self.max_memory_bytes:
+            return
+        self._entries[key] = (entry, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = f.read()
+        except OSError:
+            return None
+        entry = parse_json_text(data)
+        return (entry, len(data)) if isinstance(entry, dict) else None
+
+    def get(self, key):
+        cached = self._entries.get(key) or self._load(key)
+        if cached is None:
+            return None
+        entry, size = cached
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self.invalidate(key)
+            return None
+        self._remember(key, entry, size)
+        return entry
+
+    def put(self, key, result, bytes_processed=None):
+        entry = {"created_at": time.time(), "result": result, "bytes_processed": bytes_processed or 0}
+        data = json.dumps(entry)
+        self._remember(key, entry, len(data))
+        if not self.cache_dir or len(data) > self.max_disk_bytes:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._trim_disk()
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".json"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def invalidate(self, key):
+        if key in self._entries:
+            self._memory_bytes -= self._entries.pop(key)[1]
+        if self.cache_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+def _record(state, **changes):
+    stats = dict(state.get("result_cache_stats") or {"hits": 0, "misses": 0, "bytes_saved": 0})
+    for name, value in changes.items():
+        stats[name] += value
+    state["result_cache_stats"] = stats
+
+
+def create_result_cache_callbacks(cache, table_info_toolset):
+    """
+    Returns (before, after) tool callbacks that serve `execute_sql` calls with
+    `dry_run=False` from `cache`. Hits, misses and the dry-run bytes a hit
+    avoided re-scanning are accumulated in `state['result_cache_stats']`.
+    """
+
+    async def _key(sql, tool_context):
+        tables = referenced_tables(sql)
+        if not tables or not is_cacheable(sql):
+            return None
+
+        async def _fingerprint(table_ref):
+            project, dataset, table = split_table_ref(table_ref)
+            text = await call_mcp_tool(
+                table_info_toolset, tool_context, "get_table_info",
+                project=project, dataset=dataset, table=table
+            )
+            return table_ref, table_fingerprint(parse_json_text(text))
+
+        try:
+            fingerprints = dict(await asyncio.gather(*(_fingerprint(t) for t in tables)))
+        except McpToolError:
+            return None
+        if any(fingerprint is None for fingerprint in fingerprints.values()):
+            return None
+        return cache.make_key(sql, fingerprints)
+
+    async def serve_cached_result(tool, args, tool_context):
+        if tool.name != "execute_sql" or args.get("dry_run") or not args.get("sql"):
+            return None
+        key = await _key(args["sql"], tool_context)
+        if key is None:
+            return None
+        entry = cache.get(key)
+        if entry is None:
+            tool_context.state[_PENDING_KEY] = key
+            _record(tool_context.state, misses=1)
+            return None
+        tool_context.state[_PENDING_KEY] = None
+        _record(tool_context.state, hits=1, bytes_saved=entry["bytes_processed"])
+        return entry["result"]
+
+    def store_result(tool, args, tool_context, tool_response):
+        key = tool_context.state.get(_PENDING_KEY)
+        if tool.name != "execute_sql" or not key:
+            return None
+        tool_context.state[_PENDING_KEY] = None
+        if isinstance(tool_response, dict) and not tool_response.get("isError"):
+            # The dry-run stats only describe this query if the loop just validated it.
+            state = tool_context.state
+            validated = state.get("sql") == state.get("valid_sql")
+            cache.put(key, tool_response, bytes_processed(state.get("validation_result")) if validated else None)
+        return None
+
+    return serve_cached_result, store_result
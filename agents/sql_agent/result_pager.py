@@ -0,0 +1,177 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import re
+import secrets
+from collections import OrderedDict
+from google.genai.types import Content, Part
+from .mcp_tools import parse_json_text
+from .result_renderer import render_rows
+from .sql_cache import user_question
+
+_CONTINUATION_RE = re.compile(r"^\s*more\s+([\w-]+)\s*$", re.IGNORECASE)
+# A `continuation_note`, with the blank line before it.
+_NOTE_RE = re.compile(r"\s*_\d+ of \d+ rows shown\. Reply `more ([\w-]+)` for the next rows\._")
+
+
+def parse_rows(text):
+    """
+    Rows from an `execute_sql` result: a JSON array of objects or one JSON
+    object per line. Returns None when the text isn't row data.
+    """
+    parsed = parse_json_text(text)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("rows", [parsed])
+    if isinstance(parsed, list) and all(isinstance(row, dict) for row in parsed):
+        return parsed
+    rows = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        row = parse_json_text(line)
+        if not isinstance(row, dict):
+            return None
+        rows.append(row)
+    return rows or None
+
+
+def row_size(row):
+    return len(json.dumps(row, default=str))
+
+
+def take_rows(rows, max_rows, max_bytes):
+    """Splits `rows` at whichever of the row and byte caps is hit first (at least one row)."""
+    total = 0
+    for i, row in enumerate(rows[:max_rows]):
+        total += row_size(row)
+        if total > max_bytes and i > 0:
+            return rows[:i], rows[i:]
+    return rows[:max_rows], rows[max_rows:]
+
+
+def summarize_rows(rows):
+    """Per-column counts, nulls, distinct values and numeric ranges."""
+    columns = {}
+    for row in rows:
+        for name in row:
+            columns.setdefault(name, [])
+    for row in rows:
+        for name, values in columns.items():
+            values.append(row.get(name))
+
+    summary = {"row_count": len(rows), "columns": {}}
+    for name, values in columns.items():
+        present = [v for v in values if v is not None]
+        stats = {"nulls": len(values) - len(present), "distinct": len({json.dumps(v, default=str) for v in present})}
+        numbers = []
+        for value in present:
+            try:
+                numbers.append(float(value))
+            except (TypeError, ValueError):
+                numbers = None
+                break
+        if numbers:
+            stats.update(min=min(numbers), max=max(numbers), mean=round(sum(numbers) / len(numbers), 4))
+        elif present:
+            stats.update(min=min(map(str, present)), max=max(map(str, present)))
+        summary["columns"][name] = stats
+    return summary
+
+
+class ResultPager:
+    """
+    Holds the rows beyond a response's cap behind a continuation token.
+    Tokens are kept in LRU order; the oldest are dropped past `max_entries`.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def put(self, rows, offset, result_format="markdown", column_types=None):
+        token = secrets.token_urlsafe(8)
+        self._entries[token] = (rows, offset, result_format, column_types)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return token
+
+    def pop(self, token):
+        return self._entries.pop(token, None)
+
+    def peek(self, token):
+        return self._entries.get(token)
+
+
+def page_texts(rows, offset, total, page_rows, result_format="markdown", column_types=None):
+    """Splits delivered rows into rendered pages of `page_rows`."""
+    pages = []
+    for start in range(0, len(rows), page_rows):
+        page = rows[start:start + page_rows]
+        first = offset + start + 1
+        rendered = render_rows(page, result_format, column_types)
+        pages.append(f"Rows {first}-{first + len(page) - 1} of {total}:\n\n{rendered}")
+    return pages
+
+
+def continuation_note(shown, total, token):
+    return f"_{shown} of {total} rows shown. Reply `more {token}` for the next rows._"
+
+
+def continuation_tokens(text):
+    return [match.group(1) for match in _NOTE_RE.finditer(text or "")]
+
+
+def reissue_continuations(text, pager, entries):
+    """
+    Replaces each continuation token in `text` (another request's answer)
+    with a fresh one from `pager` for the same rows (`entries` maps tokens
+    to pager entries), or drops the note when there is none.
+    """
+
+    def _reissue(match):
+        entry = entries.get(match.group(1))
+        if pager is None or entry is None:
+            return ""
+        return match.group(0).replace(match.group(1), pager.put(*entry))
+
+    return _NOTE_RE.sub(_reissue, text).strip()
+
+
+def create_continuation_callback(pager, max_rows, max_bytes):
+    """
+    Returns a before-agent callback for the root agent that answers
+    `more <token>` messages from `pager`, skipping the whole pipeline.
+    """
+
+    def serve_continuation(callback_context):
+        match = _CONTINUATION_RE.match(user_question(callback_context))
+        if not match:
+            return None
+        entry = pager.pop(match.group(1))
+        if entry is None:
+            text = "That result page has expired. Please ask the question again."
+        else:
+            rows, offset, result_format, column_types = entry
+            delivered, remaining = take_rows(rows, max_rows, max_bytes)
+            total = offset + len(rows)
+            text = "\n\n".join(
+                page_texts(delivered, offset, total, len(delivered), result_format, column_types)
+            )
+            if remaining:
+                token = pager.put(remaining, offset + len(delivered), result_format, column_types)
+                text += "\n\n" + continuation_note(offset + len(delivered), total, token)
+        return Content(role="model", parts=[Part(text=text)])
+
+    return serve_continuation
@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import datetime
+import io
+import json
+import re
+
+RESULT_FORMATS = ("markdown", "csv", "json")
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2}| UTC)?$")
+_FORMAT_HINT_RE = re.compile(r"\b(?:as|in|to)\s+(?:a\s+)?(csv|json|markdown)\b", re.IGNORECASE)
+
+
+def requested_format(question):
+    """A format asked for in the question ("... as CSV"), or None."""
+    match = _FORMAT_HINT_RE.search(question or "")
+    return match.group(1).lower() if match else None
+
+
+_PLAIN_INT_COLUMN_RE = re.compile(r"(?:^|_)(?:year|id|key|code|zip|number|num)$", re.IGNORECASE)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_float(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _column_type(values):
+    # Types come from the JSON the toolbox returns: strings stay strings, so
+    # zip codes keep their leading zeros and STRING ids aren't reformatted.
+    present = [v for v in values if v is not None]
+    if not present:
+        return "STRING"
+    if all(isinstance(v, bool) for v in present):
+        return "BOOL"
+    if all(_is_int(v) for v in present):
+        return "INT64"
+    if all(_is_float(v) for v in present):
+        return "FLOAT64"
+    if all(isinstance(v, str) and _DATE_RE.match(v) for v in present):
+        return "DATE"
+    if all(isinstance(v, str) and _TIMESTAMP_RE.match(v) for v in present):
+        return "TIMESTAMP"
+    if all(isinstance(v, (dict, list)) for v in present):
+        return "JSON"
+    return "STRING"
+
+
+def infer_column_types(rows):
+    """Maps each column to INT64, FLOAT64, BOOL, DATE, TIMESTAMP, JSON or STRING."""
+    columns = list(dict.fromkeys(name for row in rows for name in row))
+    return {name: _column_type([row.get(name) for row in rows]) for name in columns}
+
+
+def _format_timestamp(value):
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace(" UTC", "+00:00").replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    text = parsed.strftime("%Y-%m-%d %H:%M:%S")
+    return f"{text} UTC" if parsed.utcoffset() == datetime.timedelta(0) else text
+
+
+def format_value(value, column_type, column=""):
+    """
+    Human-readable cell text for the Markdown table. Integers are grouped
+    with thousands separators unless `column` names a year or an id.
+    """
+    if value is None:
+        return ""
+    if column_type == "INT64":
+        return str(value) if _PLAIN_INT_COLUMN_RE.search(column) else f"{value:,}"
+    if column_type == "FLOAT64":
+        return f"{value:,.2f}" if abs(value) >= 1 or value == 0 else f"{value:.4g}"
+    if column_type == "BOOL":
+        return "true" if value else "false"
+    if column_type == "TIMESTAMP":
+        return _format_timestamp(value)
+    if column_type == "JSON" or not isinstance(value, str):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _markdown(rows, columns, types):
+    def _cell(value, column_type, column):
+        return format_value(value, column_type, column).replace("|", "\\|").replace("\n", " ")
+
+    align = ["---:" if types[c] in ("INT64", "FLOAT64") else "---" for c in columns]
+    lines = ["| " + " | ".join(columns) + " |", "| " + " | ".join(align) + " |"]
+    lines += ["| " + " | ".join(_cell(row.get(c), types[c], c) for c in columns) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _csv(rows, columns, types):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        values = [row.get(c) for c in columns]
+        writer.writerow(
+            ["" if v is None else json.dumps(v) if isinstance(v, (dict, list)) else v for v in values]
+        )
+    return f"```csv\n{out.getvalue()}```"
+
+
+def _json(rows, columns, types):
+    raw = [{c: row.get(c) for c in columns} for row in rows]
+    return f"```json\n{json.dumps(raw, indent=2, default=str)}\n```"
+
+
+def render_rows(rows, result_format="markdown", column_types=None):
+    """
+    Renders `execute_sql` rows without an LLM. `column_types` (from
+    `infer_column_types` over the full result) keeps formatting consistent
+    across pages.
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result format: {result_format}")
+    types = column_types or infer_column_types(rows)
+    columns = list(types)
+    return {"markdown": _markdown, "csv": _csv, "json": _json}[result_format](rows, columns, types)
@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+_LAST_MODIFIED_KEYS = ("LastModifiedTime", "lastModifiedTime", "last_modified_time")
+_ETAG_KEYS = ("ETag", "Etag", "etag")
+
+
+def _first(info, keys):
+    for key in keys:
+        if info.get(key) not in (None, ""):
+            return str(info[key])
+    return ""
+
+
+def table_fingerprint(table_info):
+    """
+    Builds a freshness fingerprint from `get_table_info` output.
+    Returns None when the metadata carries neither a last-modified time nor an
+    etag, in which case the table can't be safely cached.
+    """
+    if not isinstance(table_info, dict):
+        return None
+    last_modified = _first(table_info, _LAST_MODIFIED_KEYS)
+    etag = _first(table_info, _ETAG_KEYS)
+    if not last_modified and not etag:
+        return None
+    return f"{last_modified}|{etag}"
+
+
+class SchemaCache:
+    """
+    Two-level schema cache keyed by `dataset/table`: an in-process LRU in front
+    of a directory of JSON files. An entry is only returned when its stored
+    fingerprint matches the caller's, so a changed table is a miss.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return os.path.join(self.cache_dir, f"{safe_key}-{digest}.json")
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key, fingerprint):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load(key)
+        if entry is None or fingerprint is None or entry.get("fingerprint") != fingerprint:
+            return None
+        self._remember(key, entry)
+        return entry["schema"]
+
+    def put(self, key, fingerprint, schema):
+        if fingerprint is None:
+            return
+        entry = {"fingerprint": fingerprint, "schema": schema}
+        self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .cost_guard import cluster_columns, partition_columns
+from .mcp_tools import parse_json_text
+
+_FIELD_LIST_KEYS = ("Schema", "schema", "fields", "columns")
+_TYPE_ABBREVIATIONS = {
+    "STRING": "STR",
+    "INTEGER": "INT",
+    "INT64": "INT",
+    "FLOAT": "FLOAT",
+    "FLOAT64": "FLOAT",
+    "BOOLEAN": "BOOL",
+    "NUMERIC": "NUM",
+    "BIGNUMERIC": "BIGNUM",
+    "TIMESTAMP": "TS",
+    "DATETIME": "DT",
+    "RECORD": "STRUCT",
+}
+COMPACT_SCHEMA_LEGEND = (
+    "-- Types: STR=STRING, INT=INT64, FLOAT=FLOAT64, NUM=NUMERIC, TS=TIMESTAMP, DT=DATETIME."
+    " `a.b` is field b of STRUCT a; `a[]` is an ARRAY, read with UNNEST(a)."
+)
+
+
+def _attr(field, *names):
+    for name in names:
+        if name in field:
+            return field[name]
+    return None
+
+
+def table_fields(table_schema):
+    """The top-level fields of a table in any layout `get_table_info` or the LLM produces, or None."""
+    if isinstance(table_schema, list):
+        return table_schema if all(isinstance(field, dict) for field in table_schema) else None
+    if not isinstance(table_schema, dict):
+        return None
+    for key in _FIELD_LIST_KEYS:
+        if key in table_schema:
+            return table_fields(table_schema[key])
+    if table_schema and all(isinstance(value, str) for value in table_schema.values()):
+        return [{"name": name, "type": value} for name, value in table_schema.items()]
+    return None
+
+
+def _one_line(text):
+    return " ".join(str(text).split())
+
+
+def _columns(fields, prefix=""):
+    """(dotted path, abbreviated type, description) for every leaf field."""
+    for field in fields:
+        name = _attr(field, "name", "Name", "column_name")
+        if not name:
+            continue
+        field_type = str(_attr(field, "type", "Type", "data_type") or "STRING").upper()
+        repeated = str(_attr(field, "mode", "Mode") or "").upper() == "REPEATED" or _attr(field, "Repeated", "repeated") is True
+        path = f"{prefix}{name}{'[]' if repeated else ''}"
+        subfields = _attr(field, "fields", "Schema", "schema")
+        if field_type in ("RECORD", "STRUCT") and isinstance(subfields, list) and subfields:
+            yield from _columns(subfields, f"{path}.")
+            continue
+        yield path, _TYPE_ABBREVIATIONS.get(field_type, field_type), _one_line(_attr(field, "description", "Description") or "")
+
+
+def _table_name(ref, table_schema):
+    reference = table_schema.get("tableReference") if isinstance(table_schema, dict) else None
+    if isinstance(reference, dict) and reference.get("tableId"):
+        return ".".join(reference.get(key) for key in ("projectId", "datasetId", "tableId") if reference.get(key))
+    return str(ref).strip("`")
+
+
+def compact_schema(schema):
+    """
+    Renders the `schema` session state value as DDL-like text: one `TABLE`
+    header per table with its partitioning, clustering and description, then
+    one `path TYPE -- description` line per column. Nested fields are
+    flattened into dotted paths and types abbreviated (see
+    `COMPACT_SCHEMA_LEGEND`). Returns None when a table's layout isn't
+    recognised, so the caller can keep the JSON.
+    """
+    parsed = parse_json_text(schema) if isinstance(schema, str) else schema
+    if not isinstance(parsed, dict) or not parsed:
+        return None
+    lines = [COMPACT_SCHEMA_LEGEND]
+    for ref, table_schema in parsed.items():
+        fields = table_fields(table_schema)
+        if fields is None:
+            return None
+        header = f"TABLE `{_table_name(ref, table_schema)}`"
+        if isinstance(table_schema, dict):
+            partitions = partition_columns(table_schema)
+            if partitions:
+                header += f" PARTITION BY {', '.join(partitions)}"
+            cluster_fields = cluster_columns(table_schema)
+            if cluster_fields:
+                header += f" CLUSTER BY {', '.join(cluster_fields)}"
+            description = _one_line(_attr(table_schema, "description", "Description") or "")
+            if description:
+                header += f" -- {description}"
+        lines.append(header)
+        for path, column_type, description in _columns(fields):
+            lines.append(f"  {path} {column_type}" + (f" -- {description}" if description else ""))
+    return "\n".join(lines)
+
+
+def create_schema_format_callback():
+    """
+    Returns a before-model callback that replaces the schema JSON injected
+    into the instruction (from `{schema?}`) with `compact_schema`. Session
+    state keeps the JSON, which the pruner, pre-validation and repair parse.
+    """
+
+    def use_compact_schema(callback_context, llm_request):
+        schema = callback_context.state.get("schema")
+        config = llm_request.config
+        if not schema or config is None or not isinstance(config.system_instruction, str):
+            return None
+        injected = str(schema)
+        if injected not in config.system_instruction:
+            return None
+        compact = compact_schema(schema)
+        if compact:
+            config.system_instruction = config.system_instruction.replace(injected, compact, 1)
+        return None
+
+    return use_compact_schema
@@ -12,19 +12,171 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from .config import mcp_connection_params, DATAPLEX_ENABLED
+import asyncio
+import json
+from typing import Any, AsyncGenerator
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from .config import (
+    DATAPLEX_ENABLED,
+    BIGQUERY_DATASET,
+    SCHEMA_CACHE_DIR,
+    SCHEMA_CACHE_SIZE,
+)
+from .mcp_pool import create_mcp_toolset
+from .cost_guard import table_layout
+from .mcp_tools import McpToolError, call_mcp_tool, parse_json_text
 from .prompts import (
     SCHEMA_INSPECTOR_DATAPLEX_PROMPT,
     SCHEMA_INSPECTOR_DEFAULT_PROMPT
 )
+from .schema_cache import SchemaCache, table_fingerprint
+from .schema_format import table_fields
+from .lazy import lazy_singletons
 
-def create_schema_inspector():
-    schema_tools = McpToolset(
-        connection_params=mcp_connection_params,
-        tool_filter=['list_tables', 'get_table_info']
-    )
+schema_cache = SchemaCache(cache_dir=SCHEMA_CACHE_DIR, max_entries=SCHEMA_CACHE_SIZE)
+
+# `get_table_info` keys (toolbox and REST spellings) that describe a table's shape rather than its data,
+# so row counts and modification times don't change the schema's fingerprint.
+_SCHEMA_KEYS = (
+    "Name", "FullID", "tableReference", "Type", "type", "Description", "description", "Schema", "schema",
+    "TimePartitioning", "timePartitioning", "RangePartitioning", "rangePartitioning",
+    "RequirePartitionFilter", "requirePartitionFilter", "Clustering", "clustering",
+)
+
+
+def table_schema(table_info):
+    """The schema of one table from its `get_table_info` result, or None when it has no field list."""
+    if not isinstance(table_info, dict) or table_fields(table_info) is None:
+        return None
+    return {key: table_info[key] for key in _SCHEMA_KEYS if table_info.get(key) not in (None, "", [], {})}
+
+
+def split_table_ref(table_ref, default_dataset=BIGQUERY_DATASET):
+    """Splits `project.dataset.table` (or a bare table id) into its parts."""
+    parts = table_ref.strip().strip("`").split(".")
+    default_project, default_dataset_id = default_dataset.split(".", 1)
+    if len(parts) >= 3:
+        return parts[-3], parts[-2], parts[-1]
+    if len(parts) == 2:
+        return default_project, parts[0], parts[1]
+    return default_project, default_dataset_id, parts[0]
+
+
+def _find_table_schema(schema, table_ref):
+    if table_ref in schema:
+        return schema[table_ref]
+    table_id = table_ref.split(".")[-1]
+    for key, value in schema.items():
+        if key.strip("`").split(".")[-1] == table_id:
+            return value
+    return None
+
+
+class CachedSchemaInspector(BaseAgent):
+    """
+    Builds `schema` in code from the `get_table_info` result of every table,
+    and caches each table's schema under its last-modified time and etag.
+    When a result has no usable field list, it serves the cached schema if
+    every fingerprint still matches, and otherwise delegates to the LLM
+    inspector (its single sub-agent). Either way, each table's partitioning and
+    clustering from `get_table_info` is written to `table_layouts`, which
+    the LLM's consolidated schema often leaves out.
+    """
+
+    toolset: Any
+    cache: Any
+    dataplex_enabled: bool = False
+    dataset: str = BIGQUERY_DATASET
+
+    async def _list_tables(self, ctx: InvocationContext):
+        if self.dataplex_enabled:
+            table_list = ctx.session.state.get("filtered_table_list") or []
+            if isinstance(table_list, str):
+                table_list = parse_json_text(table_list) or []
+            return list(table_list)
+
+        project, dataset = self.dataset.split(".", 1)
+        text = await call_mcp_tool(
+            self.toolset, ctx, "list_tables", project=project, dataset=dataset
+        )
+        return parse_json_text(text) or []
+
+    async def _table_info(self, ctx: InvocationContext, table_ref):
+        project, dataset, table = split_table_ref(table_ref, self.dataset)
+        text = await call_mcp_tool(
+            self.toolset, ctx, "get_table_info",
+            project=project, dataset=dataset, table=table
+        )
+        table_info = parse_json_text(text)
+        return f"{project}.{dataset}/{table}", table_fingerprint(table_info), table_info
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        try:
+            tables = await self._list_tables(ctx)
+            infos = await asyncio.gather(
+                *(self._table_info(ctx, table_ref) for table_ref in tables)
+            )
+        except McpToolError:
+            tables, infos = [], []
+
+        layouts = {
+            table_ref: table_layout(table_info)
+            for table_ref, (_, _, table_info) in zip(tables, infos)
+            if table_layout(table_info)
+        }
+        built = {table_ref: table_schema(table_info) for table_ref, (_, _, table_info) in zip(tables, infos)}
+        if tables and all(value is not None for value in built.values()):
+            for table_ref, (key, fingerprint, _) in zip(tables, infos):
+                self.cache.put(key, fingerprint, built[table_ref])
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={"schema": json.dumps(built), "table_layouts": layouts}),
+            )
+            return
+
+        cached = {
+            table_ref: self.cache.get(key, fingerprint)
+            for table_ref, (key, fingerprint, _) in zip(tables, infos)
+        }
+        if tables and all(value is not None for value in cached.values()):
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={"schema": json.dumps(cached), "table_layouts": layouts}),
+            )
+            return
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"table_layouts": layouts}),
+        )
+
+        schema_output = None
+        async for event in self.sub_agents[0].run_async(ctx):
+            if event.actions.state_delta and "schema" in event.actions.state_delta:
+                schema_output = event.actions.state_delta["schema"]
+            yield event
+
+        schema = parse_json_text(schema_output)
+        if not isinstance(schema, dict):
+            return
+        for table_ref, (key, fingerprint, _) in zip(tables, infos):
+            found = _find_table_schema(schema, table_ref)
+            if found is not None:
+                self.cache.put(key, fingerprint, found)
+
+
+def create_schema_inspector(name="schema_inspector"):
+    schema_tools = create_mcp_toolset(['list_tables', 'get_table_info'])
 
     instruction = (
         SCHEMA_INSPECTOR_DATAPLEX_PROMPT
@@ -34,11 +186,23 @@ def create_schema_inspector():
 
     return LlmAgent(
         model="gemini-2.5-pro",
-        name="schema_inspector",
+        name=name,
         description="Inspects the BigQuery dataset schema.",
         output_key="schema",
         instruction=instruction,
         tools=[schema_tools]
     )
 
-schema_inspector = create_schema_inspector()
\ No newline at end of file
+def create_cached_schema_inspector():
+    schema_tools = create_mcp_toolset(['list_tables', 'get_table_info'])
+
+    return CachedSchemaInspector(
+        name="schema_inspector",
+        description="Inspects the BigQuery dataset schema, reusing cached table schemas.",
+        toolset=schema_tools,
+        cache=schema_cache,
+        dataplex_enabled=DATAPLEX_ENABLED,
+        sub_agents=[create_schema_inspector(name="schema_inspector_llm")]
+    )
+
+__getattr__ = lazy_singletons(__name__, schema_inspector=create_schema_inspector)
@@ -0,0 +1,253 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import difflib
+import json
+import re
+from typing import Any, AsyncGenerator, Optional
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from .config import DATAPLEX_ENABLED, SCHEMA_PRUNING_MAX_COLUMNS, SCHEMA_PRUNING_SCORING
+from .mcp_tools import parse_json_text
+from .sql_cache import hashed_embedding, user_question
+
+_FIELD_LIST_KEYS = ("Schema", "schema", "fields", "columns")
+_DESCRIPTION_RE = re.compile(r"`([\w.]+)`\s*[:\-–]\s*(.+)")
+_STOP_WORDS = {
+    "a", "an", "and", "are", "by", "for", "from", "how", "in", "is", "it", "last",
+    "many", "me", "most", "of", "on", "or", "per", "show", "the", "to", "top",
+    "was", "were", "what", "which", "who", "with",
+}
+
+
+def _tokens(text):
+    words = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "")
+    tokens = set()
+    for word in re.findall(r"[a-z0-9]+", words.lower()):
+        if word in _STOP_WORDS:
+            continue
+        tokens.add(word)
+        for suffix in ("ies", "es", "s", "ing", "ed"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                tokens.add(word[: -len(suffix)] + ("y" if suffix == "ies" else ""))
+                break
+    return tokens
+
+
+def _overlap(question_tokens, tokens):
+    score = 0.0
+    for token in tokens:
+        if token in question_tokens:
+            score += 1.0
+        elif len(token) > 3 and difflib.get_close_matches(token, question_tokens, n=1, cutoff=0.85):
+            score += 0.5
+    return score
+
+
+def _field_list(table_schema):
+    """Returns (container, key) of the top-level field list, or (None, None)."""
+    if not isinstance(table_schema, dict):
+        return None, None
+    for key in _FIELD_LIST_KEYS:
+        value = table_schema.get(key)
+        if isinstance(value, list):
+            return table_schema, key
+        if isinstance(value, dict):
+            container, inner_key = _field_list(value)
+            if container is not None:
+                return container, inner_key
+    return None, None
+
+
+def _fields(table_schema):
+    if isinstance(table_schema, list):
+        return table_schema
+    container, key = _field_list(table_schema)
+    return container[key] if container is not None else None
+
+
+def _field_name(field):
+    return field.get("name") or field.get("Name") or field.get("column_name")
+
+
+def _field_description(field):
+    return field.get("description") or field.get("Description") or ""
+
+
+def _required_columns(table_schema):
+    """Partition and cluster columns, which the generator needs for pruning filters."""
+    if not isinstance(table_schema, dict):
+        return set()
+    required = set()
+    for key in ("TimePartitioning", "timePartitioning", "RangePartitioning", "rangePartitioning"):
+        partitioning = table_schema.get(key) or {}
+        field = partitioning.get("Field") or partitioning.get("field")
+        if field:
+            required.add(field.lower())
+    clustering = table_schema.get("Clustering") or table_schema.get("clustering") or {}
+    for field in clustering.get("Fields") or clustering.get("fields") or []:
+        required.add(field.lower())
+    return required
+
+
+def _with_fields(table_schema, fields):
+    if isinstance(table_schema, list):
+        return fields
+    pruned = json.loads(json.dumps(table_schema))
+    container, key = _field_list(pruned)
+    container[key] = fields
+    return pruned
+
+
+def parse_column_descriptions(semantic_context):
+    """Reads `- `column`: description` lines from the Dataplex semantic context."""
+    descriptions = {}
+    for line in (semantic_context or "").splitlines():
+        match = _DESCRIPTION_RE.search(line)
+        if match:
+            descriptions[match.group(1).split(".")[-1].lower()] = match.group(2).strip()
+    return descriptions
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def prune_schema(schema, question, descriptions=None, embed=None, max_columns=12, embedding_weight=2.0):
+    """
+    Scores tables and columns against `question` and drops the unrelated ones.
+    Tables with at most `max_columns` columns keep all of them, as do tables
+    whose layout isn't recognised. Returns (pruned_schema, pruned) where
+    `pruned` maps each table to the columns that were removed, with tables
+    removed entirely mapped to None.
+    """
+    descriptions = descriptions or {}
+    question_tokens = _tokens(question)
+    question_embedding = embed(question) if embed else None
+
+    def _score(text):
+        score = _overlap(question_tokens, _tokens(text))
+        if question_embedding is not None:
+            score += embedding_weight * max(_cosine(question_embedding, embed(text)), 0.0)
+        return score
+
+    table_scores, column_scores = {}, {}
+    for table, table_schema in schema.items():
+        fields = _fields(table_schema) or []
+        column_scores[table] = {}
+        for field in fields:
+            name = _field_name(field) if isinstance(field, dict) else None
+            if not name:
+                continue
+            description = _field_description(field) or descriptions.get(name.lower(), "")
+            column_scores[table][name] = 2 * _overlap(question_tokens, _tokens(name)) + (
+                _score(description) if description else 0.0
+            )
+        best_columns = sorted(column_scores[table].values(), reverse=True)[:3]
+        table_scores[table] = 2 * _score(table.split(".")[-1]) + sum(best_columns)
+
+    kept_tables = [table for table, score in table_scores.items() if score > 0]
+    if not kept_tables:
+        kept_tables = list(schema)
+
+    pruned_schema, pruned = {}, {}
+    for table, table_schema in schema.items():
+        if table not in kept_tables:
+            pruned[table] = None
+            continue
+        fields = _fields(table_schema)
+        if not fields or len(fields) <= max_columns or any(not isinstance(f, dict) for f in fields):
+            pruned_schema[table] = table_schema
+            continue
+        if not any(score > 0 for score in column_scores[table].values()):
+            pruned_schema[table] = table_schema
+            continue
+        required = _required_columns(table_schema)
+        kept = [
+            field for field in fields
+            if column_scores[table].get(_field_name(field), 0) > 0
+            or (_field_name(field) or "").lower() in required
+        ]
+        pruned_schema[table] = _with_fields(table_schema, kept)
+        removed = [_field_name(field) for field in fields if field not in kept]
+        if removed:
+            pruned[table] = removed
+    return pruned_schema, pruned
+
+
+def reexpand_schema(state, validation_result):
+    """
+    Returns the state changes that restore the full schema when a failed
+    validation mentions a column or table the pruner removed, else {}.
+    """
+    pruned = state.get("pruned_columns") or {}
+    full_schema = state.get("full_schema")
+    if not pruned or not full_schema or not validation_result:
+        return {}
+
+    mentioned = []
+    for table, columns in pruned.items():
+        names = [table.split(".")[-1]] if columns is None else columns
+        for name in names:
+            if re.search(rf"(?<![\w]){re.escape(name)}(?![\w])", validation_result, re.IGNORECASE):
+                mentioned.append(name)
+    if not mentioned:
+        return {}
+    return {"schema": full_schema, "pruned_columns": None, "schema_reexpanded": mentioned}
+
+
+class SchemaPruner(BaseAgent):
+    """
+    Reduces `schema` to the tables and columns relevant to the question. The
+    unpruned schema is kept in `full_schema` so the loop can restore it.
+    """
+
+    max_columns: int = 12
+    use_descriptions: bool = False
+    embed: Optional[Any] = None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        schema = parse_json_text(state.get("schema")) if isinstance(state.get("schema"), str) else state.get("schema")
+        question = user_question(ctx)
+        if not isinstance(schema, dict) or not question:
+            return
+
+        descriptions = parse_column_descriptions(state.get("semantic_context")) if self.use_descriptions else {}
+        pruned_schema, pruned = prune_schema(
+            schema, question, descriptions, self.embed, max_columns=self.max_columns
+        )
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                "full_schema": state.get("schema"),
+                "schema": json.dumps(pruned_schema),
+                "pruned_columns": pruned or None,
+            }),
+        )
+
+
+def create_schema_pruner():
+    return SchemaPruner(
+        name="schema_pruner",
+        description="Drops tables and columns unrelated to the question from the schema.",
+        max_columns=SCHEMA_PRUNING_MAX_COLUMNS,
+        use_descriptions=DATAPLEX_ENABLED,
+        embed=hashed_embedding if SCHEMA_PRUNING_SCORING == "hashed" else None
+    )
@@ -12,14 +12,132 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import LlmAgent, SequentialAgent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from .config import mcp_connection_params
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, List
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from .config import (
+    SEMANTIC_ENRICHER_MODE,
+    DATAPLEX_SEARCH_PAGE_SIZE,
+    DATAPLEX_LOOKUP_CONCURRENCY,
+    DATAPLEX_ASPECT_TYPES,
+    DATAPLEX_SUMMARY_ENABLED,
+    DATAPLEX_INDEX_PATH,
+    DATAPLEX_INDEX_LIMIT,
+    DATAPLEX_INDEX_SIMILARITY,
+    TERM_EXTRACTOR_MODE,
+    TERM_GLOSSARY_PATH,
+    TERM_FUZZY_CUTOFF,
+)
+from .mcp_pool import create_mcp_toolset
+from .dataplex_metadata import (
+    build_semantic_context, describe_entry, entry_parent, parse_terms, table_entries, table_ref
+)
+from .dataplex_index import DataplexIndex
+from .mcp_tools import McpToolError, call_mcp_tool, parse_json_text
+from .term_matcher import GlossaryTermExtractor, load_glossary
+from .lazy import lazy_singletons
 
-def create_term_extractor():
+logger = logging.getLogger(__name__)
+
+_LOOKUP_VIEW_FULL = 2
+_LOOKUP_VIEW_CUSTOM = 3
+
+
+class DataplexEnricher(BaseAgent):
+    """
+    Builds `semantic_context` and `filtered_table_list` without an LLM: one
+    `search_entries` call per extracted term (concurrently), deduplicated to
+    BigQuery tables, then `lookup_entry` for each table with at most
+    `lookup_concurrency` calls in flight. An optional summarizer (its single
+    sub-agent) may condense the context afterwards.
+
+    With an `index` (a DataplexIndex), the terms are answered from the local
+    snapshot when it has matches; live results on a miss are added to it.
+    """
+
+    toolset: Any
+    page_size: int = 10
+    lookup_concurrency: int = 8
+    aspect_types: List[str] = []
+    index: Any = None
+    index_limit: int = 5
+    index_similarity: float = 0.3
+
+    async def _search(self, ctx, term):
+        try:
+            text = await call_mcp_tool(
+                self.toolset, ctx, "search_entries", query=term, pageSize=self.page_size
+            )
+        except McpToolError as e:
+            logger.warning("Dataplex search for %r failed: %s", term, e)
+            return {}
+        return table_entries(text)
+
+    async def _lookup(self, ctx, semaphore, name, entry):
+        args = {"name": entry_parent(name), "entry": name, "view": _LOOKUP_VIEW_FULL}
+        if self.aspect_types:
+            args.update(view=_LOOKUP_VIEW_CUSTOM, aspectTypes=self.aspect_types)
+        async with semaphore:
+            try:
+                text = await call_mcp_tool(self.toolset, ctx, "lookup_entry", **args)
+            except McpToolError as e:
+                logger.warning("Dataplex lookup for %s failed: %s", name, e)
+                return entry
+        looked_up = parse_json_text(text)
+        return looked_up if isinstance(looked_up, dict) else entry
+
+    async def _search_live(self, ctx, terms):
+        entries = {}
+        for found in await asyncio.gather(*(self._search(ctx, term) for term in terms)):
+            for name, entry in found.items():
+                entries.setdefault(name, entry)
+
+        semaphore = asyncio.Semaphore(self.lookup_concurrency)
+        looked_up = await asyncio.gather(
+            *(self._lookup(ctx, semaphore, name, entry) for name, entry in entries.items())
+        )
+        if self.index is not None:
+            for entry in looked_up:
+                self.index.upsert(entry)
+        return {
+            table_ref(entries[name]): describe_entry(entry)
+            for name, entry in zip(entries, looked_up)
+        }
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        terms = parse_terms(ctx.session.state.get("extracted_terms"))
+        tables = {}
+        if self.index is not None and terms:
+            tables = self.index.search(terms, self.index_limit, self.index_similarity)
+        source = "index" if tables else "live"
+
+        if not tables:
+            tables = await self._search_live(ctx, terms)
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                "semantic_context": build_semantic_context(tables) if tables else "",
+                "filtered_table_list": list(tables),
+                "semantic_source": source,
+            }),
+        )
+        for sub_agent in self.sub_agents:
+            async for event in sub_agent.run_async(ctx):
+                yield event
+
+
+def create_term_extractor(name="term_extractor"):
     return LlmAgent(
         model="gemini-2.5-flash",
-        name="term_extractor",
+        name=name,
         output_key="extracted_terms",
         instruction="""
 You are the Term Extractor.
@@ -29,12 +147,17 @@ Output a JSON array of strings containing the identified business terms.
 """
     )
 
-def create_dataplex_searcher():
-    dataplex_tools = McpToolset(
-        connection_params=mcp_connection_params,
-        tool_filter=['search_entries', 'lookup_entry']
+def create_glossary_term_extractor():
+    return GlossaryTermExtractor(
+        name="term_extractor",
+        description="Extracts business terms by matching the question against the glossary.",
+        glossary=load_glossary(DATAPLEX_INDEX_PATH, TERM_GLOSSARY_PATH, TERM_FUZZY_CUTOFF),
+        sub_agents=[create_term_extractor(name="term_extractor_llm")]
     )
 
+def create_dataplex_searcher():
+    dataplex_tools = create_mcp_toolset(['search_entries', 'lookup_entry'])
+
     return LlmAgent(
         model="gemini-2.5-pro",
         name="dataplex_searcher",
@@ -145,13 +268,59 @@ Logical operators are case-sensitive. `OR` and `AND` are acceptable whereas `or`
         tools=[dataplex_tools]
     )
 
-def create_semantic_enricher():
+def create_dataplex_enricher(use_index=False):
+    dataplex_tools = create_mcp_toolset(['search_entries', 'lookup_entry'])
+
+    sub_agents = []
+    if DATAPLEX_SUMMARY_ENABLED:
+        sub_agents.append(LlmAgent(
+            model="gemini-2.5-flash",
+            name="dataplex_summarizer",
+            output_key="semantic_context",
+            include_contents="none",
+            instruction="""
+You are the Dataplex Summarizer.
+Condense the semantic context below for a SQL author. Keep the sections
+## Relevant Tables, ## Column Descriptions and ## Business Rules, keep every
+table name, column name and formula exactly as written, and drop anything
+that does not help write SQL for the user's question.
+
+{semantic_context?}
+"""
+        ))
+
+    return DataplexEnricher(
+        name="dataplex_searcher",
+        description="Looks up Dataplex metadata for the extracted terms.",
+        toolset=dataplex_tools,
+        page_size=DATAPLEX_SEARCH_PAGE_SIZE,
+        lookup_concurrency=DATAPLEX_LOOKUP_CONCURRENCY,
+        aspect_types=DATAPLEX_ASPECT_TYPES,
+        index=DataplexIndex(DATAPLEX_INDEX_PATH) if use_index else None,
+        index_limit=DATAPLEX_INDEX_LIMIT,
+        index_similarity=DATAPLEX_INDEX_SIMILARITY,
+        sub_agents=sub_agents
+    )
+
+def create_semantic_enricher(mode=SEMANTIC_ENRICHER_MODE, term_mode=TERM_EXTRACTOR_MODE):
+    if mode == "llm":
+        searcher = create_dataplex_searcher()
+    else:
+        searcher = create_dataplex_enricher(use_index=mode == "index")
+    extractor = (
+        create_glossary_term_extractor()
+        if term_mode == "glossary"
+        else create_term_extractor()
+    )
     return SequentialAgent(
         name="semantic_enricher",
         description="Enriches the query with semantic context from Dataplex.",
-        sub_agents=[create_term_extractor(), create_dataplex_searcher()]
+        sub_agents=[extractor, searcher]
     )
 
-term_extractor = create_term_extractor()
-dataplex_searcher = create_dataplex_searcher()
-semantic_enricher = create_semantic_enricher()
+__getattr__ = lazy_singletons(
+    __name__,
+    term_extractor=create_term_extractor,
+    dataplex_searcher=create_dataplex_searcher,
+    semantic_enricher=create_semantic_enricher,
+)
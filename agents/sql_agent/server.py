@@ -0,0 +1,257 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Production HTTP entry point: `python -m agents.sql_agent.server` (`poe serve`).
+
+`POST /query` with `{"question": ..., "user_id": ..., "session_id": ...}` runs
+`root_agent` for one question and returns the answer, the validated SQL and
+the request's timing summary. All requests run as tasks on one asyncio event
+loop and share the MCP session pool.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import InMemoryRunner
+from google.genai.types import Content, Part
+from pydantic import BaseModel
+from .config import (
+    SERVE_MAX_CONCURRENT_REQUESTS,
+    SERVE_MAX_QUEUED_REQUESTS,
+    SERVE_QUEUE_TIMEOUT_SECONDS,
+    SERVE_REQUEST_TIMEOUT_SECONDS,
+    SERVE_MAX_CONCURRENT_LLM_CALLS,
+    SERVE_DRAIN_SECONDS,
+)
+from .mcp_pool import close_mcp_pools, mcp_pool_metrics
+from .single_flight import answer_authors
+from .sql_generator_loop import model_router, prompt_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Lets at most `max_concurrent` requests run at once. Up to `max_queued`
+    more wait for a slot, each for at most `queue_timeout` seconds; anything
+    beyond that is rejected straight away, so overload shows up as fast 429s
+    rather than ever-growing latency. `drain` waits for the running ones.
+    """
+
+    def __init__(self, max_concurrent=32, max_queued=64, queue_timeout=30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.stats = {"admitted": 0, "completed": 0, "rejected": 0, "queue_timeouts": 0}
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self._slots.locked() and self.queued >= self.max_queued:
+            self.stats["rejected"] += 1
+            raise Overloaded("queue full")
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["queue_timeouts"] += 1
+            raise Overloaded("queue timeout")
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.stats["completed"] += 1
+            self._slots.release()
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout):
+        """
+        Waits up to `timeout` seconds for running requests; False if some
+        remain. uvicorn has stopped accepting connections by the time the
+        app's lifespan calls this, so it doesn't need to refuse new ones.
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def metrics(self):
+        return {**self.stats, "in_flight": self.in_flight, "queued": self.queued}
+
+
+_unlimited_classes = {}
+
+
+def limit_llm_concurrency(max_calls, model="gemini-2.5-pro"):
+    """
+    Re-registers the model class serving `model` (and every model it
+    supports) so that at most `max_calls` of its calls run at once in this
+    process. Returns the semaphore, or None when `max_calls` is 0.
+    """
+    if not max_calls:
+        return None
+    base = LLMRegistry.resolve(model)
+    base = _unlimited_classes.get(base, base)
+    slots = asyncio.Semaphore(max_calls)
+
+    class ConcurrencyLimitedLlm(base):
+        @classmethod
+        def supported_models(cls):
+            return base.supported_models()
+
+        async def generate_content_async(self, llm_request, stream=False):
+            async with slots:
+                async for response in super().generate_content_async(llm_request, stream):
+                    yield response
+
+    ConcurrencyLimitedLlm.__name__ = f"ConcurrencyLimited{base.__name__}"
+    _unlimited_classes[ConcurrencyLimitedLlm] = base
+    LLMRegistry.register(ConcurrencyLimitedLlm)
+    LLMRegistry.resolve.cache_clear()
+    return slots
+
+
+class QueryRequest(BaseModel):
+    question: str
+    user_id: str = "anonymous"
+    session_id: Optional[str] = None
+
+
+def create_app(
+    agent=None,
+    max_concurrent_requests=SERVE_MAX_CONCURRENT_REQUESTS,
+    max_queued_requests=SERVE_MAX_QUEUED_REQUESTS,
+    queue_timeout=SERVE_QUEUE_TIMEOUT_SECONDS,
+    request_timeout=SERVE_REQUEST_TIMEOUT_SECONDS,
+    max_llm_calls=SERVE_MAX_CONCURRENT_LLM_CALLS,
+    drain_seconds=SERVE_DRAIN_SECONDS,
+):
+    """The FastAPI app serving `agent` (by default `root_agent`)."""
+    if agent is None:
+        from .agent import root_agent as agent
+
+    runner = InMemoryRunner(agent=agent, app_name=agent.name)
+    admission = AdmissionController(max_concurrent_requests, max_queued_requests, queue_timeout)
+    authors = answer_authors(agent)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        limit_llm_concurrency(max_llm_calls)
+        yield
+        if not await admission.drain(drain_seconds):
+            logger.warning("%d requests still running after %.0fs of draining", admission.in_flight, drain_seconds)
+        await close_mcp_pools()
+
+    app = FastAPI(title=agent.name, lifespan=lifespan)
+
+    async def run_query(request):
+        session = None
+        if request.session_id:
+            session = await runner.session_service.get_session(
+                app_name=runner.app_name, user_id=request.user_id, session_id=request.session_id
+            )
+        if session is None:
+            session = await runner.session_service.create_session(
+                app_name=runner.app_name, user_id=request.user_id, session_id=request.session_id
+            )
+        answer = []
+        async for event in runner.run_async(
+            user_id=request.user_id,
+            session_id=session.id,
+            new_message=Content(role="user", parts=[Part(text=request.question)]),
+        ):
+            if event.author in authors and not event.partial and event.content and event.content.parts:
+                answer += [part.text for part in event.content.parts if part.text]
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=request.user_id, session_id=session.id
+        )
+        return {
+            "session_id": session.id,
+            "answer": "\n\n".join(answer),
+            "sql": session.state.get("valid_sql"),
+            "loop_termination": session.state.get("loop_termination"),
+            "model_route": session.state.get("model_route"),
+            "timing_summary": session.state.get("timing_summary"),
+        }
+
+    @app.post("/query")
+    async def query(request: QueryRequest):
+        started = time.perf_counter()
+        try:
+            async with admission.slot():
+                response = await asyncio.wait_for(run_query(request), request_timeout)
+        except Overloaded as e:
+            return JSONResponse({"error": e.reason}, status_code=429, headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            return JSONResponse({"error": "request timed out"}, status_code=504)
+        response["server_seconds"] = round(time.perf_counter() - started, 4)
+        return response
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {
+            "requests": admission.metrics(),
+            "mcp_pools": mcp_pool_metrics(),
+            "prompt_cache": prompt_cache.stats,
+            "model_routes": model_router.metrics() if model_router else None,
+        }
+
+    app.state.admission = admission
+    app.state.runner = runner
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    # uvicorn stops accepting connections on SIGTERM; the app's lifespan then drains running requests.
+    uvicorn.run(create_app(), host=args.host, port=args.port, timeout_graceful_shutdown=SERVE_DRAIN_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncGenerator
+from google.adk.agents import SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai.types import Content, Part
+from .result_pager import continuation_tokens, reissue_continuations
+from .sql_cache import normalize_question, user_question
+
+logger = logging.getLogger(__name__)
+
+_FLIGHT_KEY = "temp:single_flight_key"
+# State the leader's run leaves behind that a coalesced request should see too.
+SHARED_STATE_KEYS = ("valid_sql", "loop_termination")
+
+
+class FlightCancelled(Exception):
+    """The in-flight run a caller was waiting for was cancelled."""
+
+
+class SingleFlight:
+    """
+    At most one in-flight run per key: callers that arrive while a run is in
+    flight wait for it and share its result (or its exception). `do` wraps a
+    coroutine; `lead`/`finish`/`wait` split the same protocol across the
+    before and after callbacks of an agent, and `SingleFlightAgent` calls
+    `abandon` with the lead's `owner` when the run fails or is cancelled. A
+    lead older than `max_age` seconds is presumed lost and is
+    replaced by the next caller.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._flights = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    def _in_flight(self, key):
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        future, started, _ = flight
+        if self.max_age is not None and time.monotonic() - started > self.max_age:
+            self._flights.pop(key)
+            future.cancel()
+            return None
+        return future
+
+    def lead(self, key, owner=None):
+        """Registers the caller as the runner for `key`; False if a run is already in flight."""
+        if self._in_flight(key) is not None:
+            return False
+        self._flights[key] = (asyncio.get_running_loop().create_future(), time.monotonic(), owner)
+        self.stats["leaders"] += 1
+        return True
+
+    def finish(self, key, result=None, error=None):
+        future, _, _ = self._flights.pop(key, (None, None, None))
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            future.exception()  # Nobody may be waiting; don't log it as unretrieved.
+        else:
+            future.set_result(result)
+
+    def abandon(self, owner, error=None):
+        """Ends the runs `owner` leads that are still in flight, failing them with `error`."""
+        if owner is None:
+            return
+        for key in [key for key, (_, _, lead_owner) in self._flights.items() if lead_owner == owner]:
+            self.finish(key, error=error or RuntimeError("The run ended without a result."))
+
+    async def wait(self, key, timeout=None):
+        """
+        The in-flight run's result. Raises KeyError when nothing is in flight
+        and FlightCancelled when the run is cancelled.
+        """
+        future = self._in_flight(key)
+        if future is None:
+            raise KeyError(key)
+        self.stats["coalesced"] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            raise FlightCancelled(key) from None
+
+    async def do(self, key, fn):
+        """Returns `await fn()`, or the result of an identical call already in flight."""
+        while self._in_flight(key) is not None:
+            try:
+                return await self.wait(key)
+            except FlightCancelled:
+                pass  # The leader was cancelled, not us: try again.
+        self.lead(key)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+
+def call_key(tool_name, args):
+    return tool_name, json.dumps(args or {}, sort_keys=True, default=str)
+
+
+def _agent_names(agent):
+    names = {agent.name}
+    for sub_agent in agent.sub_agents:
+        names |= _agent_names(sub_agent)
+    return names
+
+
+def answer_authors(agent):
+    """Authors of a request's answer: the last stage and its sub-agents, and the agent itself."""
+    return (_agent_names(agent.sub_agents[-1]) if agent.sub_agents else set()) | {agent.name}
+
+
+def flight_owner(user_id, session_id):
+    """The owner of the runs a request leads, for `SingleFlight.abandon`."""
+    return f"{user_id}/{session_id}"
+
+
+def create_single_flight_callbacks(flight, config_key="", wait_seconds=None, per_user=False, pager=None):
+    """
+    Returns (before, after) agent callbacks for the root agent. The first
+    request for a normalized question (under `config_key`, the session's
+    result format and, with `per_user`, the user) runs the pipeline.
+    Identical requests that arrive while it runs wait for it, up to
+    `wait_seconds`. They answer with its text and `SHARED_STATE_KEYS`, and
+    `coalesced` is set in their state. Continuation tokens in the text are
+    reissued from `pager` for each of them, or dropped. A waiter whose run
+    times out or fails runs the pipeline itself. Install them on a
+    `SingleFlightAgent` for `flight`, so a failed run releases its waiters
+    at once rather than after `wait_seconds`.
+    """
+
+    def _key(callback_context):
+        question = normalize_question(user_question(callback_context))
+        if not question:
+            return None
+        state = callback_context.state
+        user = callback_context._invocation_context.user_id if per_user else None
+        return json.dumps(
+            [config_key, question, state.get("result_format"), state.get("result_narrative"), user]
+        )
+
+    async def join_in_flight(callback_context):
+        key = _key(callback_context)
+        ctx = callback_context._invocation_context
+        if key is None or flight.lead(key, flight_owner(ctx.user_id, ctx.session.id)):
+            callback_context.state[_FLIGHT_KEY] = key
+            if callback_context.state.get("coalesced"):
+                callback_context.state["coalesced"] = False
+            return None
+        try:
+            shared = await flight.wait(key, wait_seconds)
+        except Exception as e:
+            # The run finished before we could join it, timed out, or failed.
+            logger.info("Running a coalesced question on its own after %s", type(e).__name__)
+            return None
+        for name, value in shared["state"].items():
+            callback_context.state[name] = value
+        callback_context.state["coalesced"] = True
+        answer = reissue_continuations(shared["answer"], pager, shared["pages"])
+        return Content(role="model", parts=[Part(text=answer)])
+
+    def share_result(callback_context):
+        key = callback_context.state.get(_FLIGHT_KEY)
+        if key is None:
+            return None
+        ctx = callback_context._invocation_context
+        authors = answer_authors(ctx.agent)
+        answer = [
+            part.text
+            for event in ctx.session.events
+            if event.invocation_id == ctx.invocation_id and event.author in authors
+            and not event.partial and event.content and event.content.parts
+            for part in event.content.parts if part.text
+        ]
+        answer = "\n\n".join(answer)
+        # The leader redeems its own tokens; waiters get fresh ones for the same rows.
+        pages = {token: pager.peek(token) for token in continuation_tokens(answer)} if pager else {}
+        flight.finish(key, {
+            "answer": answer,
+            "state": {name: callback_context.state.get(name) for name in SHARED_STATE_KEYS},
+            "pages": {token: entry for token, entry in pages.items() if entry is not None},
+        })
+        callback_context.state[_FLIGHT_KEY] = None
+        return None
+
+    return join_in_flight, share_result
+
+
+class SingleFlightAgent(SequentialAgent):
+    """
+    A SequentialAgent that abandons the runs it leads in `flight` when its
+    sub-agents raise, are cancelled, or end the invocation before the after
+    callbacks share a result. This covers every runner, not only the server.
+    """
+
+    flight: Any = None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        owner = flight_owner(ctx.user_id, ctx.session.id)
+        try:
+            async for event in super()._run_async_impl(ctx):
+                yield event
+        except (Exception, asyncio.CancelledError) as e:
+            if self.flight:
+                self.flight.abandon(owner, e)
+            raise
+        except GeneratorExit:
+            if self.flight:
+                self.flight.abandon(owner, asyncio.CancelledError())
+            raise
+        if ctx.end_invocation and self.flight:
+            self.flight.abandon(owner)
@@ -0,0 +1,242 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import inspect
+import json
+import math
+import re
+import unicodedata
+from collections import OrderedDict
+from google.genai.types import Content, Part
+from .mcp_tools import parse_json_text
+
+_FILLER_WORDS = {
+    "a", "an", "the", "please", "me", "show", "tell", "give", "can", "could",
+    "you", "would", "i", "want", "know", "what", "whats", "is", "are",
+}
+_LITERAL_RE = re.compile(r"\d+(?:\.\d+)?|'[^']*'|\"[^\"]*\"")
+# Words that change the query's time window, or its ordering and direction, while barely moving the embedding.
+_QUALIFIER_WORDS = {
+    "hour", "hours", "day", "days", "daily", "week", "weeks", "weekly", "month", "months", "monthly",
+    "quarter", "quarters", "quarterly", "year", "years", "yearly", "annual", "today", "yesterday",
+    "tonight", "weekend", "ytd", "mtd", "this", "last", "past", "previous", "prior", "next", "current",
+    "recent", "latest", "earliest", "since", "until", "before", "after",
+    "top", "bottom", "least", "most", "highest", "lowest", "largest", "smallest", "biggest", "fewest",
+    "best", "worst", "max", "maximum", "min", "minimum", "first", "rising", "falling", "increasing",
+    "decreasing", "growing", "declining", "gaining", "losing", "up", "down", "ascending", "descending",
+    "asc", "desc", "not", "without", "except", "excluding",
+}
+_SENTENCE_RE = re.compile(r"[^.!?]+")
+_EMBEDDING_DIM = 256
+
+
+def normalize_question(question):
+    """Lower-cases, strips punctuation and filler words so rewordings share a key."""
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    words = re.findall(r"[\w.]+", text)
+    return " ".join(word.strip(".") for word in words if word.strip(".") not in _FILLER_WORDS)
+
+
+def question_qualifiers(question):
+    """
+    What must match exactly for a semantic hit: numbers and quoted strings
+    ("top 5" vs "top 10"), time-window words ("last week" vs "this month")
+    and ordering or direction words ("top rising" vs "least rising").
+    """
+    text = (question or "").lower()
+    words = set(re.findall(r"[a-z]+", _LITERAL_RE.sub(" ", text)))
+    return sorted(_LITERAL_RE.findall(text)) + sorted(words & _QUALIFIER_WORDS)
+
+
+def question_entities(question):
+    """Lower-cased capitalised words past the start of a sentence, taken as entity names ("New York")."""
+    entities = set()
+    for sentence in _SENTENCE_RE.findall(question or ""):
+        for word in re.findall(r"[^\W\d_][\w'-]*", sentence)[1:]:
+            if word[0].isupper() and word.lower() not in _FILLER_WORDS:
+                entities.add(word.lower())
+    return entities
+
+
+def _same_entities(question, other):
+    # Compared against the other question's words, so "Google Trends" still matches "google trends".
+    words, other_words = set(normalize_question(question).split()), set(normalize_question(other).split())
+    return question_entities(question) <= other_words and question_entities(other) <= words
+
+
+def schema_fingerprint(schema):
+    parsed = parse_json_text(schema) if isinstance(schema, str) else schema
+    canonical = json.dumps(parsed, sort_keys=True) if parsed is not None else str(schema)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def schema_scope(schema):
+    """Identifies the set of tables a schema covers, independent of their definitions."""
+    parsed = parse_json_text(schema) if isinstance(schema, str) else schema
+    tables = sorted(parsed) if isinstance(parsed, dict) else []
+    return hashlib.sha256(json.dumps(tables).encode()).hexdigest()
+
+
+def hashed_embedding(text):
+    """
+    Dependency-free embedding: hashed word and character-trigram counts,
+    L2-normalised. Good enough to match rewordings of the same question.
+    """
+    vector = [0.0] * _EMBEDDING_DIM
+    words = normalize_question(text).split()
+    features = words + [
+        f"#{word[i:i + 3]}" for word in words for i in range(max(len(word) - 2, 1))
+    ]
+    for feature in features:
+        digest = hashlib.md5(feature.encode()).digest()
+        vector[int.from_bytes(digest[:4], "little") % _EMBEDDING_DIM] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def genai_embedder(model="text-embedding-004"):
+    """Returns an async embedder backed by the Gemini embeddings API."""
+    from google import genai
+
+    client = genai.Client()
+
+    async def _embed(text):
+        response = await client.aio.models.embed_content(model=model, contents=text)
+        values = response.embeddings[0].values
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    return _embed
+
+
+class SqlCache:
+    """
+    Maps (normalised question, schema fingerprint) to validated SQL.
+    Lookups try the exact normalised key first and then the nearest cached
+    question by embedding similarity whose qualifiers (`question_qualifiers`)
+    and entity names are the same. Entries are evicted by LRU order and
+    whenever the schema behind their table set changes.
+    """
+
+    def __init__(self, max_entries=512, similarity_threshold=0.85):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._scope_fingerprints = {}
+
+    def _evict_stale(self, scope, fingerprint):
+        if self._scope_fingerprints.get(scope, fingerprint) != fingerprint:
+            for key in [k for k, v in self._entries.items() if v["scope"] == scope]:
+                del self._entries[key]
+        self._scope_fingerprints[scope] = fingerprint
+
+    def get(self, question, schema, embedding=None):
+        """Returns (sql, match, similarity) or None."""
+        fingerprint, scope = schema_fingerprint(schema), schema_scope(schema)
+        self._evict_stale(scope, fingerprint)
+
+        key = (normalize_question(question), fingerprint)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]["sql"], "exact", 1.0
+
+        if embedding is None:
+            return None
+        qualifiers = question_qualifiers(question)
+        best_key, best_similarity = None, self.similarity_threshold
+        for candidate_key, entry in self._entries.items():
+            if candidate_key[1] != fingerprint or entry["qualifiers"] != qualifiers:
+                continue
+            if not _same_entities(question, entry["question"]):
+                continue
+            similarity = sum(a * b for a, b in zip(embedding, entry["embedding"]))
+            if similarity >= best_similarity:
+                best_key, best_similarity = candidate_key, similarity
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]["sql"], "semantic", best_similarity
+
+    def put(self, question, schema, sql, embedding=None):
+        fingerprint, scope = schema_fingerprint(schema), schema_scope(schema)
+        self._evict_stale(scope, fingerprint)
+        self._entries[(normalize_question(question), fingerprint)] = {
+            "sql": sql,
+            "scope": scope,
+            "embedding": embedding or [],
+            "question": question,
+            "qualifiers": question_qualifiers(question),
+        }
+        self._entries.move_to_end((normalize_question(question), fingerprint))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def user_question(context):
+    content = context.user_content
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _cache_schema(state):
+    # The pruned `schema` differs per question; key on the schema it was pruned from.
+    return state.get("full_schema") or state.get("schema")
+
+
+def create_sql_cache_callbacks(cache, embed=hashed_embedding):
+    """
+    Returns (before, after) agent callbacks for `sql_loop`. On a hit the
+    before callback writes `valid_sql` and returns content, which ends the
+    loop's run so the pipeline continues straight to `final_responder`.
+    """
+
+    async def _embedding(question):
+        vector = embed(question)
+        return await vector if inspect.isawaitable(vector) else vector
+
+    async def lookup_cached_sql(callback_context):
+        question = user_question(callback_context)
+        schema = _cache_schema(callback_context.state)
+        if not question or not schema:
+            return None
+
+        hit = cache.get(question, schema) or cache.get(
+            question, schema, await _embedding(question)
+        )
+        if hit is None:
+            callback_context.state["valid_sql"] = None
+            callback_context.state["sql_cache"] = {"hit": False}
+            return None
+
+        sql, match, similarity = hit
+        callback_context.state["valid_sql"] = sql
+        callback_context.state["sql_cache"] = {
+            "hit": True, "match": match, "similarity": round(similarity, 4)
+        }
+        return Content(
+            role="model",
+            parts=[Part(text=f"Reusing validated SQL from a previous {match} match:\n```sql\n{sql}\n```")]
+        )
+
+    async def store_valid_sql(callback_context):
+        question = user_question(callback_context)
+        schema = _cache_schema(callback_context.state)
+        valid_sql = callback_context.state.get("valid_sql")
+        if question and schema and valid_sql:
+            cache.put(question, schema, valid_sql, await _embedding(question))
+        return None
+
+    return lookup_cached_sql, store_valid_sql
@@ -12,21 +12,526 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import LoopAgent, LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+import asyncio
+import logging
+import re
+import time
+from typing import Any, AsyncGenerator
+from google.adk.agents import BaseAgent, LoopAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
 from google.adk.tools.tool_context import ToolContext
-from .config import mcp_connection_params, DATAPLEX_ENABLED
+from google.genai.types import Content, GenerateContentConfig, Part
+from pydantic import Field
+from .config import (
+    DATAPLEX_ENABLED,
+    SQL_VALIDATOR_MODE,
+    SQL_REVIEWER_MODE,
+    SQL_PREVALIDATION_ENABLED,
+    SQL_REPAIR_ENABLED,
+    SQL_REPAIR_MAX_ATTEMPTS,
+    SQL_REPAIR_NAME_CUTOFF,
+    SQL_CACHE_ENABLED,
+    SQL_CACHE_SIZE,
+    SQL_CACHE_SIMILARITY,
+    SQL_CACHE_EMBEDDINGS,
+    SQL_GENERATION_MODE,
+    SQL_CANDIDATES,
+    SQL_CANDIDATE_WINDOW,
+    SQL_LOOP_MAX_ITERATIONS,
+    SQL_LOOP_ADAPTIVE_ENABLED,
+    SQL_LOOP_DEADLINE_SECONDS,
+    SQL_LOOP_TOKEN_BUDGET,
+    SQL_LOOP_STRATEGIES,
+    SQL_LOOP_FALLBACK_MODEL,
+    SQL_BYTE_BUDGET_ENABLED,
+    SQL_MAX_BYTES_PER_QUERY,
+    SQL_MAX_BYTES_PER_USER,
+    SQL_USER_BYTES_WINDOW_SECONDS,
+    PROMPT_CACHE_ENABLED,
+    PROMPT_CACHE_TTL_SECONDS,
+    PROMPT_CACHE_MIN_TOKENS,
+    SCHEMA_PROMPT_FORMAT,
+    SQL_MODEL_ROUTING_ENABLED,
+    SQL_ROUTER_FAST_MODEL,
+    SQL_ROUTER_STRONG_MODEL,
+    SQL_ROUTER_MAX_FAST_TABLES,
+    SQL_ROUTER_MAX_FAST_CUES,
+    SQL_ROUTER_MAX_FAST_FAILURE_RATE,
+)
+from .cost_guard import BUDGET_EXCEEDED, ByteBudget, cost_guidance
+from .mcp_pool import create_mcp_toolset
+from .model_router import ModelRouter, create_model_router_callbacks
+from .prompt_cache import SCHEMA_SECTION, PromptCache, create_prompt_cache_callback
+from .mcp_tools import McpToolError, call_mcp_tool, strip_code_fence
+from .sql_cache import SqlCache, create_sql_cache_callbacks, genai_embedder, hashed_embedding
+from .result_cache import bytes_processed, normalize_sql
+from .schema_format import create_schema_format_callback
+from .schema_pruner import reexpand_schema
+from .sql_prevalidator import PREVALIDATION_FAILED, check_sql
+from .sql_repair import repair_sql
 from .prompts import (
     GENERATOR_SYSTEM_PROMPT,
     VALIDATOR_SYSTEM_PROMPT,
     REVIEWER_SYSTEM_PROMPT
 )
+from .lazy import lazy_singletons
 
-def create_sql_generator_loop():
-    sql_tools = McpToolset(
-        connection_params=mcp_connection_params,
-        tool_filter=['execute_sql']
+logger = logging.getLogger(__name__)
+
+async def dry_run_sql(toolset, ctx, sql_output, schema=None, prevalidate=False, budget=None):
+    """
+    Validates generated SQL (optionally wrapped in a code fence) and returns
+    the `validation_result` text: offline pre-validation first when enabled,
+    then a BigQuery dry run through the `execute_sql` tool. With a `budget`,
+    a query whose dry run processes too many bytes fails with cost guidance.
+    """
+    sql = strip_code_fence(sql_output or "")
+    if not sql:
+        return "dry_run failed: no SQL query was found in `sql`."
+    issues = check_sql(sql, schema) if prevalidate else []
+    if issues:
+        return f"{PREVALIDATION_FAILED}: {' '.join(issues)}"
+    try:
+        result = await call_mcp_tool(toolset, ctx, "execute_sql", sql=sql, dry_run=True)
+    except McpToolError as e:
+        return f"dry_run failed: {e}"
+    num_bytes = bytes_processed(result)
+    logger.info("Dry run would process %s bytes: %s", num_bytes, normalize_sql(sql))
+    problem = budget.check(num_bytes, ctx.user_id) if budget else None
+    if problem:
+        guidance = cost_guidance(sql, schema, ctx.session.state.get("table_layouts"))
+        return f"{BUDGET_EXCEEDED}: {problem} {guidance}"
+    return f"dry_run succeeded\n{result}"
+
+
+async def validate_sql(toolset, ctx, sql_output, schema=None, prevalidate=False, budget=None, repair_attempts=0):
+    """
+    `dry_run_sql`, followed by up to `repair_attempts` rounds of rule-based
+    repair while validation fails for a reason other than the byte budget.
+    Returns (sql_output, validation_result, repair): the repaired SQL and its
+    result when a repair passed, else the original ones. `repair` lists the
+    fixes tried, or is None when no rule applied.
+    """
+    validation_result = await dry_run_sql(toolset, ctx, sql_output, schema, prevalidate, budget)
+    repaired_output, result, fixes = sql_output, validation_result, []
+    for _ in range(repair_attempts):
+        if result.startswith(("dry_run succeeded", BUDGET_EXCEEDED)):
+            break
+        repaired, applied = repair_sql(repaired_output, result, schema, SQL_REPAIR_NAME_CUTOFF)
+        if not repaired:
+            break
+        fixes += applied
+        repaired_output = f"```sql\n{repaired}\n```"
+        result = await dry_run_sql(toolset, ctx, repaired_output, schema, prevalidate, budget)
+    if not fixes:
+        return sql_output, validation_result, None
+    valid = result.startswith("dry_run succeeded")
+    logger.info("SQL repair %s: %s", "succeeded" if valid else "failed", "; ".join(fixes))
+    if valid:
+        return repaired_output, result, {"fixes": fixes, "repaired": True}
+    return sql_output, validation_result, {"fixes": fixes, "repaired": False}
+
+
+def restore_pruned_schema(state, validation_result):
+    """
+    Restores the full schema (`reexpand_schema`) when a failed validation
+    names a column or table the pruner removed, and says so in the result.
+    Returns (validation_result, state changes).
+    """
+    if not validation_result or validation_result.startswith("dry_run succeeded"):
+        return validation_result, {}
+    restored = reexpand_schema(state, validation_result)
+    if restored:
+        validation_result += _restored_note(restored)
+    return validation_result, restored
+
+
+def _restored_note(restored):
+    names = ", ".join(f"`{name}`" for name in restored["schema_reexpanded"])
+    return f" The full schema has been restored, including {names}."
+
+
+class DryRunValidator(BaseAgent):
+    """
+    Dry-runs `state['sql']` through the `execute_sql` tool without an LLM turn
+    and writes the outcome to `validation_result`. When `prevalidate` is set,
+    the SQL is first checked offline against `state['schema']` and the dry run
+    is skipped if that already finds a problem. Dry runs over `budget` (a
+    ByteBudget) are reported as failures. With `repair_attempts`, failures
+    are first repaired in code; a repaired query replaces `sql`. A failure
+    that names a pruned column restores the full schema.
+    """
+
+    toolset: Any
+    prevalidate: bool = False
+    budget: Any = None
+    repair_attempts: int = 0
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        sql, validation_result, repair = await validate_sql(
+            self.toolset, ctx, ctx.session.state.get("sql"),
+            ctx.session.state.get("schema"), self.prevalidate, self.budget, self.repair_attempts
+        )
+        validation_result, restored = restore_pruned_schema(ctx.session.state, validation_result)
+        state_delta = {"validation_result": validation_result, "sql_repair": repair, **restored}
+        if repair and repair["repaired"]:
+            state_delta["sql"] = sql
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=Content(role="model", parts=[Part(text=validation_result)]),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+class ParallelSqlGenerator(BaseAgent):
+    """
+    Runs every sub-agent (SQL generators with different temperatures)
+    concurrently, each on its own branch like a ParallelAgent, and dry-runs
+    each candidate as soon as it is written. The generators' events are
+    yielded as they arrive, so their LLM calls are saved to the session and
+    counted. A candidate whose LLM or tool call raises is kept as invalid.
+    Once the first candidate passes, the others get `selection_window`
+    seconds to finish; the valid candidate with the fewest bytes processed
+    wins and the rest are cancelled. Writes `sql` and `validation_result`
+    like the generator and validator stages it replaces, repairing failed
+    candidates in code first when `repair_attempts` is set.
+    """
+
+    toolset: Any
+    prevalidate: bool = False
+    budget: Any = None
+    repair_attempts: int = 0
+    selection_window: float = 1.0
+
+    async def _candidate(self, ctx: InvocationContext, generator: BaseAgent, events: asyncio.Queue):
+        branch = f"{self.name}.{generator.name}"
+        generator_ctx = ctx.model_copy(update={"branch": f"{ctx.branch}.{branch}" if ctx.branch else branch})
+        sql_output = ""
+        try:
+            async for event in generator.run_async(generator_ctx):
+                if event.is_final_response() and event.content and event.content.parts:
+                    sql_output = "".join(part.text or "" for part in event.content.parts)
+                await events.put(event)
+            sql_output, validation_result, repair = await validate_sql(
+                self.toolset, ctx, sql_output, ctx.session.state.get("schema"),
+                self.prevalidate, self.budget, self.repair_attempts
+            )
+        except Exception as e:
+            logger.warning("SQL candidate %s failed: %s", generator.name, e)
+            sql_output, validation_result, repair = sql_output, f"generation failed: {e}", None
+        valid = validation_result.startswith("dry_run succeeded")
+        return {
+            "generator": generator.name,
+            "sql": sql_output,
+            "validation_result": validation_result,
+            "valid": valid,
+            "repaired": bool(repair and repair["repaired"]),
+            "bytes_processed": bytes_processed(validation_result) if valid else None,
+        }
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        events = asyncio.Queue()
+
+        async def run_candidate(generator):
+            await events.put(await self._candidate(ctx, generator, events))
+
+        tasks = [asyncio.create_task(run_candidate(generator)) for generator in self.sub_agents]
+        results, deadline = [], None
+        try:
+            while len(results) < len(tasks):
+                if events.empty():
+                    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                    try:
+                        item = await asyncio.wait_for(events.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break  # Selection window elapsed.
+                else:
+                    item = events.get_nowait()
+                if isinstance(item, Event):
+                    yield item
+                    continue
+                results.append(item)
+                if deadline is None and item["valid"]:
+                    deadline = time.monotonic() + self.selection_window
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        valid = [result for result in results if result["valid"]]
+        if valid:
+            chosen = min(valid, key=lambda r: (r["bytes_processed"] is None, r["bytes_processed"] or 0))
+        else:
+            order = [generator.name for generator in self.sub_agents]
+            chosen = min(results, key=lambda r: order.index(r["generator"]))
+        validation_result, restored = restore_pruned_schema(ctx.session.state, chosen["validation_result"])
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=Content(role="model", parts=[Part(text=chosen["sql"])]),
+            actions=EventActions(state_delta={
+                "sql": chosen["sql"],
+                "validation_result": validation_result,
+                "sql_candidates": [
+                    {key: result[key] for key in ("generator", "valid", "repaired", "bytes_processed")}
+                    for result in results
+                ],
+                **restored,
+            }),
+        )
+
+
+sql_cache = SqlCache(max_entries=SQL_CACHE_SIZE, similarity_threshold=SQL_CACHE_SIMILARITY)
+
+query_budget = ByteBudget(
+    max_query_bytes=SQL_MAX_BYTES_PER_QUERY,
+    max_user_bytes=SQL_MAX_BYTES_PER_USER,
+    window_seconds=SQL_USER_BYTES_WINDOW_SECONDS,
+) if SQL_BYTE_BUDGET_ENABLED else None
+
+model_router = ModelRouter(
+    fast_model=SQL_ROUTER_FAST_MODEL,
+    strong_model=SQL_ROUTER_STRONG_MODEL,
+    max_fast_tables=SQL_ROUTER_MAX_FAST_TABLES,
+    max_fast_cues=SQL_ROUTER_MAX_FAST_CUES,
+    max_fast_failure_rate=SQL_ROUTER_MAX_FAST_FAILURE_RATE,
+) if SQL_MODEL_ROUTING_ENABLED else None
+
+prompt_cache = PromptCache(ttl_seconds=PROMPT_CACHE_TTL_SECONDS, min_tokens=PROMPT_CACHE_MIN_TOKENS)
+
+REVIEWER_PATHS = ("fast_path", "prevalidation", "budget", "llm")
+
+
+class HybridReviewer(BaseAgent):
+    """
+    Accepts a successful dry run in code: sets `valid_sql` and escalates out
+    of the loop. Offline pre-validation and byte budget failures already
+    carry precise guidance, so the LLM reviewer (its single sub-agent) is
+    only called when the BigQuery dry run failed. A successful dry run is
+    checked against the user's `budget` first (the LLM validator doesn't
+    check it), and accepted queries are charged to it.
+    """
+
+    stats: dict = Field(default_factory=lambda: dict.fromkeys(REVIEWER_PATHS, 0))
+    budget: Any = None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        validation_result = ctx.session.state.get("validation_result") or ""
+        over_budget = None
+        if "dry_run succeeded" in validation_result and self.budget:
+            over_budget = self.budget.check(bytes_processed(validation_result), ctx.user_id)
+        if "dry_run succeeded" in validation_result and not over_budget:
+            path = "fast_path"
+        elif over_budget:
+            path = "budget"
+        elif validation_result.startswith(PREVALIDATION_FAILED):
+            path = "prevalidation"
+        elif validation_result.startswith(BUDGET_EXCEEDED):
+            path = "budget"
+        else:
+            path = "llm"
+        self.stats[path] += 1
+        session_stats = dict.fromkeys(REVIEWER_PATHS, 0)
+        session_stats.update(ctx.session.state.get("reviewer_stats") or {})
+        session_stats[path] += 1
+
+        if path == "fast_path":
+            if self.budget:
+                self.budget.charge(ctx.user_id, bytes_processed(validation_result))
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(
+                    state_delta={
+                        "valid_sql": ctx.session.state.get("sql"),
+                        "guidance": None,
+                        "reviewer_stats": session_stats,
+                        "loop_termination": "valid",
+                    },
+                    escalate=True,
+                ),
+            )
+            return
+
+        if path in ("prevalidation", "budget"):
+            if over_budget:
+                state = ctx.session.state
+                advice = cost_guidance(state.get("sql") or "", state.get("schema"), state.get("table_layouts"))
+                guidance = f"{over_budget} {advice}"
+            else:
+                guidance = validation_result.split(":", 1)[1].strip()
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=Content(role="model", parts=[Part(text=f"SQL is invalid. Guidance for next loop: {guidance}")]),
+                actions=EventActions(
+                    state_delta={"guidance": guidance, "reviewer_stats": session_stats}
+                ),
+            )
+            return
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"reviewer_stats": session_stats}),
+        )
+        async for event in self.sub_agents[0].run_async(ctx):
+            yield event
+
+
+def _error_signature(validation_result):
+    # Positions such as `at [3:17]` move with the SQL text; the error itself doesn't.
+    return " ".join(re.sub(r"\[\d+:\d+\]", "", validation_result or "").split())
+
+
+def _invocation_usage(ctx):
+    """Seconds since the question arrived and tokens spent on it so far."""
+    events = [event for event in ctx.session.events if event.invocation_id == ctx.invocation_id]
+    started = events[0].timestamp if events else time.time()
+    tokens = sum(
+        event.usage_metadata.total_token_count or 0
+        for event in events if event.usage_metadata
     )
+    return time.time() - started, tokens
+
+
+class LoopController(BaseAgent):
+    """
+    The last stage of each failed `sql_loop` iteration. Ends the loop when
+    the generator repeats an earlier query or the dry run repeats an earlier
+    error, when the question's wall-clock `deadline_seconds` or
+    `token_budget` is spent, or when `max_iterations` is reached. Before
+    giving up on a repetition it tries the next of `strategies`:
+    "widen_schema" restores the unpruned schema, and "switch_model" moves
+    the generator to `fallback_model`. The reason is written to
+    `loop_termination`.
+    """
+
+    max_iterations: int = 5
+    deadline_seconds: float = 60.0
+    token_budget: int = 0
+    strategies: list = []
+    fallback_model: str = ""
+
+    def _strategy(self, name, state):
+        if name == "widen_schema" and state.get("pruned_columns") and state.get("full_schema"):
+            return {"schema": state["full_schema"], "pruned_columns": None}, (
+                "The full schema has been restored; check every table and column name against it."
+            )
+        if name == "switch_model" and self.fallback_model:
+            return {"sql_generator_model": self.fallback_model}, (
+                "Previous attempts repeated themselves; write the query afresh."
+            )
+        return None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        history = list(state.get("loop_history") or [])
+        attempt = {
+            "sql": normalize_sql(state.get("sql") or ""),
+            "error": _error_signature(state.get("validation_result")),
+        }
+        repeated = None
+        if any(attempt["sql"] == previous["sql"] for previous in history):
+            repeated = "repeated_sql"
+        elif attempt["error"] and any(attempt["error"] == previous["error"] for previous in history):
+            repeated = "repeated_error"
+        history.append(attempt)
+        state_delta = {"loop_history": history}
+
+        elapsed, tokens = _invocation_usage(ctx)
+        reason = None
+        if self.deadline_seconds and elapsed >= self.deadline_seconds:
+            reason = "deadline"
+        elif self.token_budget and tokens >= self.token_budget:
+            reason = "token_budget"
+        elif repeated:
+            applied = list(state.get("loop_strategies") or [])
+            for name in self.strategies:
+                if name in applied:
+                    continue
+                applied.append(name)
+                switched = self._strategy(name, state)
+                if switched:
+                    delta, note = switched
+                    guidance = state.get("guidance") or ""
+                    state_delta.update(delta, loop_strategies=applied, guidance=f"{guidance} {note}".strip())
+                    break
+            else:
+                reason = repeated
+            state_delta["loop_strategies"] = applied
+        if reason is None and len(history) >= self.max_iterations:
+            reason = "max_iterations"
+
+        if reason:
+            state_delta["loop_termination"] = reason
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=state_delta, escalate=bool(reason)),
+        )
+
+
+def reset_loop_state(callback_context):
+    """
+    Before-agent callback for `sql_loop`: forgets the previous question's
+    attempts and route, which a question answered from the SQL cache would
+    otherwise report as its own.
+    """
+    for key in ("loop_history", "loop_strategies", "loop_termination", "sql_generator_model", "model_route"):
+        if callback_context.state.get(key) is not None:
+            callback_context.state[key] = None
+    return None
+
+
+def apply_generator_model(callback_context, llm_request):
+    """Before-model callback: honours a `sql_generator_model` switch made by the LoopController."""
+    model = callback_context.state.get("sql_generator_model")
+    if model:
+        llm_request.model = model
+    return None
+
+
+def create_sql_validator(sql_tools, mode=SQL_VALIDATOR_MODE):
+    if mode == "llm":
+        return LlmAgent(
+            model="gemini-2.5-flash",
+            name="sql_validator",
+            description="Validates BigQuery SQL.",
+            output_key="validation_result",
+            instruction=VALIDATOR_SYSTEM_PROMPT,
+            tools=[sql_tools]
+        )
+
+    return DryRunValidator(
+        name="sql_validator",
+        description="Validates BigQuery SQL with a dry run.",
+        toolset=sql_tools,
+        prevalidate=SQL_PREVALIDATION_ENABLED,
+        budget=query_budget,
+        repair_attempts=SQL_REPAIR_MAX_ATTEMPTS if SQL_REPAIR_ENABLED else 0
+    )
+
+def create_sql_generator_loop():
+    sql_tools = create_mcp_toolset(['execute_sql'])
 
     def report_validation_result(
         valid: bool, guidance: str = "", tool_context: ToolContext = None
@@ -37,12 +542,35 @@ def create_sql_generator_loop():
             valid: Whether the SQL is valid based on the dry run.
             guidance: Specific guidance for fixing the SQL if it is invalid.
         """
+        if valid and query_budget:
+            # The LLM may accept a query the dry run priced over budget.
+            problem = query_budget.check(
+                bytes_processed(tool_context.state.get('validation_result')), tool_context.session.user_id
+            )
+            if problem:
+                valid = False
+                guidance = cost_guidance(
+                    tool_context.state.get('sql') or '', tool_context.state.get('schema'),
+                    tool_context.state.get('table_layouts')
+                )
+                guidance = f"{problem} {guidance}"
         if valid:
+            if query_budget:
+                query_budget.charge(
+                    tool_context.session.user_id, bytes_processed(tool_context.state.get('validation_result'))
+                )
             tool_context.state['valid_sql'] = tool_context.state.get('sql')
             tool_context.state['guidance'] = None
+            tool_context.state['loop_termination'] = "valid"
             tool_context.actions.escalate = True  # Exit loop on success
             return "SQL is valid. Exiting loop."
         else:
+            # Covers the LLM validator, which doesn't restore a pruned schema itself.
+            _, restored = restore_pruned_schema(tool_context.state, tool_context.state.get('validation_result'))
+            for key, value in restored.items():
+                tool_context.state[key] = value
+            if restored:
+                guidance = f"{guidance}{_restored_note(restored)}".strip()
             tool_context.state['guidance'] = guidance
             return f"SQL is invalid. Guidance for next loop: {guidance}"
 
@@ -57,38 +585,101 @@ Read the `schema` from the session state.
 Read `guidance` from session state. If it exists, use it to fix your previous query.
 Generate a BigQuery SQL query for the user's question.
 Output ONLY the SQL query in a markdown code block.
-"""
 
-    generator = LlmAgent(
-        model="gemini-2.5-pro",
-        name="sql_generator",
-        description="Generates BigQuery SQL.",
-        output_key="sql",
-        instruction=generator_instruction,
-    )
+""" + SCHEMA_SECTION + "{schema?}\n"
 
-    validator = LlmAgent(
-        model="gemini-2.5-flash",
-        name="sql_validator",
-        description="Validates BigQuery SQL.",
-        output_key="validation_result",
-        instruction=VALIDATOR_SYSTEM_PROMPT,
-        tools=[sql_tools]
+    route_question, escalate_after_failure, record_route = (
+        create_model_router_callbacks(model_router) if model_router else (None, None, None)
     )
+    # The model switch and the schema rendering must come before the cache is chosen, since caches are per model and prompt.
+    generator_callbacks = [apply_generator_model]
+    if escalate_after_failure:
+        generator_callbacks.insert(0, escalate_after_failure)
+    if SCHEMA_PROMPT_FORMAT == "compact":
+        generator_callbacks.append(create_schema_format_callback())
+    if PROMPT_CACHE_ENABLED:
+        generator_callbacks.append(create_prompt_cache_callback(prompt_cache))
+
+    if SQL_GENERATION_MODE == "parallel":
+        temperatures = [
+            round(i / max(SQL_CANDIDATES - 1, 1), 2) for i in range(SQL_CANDIDATES)
+        ]
+        generate_stages = [ParallelSqlGenerator(
+            name="sql_candidates",
+            description="Generates and dry-runs several SQL candidates concurrently.",
+            toolset=sql_tools,
+            prevalidate=SQL_PREVALIDATION_ENABLED,
+            budget=query_budget,
+            repair_attempts=SQL_REPAIR_MAX_ATTEMPTS if SQL_REPAIR_ENABLED else 0,
+            selection_window=SQL_CANDIDATE_WINDOW,
+            sub_agents=[
+                LlmAgent(
+                    model="gemini-2.5-pro",
+                    name=f"sql_generator_{i}",
+                    description="Generates a candidate BigQuery SQL query.",
+                    instruction=generator_instruction,
+                    generate_content_config=GenerateContentConfig(temperature=temperature),
+                    before_model_callback=generator_callbacks,
+                )
+                for i, temperature in enumerate(temperatures)
+            ]
+        )]
+    else:
+        generator = LlmAgent(
+            model="gemini-2.5-pro",
+            name="sql_generator",
+            description="Generates BigQuery SQL.",
+            output_key="sql",
+            instruction=generator_instruction,
+            before_model_callback=generator_callbacks,
+        )
+        generate_stages = [generator, create_sql_validator(sql_tools)]
 
     reviewer = LlmAgent(
         model="gemini-2.5-flash",
-        name="sql_reviewer",
+        name="sql_reviewer" if SQL_REVIEWER_MODE == "llm" else "sql_reviewer_llm",
         description="Reviews SQL validation results and provides guidance.",
         instruction=REVIEWER_SYSTEM_PROMPT,
         tools=[report_validation_result]
     )
+    if SQL_REVIEWER_MODE != "llm":
+        reviewer = HybridReviewer(
+            name="sql_reviewer",
+            description="Accepts successful dry runs and asks the LLM for guidance on failures.",
+            budget=query_budget,
+            sub_agents=[reviewer]
+        )
+
+    loop_stages = [*generate_stages, reviewer]
+    if SQL_LOOP_ADAPTIVE_ENABLED:
+        loop_stages.append(LoopController(
+            name="loop_controller",
+            description="Ends the SQL loop early on repetition, deadline or token budget.",
+            max_iterations=SQL_LOOP_MAX_ITERATIONS,
+            deadline_seconds=SQL_LOOP_DEADLINE_SECONDS,
+            token_budget=SQL_LOOP_TOKEN_BUDGET,
+            strategies=SQL_LOOP_STRATEGIES,
+            fallback_model=SQL_LOOP_FALLBACK_MODEL,
+        ))
+
+    before_callbacks, after_callbacks = [reset_loop_state], []
+    if SQL_CACHE_ENABLED:
+        embed = genai_embedder() if SQL_CACHE_EMBEDDINGS == "genai" else hashed_embedding
+        cache_before, cache_after = create_sql_cache_callbacks(sql_cache, embed)
+        before_callbacks.append(cache_before)
+        after_callbacks.append(cache_after)
+    if route_question:
+        # Routed after the SQL cache lookup, so questions answered from the cache aren't counted.
+        before_callbacks.append(route_question)
+        after_callbacks.insert(0, record_route)
 
     return LoopAgent(
         name="sql_loop",
         description="A loop that generates and validates SQL until it is correct.",
-        sub_agents=[generator, validator, reviewer],
-        max_iterations=5
+        sub_agents=loop_stages,
+        max_iterations=SQL_LOOP_MAX_ITERATIONS,
+        before_agent_callback=before_callbacks or None,
+        after_agent_callback=after_callbacks or None
     )
 
-sql_generator_loop = create_sql_generator_loop()
+__getattr__ = lazy_singletons(__name__, sql_generator_loop=create_sql_generator_loop)
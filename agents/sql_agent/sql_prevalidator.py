@@ -0,0 +1,280 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import difflib
+import functools
+import json
+import re
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import OptimizeError, SqlglotError
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.schema import MappingSchema
+from .config import BIGQUERY_DATASET
+from .mcp_tools import parse_json_text, strip_code_fence
+
+PREVALIDATION_FAILED = "prevalidation failed"
+
+_UNKNOWN_COLUMN_RES = (
+    re.compile(r"Unknown column: (\S+)"),
+    re.compile(r"Column '(.+?)' could not be resolved"),
+)
+_SCALAR_TYPES = {
+    "INTEGER": "INT64",
+    "FLOAT": "FLOAT64",
+    "BOOLEAN": "BOOL",
+    "RECORD": "STRUCT",
+}
+
+
+def _field_attr(field, *names):
+    for name in names:
+        if name in field:
+            return field[name]
+    return None
+
+
+def _field_type(field):
+    field_type = str(_field_attr(field, "type", "Type", "data_type") or "STRING").upper()
+    subfields = _field_attr(field, "fields", "Schema", "schema")
+    if field_type in ("RECORD", "STRUCT") and isinstance(subfields, list) and subfields:
+        inner = ", ".join(
+            f"`{_field_attr(sub, 'name', 'Name')}` {_field_type(sub)}" for sub in subfields
+        )
+        field_type = f"STRUCT<{inner}>"
+    else:
+        field_type = _SCALAR_TYPES.get(field_type, field_type)
+    mode = str(_field_attr(field, "mode", "Mode") or "").upper()
+    if mode == "REPEATED" or _field_attr(field, "Repeated", "repeated") is True:
+        field_type = f"ARRAY<{field_type}>"
+    return field_type
+
+
+def table_columns(table_schema):
+    """Normalises the schema shapes `get_table_info` and the LLM produce into {column: type}."""
+    if isinstance(table_schema, dict):
+        for key in ("Schema", "schema", "fields", "columns"):
+            if key in table_schema:
+                return table_columns(table_schema[key])
+        if table_schema and all(isinstance(v, str) for v in table_schema.values()):
+            return {name: _SCALAR_TYPES.get(v.upper(), v.upper()) for name, v in table_schema.items()}
+        return None
+    if isinstance(table_schema, list) and table_schema:
+        columns = {}
+        for field in table_schema:
+            name = _field_attr(field, "name", "Name", "column_name") if isinstance(field, dict) else None
+            if not name:
+                return None
+            columns[name] = _field_type(field)
+        return columns
+    return None
+
+
+def _qualified_name(table_ref):
+    parts = table_ref.strip().strip("`").split(".")
+    project, dataset = BIGQUERY_DATASET.split(".", 1)
+    if len(parts) >= 3:
+        project, dataset = parts[-3], parts[-2]
+    elif len(parts) == 2:
+        dataset = parts[0]
+    return project, dataset, parts[-1]
+
+
+class SchemaIndex:
+    """Tables and columns from the `schema` session state, ready for resolution."""
+
+    def __init__(self, tables, names=None):
+        self.tables = tables
+        # Lower-cased table keys to the (project, dataset, table) spelling in the schema.
+        self.names = names or {key: key for key in tables}
+        self.columns = {
+            name: columns for name, columns in tables.items() if columns is not None
+        }
+        mapping = {}
+        for (project, dataset, table), columns in self.columns.items():
+            mapping.setdefault(project, {}).setdefault(dataset, {})[table] = {
+                f"`{column}`": column_type for column, column_type in columns.items()
+            }
+        try:
+            self.mapping_schema = MappingSchema(mapping, dialect="bigquery")
+        except SqlglotError:
+            self.mapping_schema = None
+
+    @classmethod
+    def from_schema(cls, schema):
+        parsed = parse_json_text(schema) if isinstance(schema, str) else schema
+        if not isinstance(parsed, dict):
+            return None
+        tables, names = {}, {}
+        for table_ref, table_schema in parsed.items():
+            name = _qualified_name(table_ref)
+            key = tuple(part.lower() for part in name)
+            tables[key], names[key] = table_columns(table_schema), name
+        return cls(tables, names) if tables else None
+
+    def table_names(self):
+        return [".".join(key) for key in self.tables]
+
+    def find_table(self, table):
+        name, dataset = table.name.lower(), table.db.lower()
+        for key in self.tables:
+            if key[2] == name and (not dataset or key[1] == dataset):
+                return key
+        return None
+
+    @functools.cached_property
+    def column_types(self):
+        """Maps every known column and nested field name to its types."""
+        types = {}
+
+        def _visit(name, column_type):
+            types.setdefault(name.lower(), set()).add(column_type.upper())
+            inner = column_type[6:-1] if column_type.upper().startswith("ARRAY<") else column_type
+            if inner.upper().startswith("STRUCT<"):
+                try:
+                    struct = exp.DataType.build(inner, dialect="bigquery")
+                except SqlglotError:
+                    return
+                for field in struct.expressions:
+                    _visit(field.name, field.args["kind"].sql("bigquery"))
+
+        for columns in self.columns.values():
+            for name, column_type in columns.items():
+                _visit(name, column_type)
+        return types
+
+
+@functools.lru_cache(maxsize=32)
+def _schema_index(schema):
+    return SchemaIndex.from_schema(schema)
+
+
+def _suggest(name, candidates):
+    matches = difflib.get_close_matches(name.lower(), candidates, n=1, cutoff=0.6)
+    return f" Did you mean `{matches[0]}`?" if matches else ""
+
+
+def _alias_names(expression):
+    names = set()
+    for alias in expression.find_all(exp.TableAlias):
+        if alias.name:
+            names.add(alias.name.lower())
+        names.update(column.name.lower() for column in alias.columns)
+    for cte in expression.find_all(exp.CTE):
+        names.add(cte.alias.lower())
+    for select_alias in expression.find_all(exp.Alias):
+        names.add(select_alias.alias.lower())
+    return names
+
+
+def _check_tables(expression, index):
+    issues = []
+    cte_names = {cte.alias.lower() for cte in expression.find_all(exp.CTE)}
+    for table in expression.find_all(exp.Table):
+        if not table.name or table.name.lower() in cte_names:
+            continue
+        if "INFORMATION_SCHEMA" in (table.db.upper(), table.name.upper()):
+            continue
+        key = index.find_table(table)
+        if key is None:
+            issues.append(
+                f"Table `{'.'.join(p for p in (table.catalog, table.db, table.name) if p)}`"
+                " is not in the schema."
+                f" Available tables: {', '.join(f'`{name}`' for name in index.table_names())}."
+            )
+        elif not table.catalog or not table.db:
+            issues.append(
+                f"Table `{table.name}` must use the full backticked path `{'.'.join(key)}`."
+            )
+    return issues
+
+
+def _check_columns(expression, index):
+    if index.mapping_schema is None:
+        return []
+    for table in expression.find_all(exp.Table):
+        key = index.find_table(table)
+        if key is not None and key not in index.columns:
+            return []  # Column list unknown for a referenced table.
+    try:
+        qualify(
+            expression.copy(),
+            schema=index.mapping_schema,
+            dialect="bigquery",
+            validate_qualify_columns=True,
+        )
+    except OptimizeError as e:
+        for pattern in _UNKNOWN_COLUMN_RES:
+            match = pattern.search(str(e))
+            if match:
+                name = match.group(1).strip('"`')
+                suggestion = _suggest(name, list(index.column_types))
+                return [f"Column `{name}` does not exist in the schema.{suggestion}"]
+    except SqlglotError:
+        pass
+    return []
+
+
+def _check_unnest(expression, index):
+    issues = []
+    types = index.column_types
+    aliases = _alias_names(expression)
+    is_array = lambda name: any(t.startswith("ARRAY<") for t in types.get(name, ()))
+
+    for unnest in expression.find_all(exp.Unnest):
+        for column in unnest.expressions:
+            if isinstance(column, exp.Column) and column.name.lower() in types:
+                if not is_array(column.name.lower()) and column.name.lower() not in aliases:
+                    issues.append(
+                        f"`{column.name}` is not an ARRAY column, so it can't be used with UNNEST."
+                    )
+
+    for column in expression.find_all(exp.Column):
+        if column.find_ancestor(exp.Unnest):
+            continue
+        parts = [part.name.lower() for part in column.parts]
+        for i, part in enumerate(parts[:-1]):
+            if i == 0 and part in aliases:
+                continue
+            if is_array(part) and part not in aliases:
+                issues.append(
+                    f"`{part}` is an ARRAY column; `{'.'.join(parts[i:])}` can't be read directly."
+                    f" Use `LEFT JOIN UNNEST({'.'.join(parts[:i + 1])}) AS {part}_item`"
+                    f" and select `{part}_item.{parts[i + 1]}` instead."
+                )
+                break
+    return issues
+
+
+def check_sql(sql, schema):
+    """
+    Checks `sql` against the `schema` session state value without BigQuery.
+    Only confident findings are reported (unknown tables or columns, ARRAY
+    fields read without UNNEST, UNNEST of a non-ARRAY column); anything the
+    local parser can't handle returns an empty list and is left for the dry run.
+    """
+    index = _schema_index(schema if isinstance(schema, str) else json.dumps(schema))
+    if index is None:
+        return []
+    try:
+        expression = sqlglot.parse_one(strip_code_fence(sql), dialect="bigquery")
+    except SqlglotError:
+        return []
+    if expression is None:
+        return []
+
+    issues = _check_tables(expression, index)
+    if issues:
+        return issues
+    return _check_unnest(expression, index) or _check_columns(expression, index)
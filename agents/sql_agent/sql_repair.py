@@ -0,0 +1,193 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import difflib
+import re
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from .mcp_tools import strip_code_fence
+from .sql_prevalidator import SchemaIndex
+
+# Validation failures each rule answers to, from BigQuery dry runs or the offline pre-validation.
+_TABLE_ERRORS = re.compile(
+    r"missing dataset|full backticked path|is not in the schema|Not found: Table|Syntax error", re.IGNORECASE
+)
+_CAST_ERRORS = re.compile(
+    r"Could not cast|Bad \w+ value|Invalid cast|Invalid (?:date|datetime|timestamp|numeric)|Failed to parse",
+    re.IGNORECASE,
+)
+# Each names the field read through an ARRAY, and the ARRAY column when it is known.
+_ARRAY_ACCESS_ERRORS = (
+    re.compile(r"Cannot access field `?(?P<field>\w+)`? on a value with type ARRAY", re.IGNORECASE),
+    re.compile(r"`(?P<array>\w+)` is an ARRAY column; `\w+\.(?P<field>\w+)"),
+)
+_UNKNOWN_NAME_RES = (
+    re.compile(r"Unrecognized name: `?(\w+)`?(?:; Did you mean `?(\w+)`?\?)?"),
+    re.compile(r"Name `?(\w+)`? not found inside `?\w+`?(?:; Did you mean `?(\w+)`?\?)?"),
+    re.compile(r"Column `(\w+)` does not exist in the schema\.(?: Did you mean `(\w+)`\?)?"),
+)
+
+
+def _closest(name, candidates, cutoff):
+    """The one candidate within `cutoff` similarity of `name`, or None when there is none or a tie."""
+    scored = sorted(
+        ((difflib.SequenceMatcher(None, name.lower(), c.lower()).ratio(), c) for c in set(candidates)),
+        reverse=True,
+    )
+    scored = [(score, c) for score, c in scored if score >= cutoff]
+    if not scored or (len(scored) > 1 and scored[1][0] == scored[0][0]):
+        return None
+    return scored[0][1]
+
+
+def _qualify_tables(expression, error, index, cutoff):
+    """Unqualified, unquoted or misspelled table names become the full backticked path from the schema."""
+    if index is None or not _TABLE_ERRORS.search(error):
+        return []
+    fixes = []
+    cte_names = {cte.alias.lower() for cte in expression.find_all(exp.CTE)}
+    for table in expression.find_all(exp.Table):
+        if not table.name or table.name.lower() in cte_names:
+            continue
+        if "INFORMATION_SCHEMA" in (table.db.upper(), table.name.upper()):
+            continue
+        key = index.find_table(table)
+        if key is None:
+            match = _closest(table.name, [key[2] for key in index.tables], cutoff)
+            key = next((key for key in index.tables if key[2] == match), None) if match else None
+        if key is None:
+            continue
+        name = index.names[key]
+        written = tuple(part for part in (table.catalog, table.db, table.name) if part)
+        if written == name and table.meta.get("quoted_table"):
+            continue
+        if table.name != name[2] and not table.alias:
+            # Keep column references through the old name working.
+            table.set("alias", exp.TableAlias(this=exp.to_identifier(table.name)))
+        for arg, part in zip(("catalog", "db", "this"), name):
+            table.set(arg, exp.to_identifier(part, quoted=True))
+        table.meta["quoted_table"] = True
+        fixes.append(f"table `{'.'.join(written)}` -> `{'.'.join(name)}`")
+    return fixes
+
+
+def _rename_columns(expression, error, index, cutoff):
+    """Column and field names the error reports as unknown are replaced by the closest known name."""
+    if index is None:
+        return []
+    known = {}
+    for columns in index.columns.values():
+        known.update((name.lower(), name) for name in columns)
+    for name in index.column_types:
+        known.setdefault(name, name)
+    fixes = []
+    for pattern in _UNKNOWN_NAME_RES:
+        for match in pattern.finditer(error):
+            wrong, suggested = match.group(1), match.group(2)
+            if wrong.lower() in known:
+                continue
+            candidates = [known[suggested.lower()]] if suggested and suggested.lower() in known else known.values()
+            right = _closest(wrong, candidates, cutoff)
+            if right is None:
+                continue
+            renamed = False
+            for identifier in expression.find_all(exp.Identifier):
+                if identifier.name.lower() == wrong.lower() and isinstance(identifier.parent, (exp.Column, exp.Dot)):
+                    identifier.set("this", right)
+                    renamed = True
+            if renamed:
+                fixes.append(f"column `{wrong}` -> `{right}`")
+    return fixes
+
+
+def _safe_casts(expression, error, index, cutoff):
+    """CAST becomes SAFE_CAST when a cast failed."""
+    if not _CAST_ERRORS.search(error):
+        return []
+    casts = [cast for cast in expression.find_all(exp.Cast) if not isinstance(cast, exp.TryCast)]
+    for cast in casts:
+        cast.replace(exp.TryCast(**cast.args))
+    return ["CAST -> SAFE_CAST"] if casts else []
+
+
+def _column(parts):
+    return exp.Column(**dict(zip(("this", "table", "db", "catalog"), reversed([p.copy() for p in parts]))))
+
+
+def _left_join_unnest(expression, error, index, cutoff):
+    """
+    A field read straight through an ARRAY column (`t.tags.label`) is read
+    from a LEFT JOIN UNNEST of it instead, for the array and field the
+    error names. Other UNNESTs and joins are left as written.
+    """
+    targets = {
+        ((match.groupdict().get("array") or "").lower(), match.group("field").lower())
+        for pattern in _ARRAY_ACCESS_ERRORS for match in pattern.finditer(error)
+    }
+    if index is None or not targets:
+        return []
+    fixes = []
+    aliases = {alias.name.lower() for alias in expression.find_all(exp.TableAlias) if alias.name}
+    is_array = lambda name: any(t.startswith("ARRAY<") for t in index.column_types.get(name.lower(), ()))
+    unnested = {}
+    for column in list(expression.find_all(exp.Column)):
+        select = column.find_ancestor(exp.Select)
+        if select is None or column.find_ancestor(exp.Unnest):
+            continue
+        parts = column.parts
+        for i, part in enumerate(parts[:-1]):
+            if part.name.lower() in aliases or not is_array(part.name):
+                continue
+            field = parts[i + 1].name.lower()
+            if (part.name.lower(), field) not in targets and ("", field) not in targets:
+                continue
+            path = _column(parts[:i + 1])
+            key = (id(select), path.sql("bigquery"))
+            if key not in unnested:
+                alias = f"{part.name}_item"
+                select.append("joins", exp.Join(
+                    this=exp.Unnest(expressions=[path], alias=exp.TableAlias(columns=[exp.to_identifier(alias)])),
+                    side="LEFT",
+                ))
+                unnested[key] = alias
+                fixes.append(f"`{key[1]}` read through LEFT JOIN UNNEST AS {alias}")
+            column.replace(_column([exp.to_identifier(unnested[key]), *parts[i + 1:]]))
+            break
+    return fixes
+
+
+REPAIR_RULES = (_qualify_tables, _rename_columns, _safe_casts, _left_join_unnest)
+
+
+def repair_sql(sql, validation_result, schema, name_cutoff=0.75):
+    """
+    Rewrites `sql` to fix the mechanical mistakes `validation_result` (a
+    failed dry run or pre-validation) points at, using `schema` for table
+    paths and fuzzy name matching at `name_cutoff`. Returns (sql, fixes), or
+    (None, []) when no rule applies or the SQL doesn't parse.
+    """
+    try:
+        expression = sqlglot.parse_one(strip_code_fence(sql or ""), dialect="bigquery")
+    except SqlglotError:
+        return None, []
+    if expression is None:
+        return None, []
+    index = SchemaIndex.from_schema(schema) if schema else None
+    fixes = []
+    for rule in REPAIR_RULES:
+        fixes += rule(expression, validation_result or "", index, name_cutoff)
+    if not fixes:
+        return None, []
+    return expression.sql(dialect="bigquery", pretty=True), fixes
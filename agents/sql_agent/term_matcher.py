@@ -0,0 +1,184 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import difflib
+import json
+import logging
+import os
+import re
+from typing import Any, AsyncGenerator
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from .dataplex_index import DataplexIndex
+from .sql_cache import user_question
+
+logger = logging.getLogger(__name__)
+
+# Filler and aggregation words the LLM extractor is told to ignore as well.
+_IGNORED_WORDS = {
+    "a", "an", "and", "are", "average", "by", "count", "did", "do", "does", "each",
+    "for", "from", "how", "in", "is", "it", "last", "many", "me", "month", "most",
+    "of", "on", "or", "per", "quarter", "show", "sum", "the", "to", "top", "total",
+    "was", "were", "what", "when", "which", "who", "with", "year",
+}
+_KEYWORD_MIN_LENGTH = 4
+_PHRASE_MAX_WORDS = 4
+
+
+def _words(text):
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "")
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _stem(word):
+    for suffix in ("ies", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+
+class Glossary:
+    """
+    A token trie over glossary phrases (business terms, column names and
+    their synonyms), matched leftmost-longest over the question's words,
+    as Aho-Corasick would. Words absent from the trie are corrected to the
+    closest word at that position when the similarity ratio is at least
+    `fuzzy_cutoff`.
+
+    A matched phrase yields its canonical term. The significant single words
+    of short phrases are indexed too; they yield the question's own wording.
+    """
+
+    def __init__(self, terms=(), synonyms=None, fuzzy_cutoff=0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._trie = {}
+        self._size = 0
+        for term in terms:
+            self.add(term)
+        for term, aliases in (synonyms or {}).items():
+            self.add(term)
+            for alias in aliases:
+                self.add(alias, term)
+
+    def __len__(self):
+        return self._size
+
+    def _insert(self, words, term):
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        if "$" not in node or term is not None:
+            node["$"] = term
+
+    def add(self, phrase, term=None):
+        """Indexes `phrase`; a match yields `term` (by default the phrase itself)."""
+        words = [_stem(word) for word in _words(phrase)]
+        if not words:
+            return
+        self._insert(words, term or phrase)
+        self._size += 1
+        if len(words) <= _PHRASE_MAX_WORDS:
+            for word in words:
+                if len(word) >= _KEYWORD_MIN_LENGTH and word not in _IGNORED_WORDS:
+                    self._insert([word], None)
+
+    def _child(self, node, word):
+        if word in node:
+            return node[word]
+        if len(word) < _KEYWORD_MIN_LENGTH:
+            return None
+        close = difflib.get_close_matches(
+            word, [key for key in node if key != "$"], n=1, cutoff=self.fuzzy_cutoff
+        )
+        return node[close[0]] if close else None
+
+    def match(self, question):
+        """Glossary terms mentioned in `question`, in order of appearance."""
+        surface = _words(question)
+        words = [_stem(word) for word in surface]
+        terms = []
+        i = 0
+        while i < len(words):
+            if words[i] in _IGNORED_WORDS:
+                i += 1
+                continue
+            node, end, term = self._trie, None, None
+            for j in range(i, len(words)):
+                node = self._child(node, words[j])
+                if node is None:
+                    break
+                if "$" in node:
+                    end, term = j + 1, node["$"]
+            if end is None:
+                i += 1
+                continue
+            terms.append(term or " ".join(surface[i:end]))
+            i = end
+        return list(dict.fromkeys(terms))
+
+
+def load_glossary(index_path=None, glossary_path=None, fuzzy_cutoff=0.85):
+    """
+    Builds a Glossary from the column names and business terms in the local
+    Dataplex index and from an optional JSON file of the form
+    `{"terms": [...], "synonyms": {"term": ["alias", ...]}}`.
+    """
+    terms, synonyms = [], {}
+    if index_path and os.path.exists(index_path):
+        terms += DataplexIndex(index_path).glossary_terms()
+    if glossary_path:
+        try:
+            with open(glossary_path) as f:
+                data = json.load(f)
+            terms += data.get("terms", [])
+            synonyms = data.get("synonyms", {})
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("Could not read the term glossary %s: %s", glossary_path, e)
+    return Glossary(terms, synonyms, fuzzy_cutoff=fuzzy_cutoff)
+
+
+class GlossaryTermExtractor(BaseAgent):
+    """
+    Writes `extracted_terms` from glossary matches in the question, without an
+    LLM. Only when nothing matches does it run the LLM extractor (its single
+    sub-agent). `term_source` records which one answered.
+    """
+
+    glossary: Any
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        terms = self.glossary.match(user_question(ctx))
+        if terms or not self.sub_agents:
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={
+                    "extracted_terms": json.dumps(terms),
+                    "term_source": "glossary",
+                }),
+            )
+            return
+
+        async for event in self.sub_agents[0].run_async(ctx):
+            yield event
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"term_source": "llm"}),
+        )
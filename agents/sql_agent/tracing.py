@@ -0,0 +1,320 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from google.adk.agents import LlmAgent, LoopAgent
+
+logger = logging.getLogger(__name__)
+
+_BYTES_PROCESSED_RE = re.compile(r'"?totalBytesProcessed"?\s*:\s*"?(\d+)')
+
+
+class Span:
+    def __init__(self, name, kind, trace_id, parent=None, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        if parent and "loop_iteration" in parent.attributes:
+            self.attributes.setdefault("loop_iteration", parent.attributes["loop_iteration"])
+
+    @property
+    def duration_seconds(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_seconds": round(self.duration_seconds, 6),
+            "attributes": self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per finished span to `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OpenTelemetryExporter:
+    """Re-emits finished spans through the globally configured OpenTelemetry tracer provider."""
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(__name__)
+
+    def export(self, spans):
+        emitted = {}
+        for span in sorted(spans, key=lambda s: s.start_ns):
+            parent = emitted.get(span.parent_id)
+            context = self._trace.set_span_in_context(parent) if parent else None
+            attributes = {
+                f"sql_agent.{key}": value
+                for key, value in span.attributes.items()
+                if isinstance(value, (str, bool, int, float))
+            }
+            attributes["sql_agent.kind"] = span.kind
+            otel_span = self._tracer.start_span(
+                span.name, context=context, start_time=span.start_ns, attributes=attributes
+            )
+            otel_span.end(end_time=span.end_ns or span.start_ns)
+            emitted[span.span_id] = otel_span
+
+
+class PipelineTracer:
+    """
+    Records a span per agent run, LLM call and MCP tool call (including the
+    calls agents make in code through `mcp_tools.run_mcp_tool`), with token
+    counts, dry-run bytes processed and the SQL loop iteration. When the root
+    agent finishes, the request's spans go to the exporters and a timing
+    summary is written to `timing_summary` in session state.
+    """
+
+    def __init__(self, exporters=(), max_invocations=256):
+        self.exporters = list(exporters)
+        self.max_invocations = max_invocations
+        self._invocations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _invocation(self, invocation_id):
+        with self._lock:
+            if invocation_id not in self._invocations:
+                self._invocations[invocation_id] = {"open": {}, "finished": [], "requests": {}}
+                # Requests whose root agent never finished (e.g. ended by a callback) are dropped.
+                while len(self._invocations) > self.max_invocations:
+                    self._invocations.popitem(last=False)
+            return self._invocations[invocation_id]
+
+    def _start(self, invocation_id, key, name, kind, parent_key=None, attributes=None):
+        invocation = self._invocation(invocation_id)
+        span = Span(name, kind, invocation_id, invocation["open"].get(parent_key), attributes)
+        invocation["open"][key] = span
+        return span
+
+    def _end(self, invocation_id, key, **attributes):
+        invocation = self._invocation(invocation_id)
+        span = invocation["open"].pop(key, None)
+        if span is None:
+            return None
+        span.end_ns = time.time_ns()
+        span.attributes.update(attributes)
+        invocation["finished"].append(span)
+        return span
+
+    @staticmethod
+    def _agent_key(agent, ctx):
+        return ("agent", agent.name, ctx.branch)
+
+    # Agent callbacks.
+
+    def before_agent(self, callback_context):
+        ctx = callback_context._invocation_context
+        agent, parent = ctx.agent, ctx.agent.parent_agent
+        parent_key = self._agent_key(parent, ctx) if parent else None
+        invocation = self._invocation(ctx.invocation_id)
+        parent_span = invocation["open"].get(parent_key)
+        if isinstance(parent, LoopAgent) and parent_span and parent.sub_agents[0] is agent:
+            parent_span.attributes["loop_iteration"] = parent_span.attributes.get("loop_iteration", 0) + 1
+        self._start(
+            ctx.invocation_id, self._agent_key(agent, ctx), agent.name, "agent", parent_key,
+            {"agent": agent.name, "stage": parent is not None and parent.parent_agent is None},
+        )
+        return None
+
+    def after_agent(self, callback_context):
+        ctx = callback_context._invocation_context
+        span = self._end(ctx.invocation_id, self._agent_key(ctx.agent, ctx))
+        if span is not None and span.parent_id is None:
+            callback_context.state["timing_summary"] = self._finish(ctx.invocation_id)
+        return None
+
+    # LLM callbacks.
+
+    def before_model(self, callback_context, llm_request):
+        ctx = callback_context._invocation_context
+        key = ("llm", ctx.agent.name, ctx.branch)
+        self._start(
+            ctx.invocation_id, key, f"llm {ctx.agent.name}", "llm",
+            self._agent_key(ctx.agent, ctx), {"agent": ctx.agent.name, "model": llm_request.model},
+        )
+        # Callbacks after this one (the model router, a model switch) may still change the model.
+        self._invocation(ctx.invocation_id)["requests"][key] = llm_request
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        ctx = callback_context._invocation_context
+        key = ("llm", ctx.agent.name, ctx.branch)
+        span = self._invocation(ctx.invocation_id)["open"].get(key)
+        if span is not None:
+            span.attributes.setdefault("first_token_seconds", round(span.duration_seconds, 6))
+        if llm_response.partial:
+            return None
+        request = self._invocation(ctx.invocation_id)["requests"].pop(key, None)
+        usage = llm_response.usage_metadata
+        self._end(
+            ctx.invocation_id, key,
+            **({"model": request.model} if request is not None and request.model else {}),
+            prompt_tokens=(usage.prompt_token_count or 0) if usage else 0,
+            output_tokens=(usage.candidates_token_count or 0) if usage else 0,
+            cached_tokens=(usage.cached_content_token_count or 0) if usage else 0,
+        )
+        return None
+
+    # Tool calls, from LLM agents (callbacks) and from code (run_mcp_tool).
+
+    def start_tool(self, tool_name, args, tool_context):
+        ctx = tool_context._invocation_context
+        key = ("tool", tool_context.function_call_id or uuid.uuid4().hex)
+        self._start(
+            ctx.invocation_id, key, f"tool {tool_name}", "tool", self._agent_key(ctx.agent, ctx),
+            {"agent": ctx.agent.name, "tool": tool_name, "dry_run": bool((args or {}).get("dry_run"))},
+        )
+        return key
+
+    def end_tool(self, key, tool_context, result):
+        attributes = {}
+        if isinstance(result, dict):
+            attributes["error"] = bool(result.get("isError") or "error" in result)
+            match = _BYTES_PROCESSED_RE.search(json.dumps(result, default=str).replace('\\"', '"'))
+            if match:
+                attributes["bytes_processed"] = int(match.group(1))
+        self._end(tool_context._invocation_context.invocation_id, key, **attributes)
+
+    def before_tool(self, tool, args, tool_context):
+        self.start_tool(tool.name, args, tool_context)
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        self.end_tool(("tool", tool_context.function_call_id), tool_context, tool_response)
+        return None
+
+    def _finish(self, invocation_id):
+        with self._lock:
+            invocation = self._invocations.pop(invocation_id, {"open": {}, "finished": []})
+        # Calls whose after-callbacks were skipped by a short-circuiting callback.
+        for key, span in invocation["open"].items():
+            span.end_ns = time.time_ns()
+            span.attributes["unfinished"] = True
+            request = invocation.get("requests", {}).get(key)
+            if request is not None and request.model:
+                span.attributes["model"] = request.model
+        spans = invocation["finished"] + list(invocation["open"].values())
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logger.warning("Span export with %s failed: %s", type(exporter).__name__, e)
+        return summarize_spans(spans)
+
+
+def summarize_spans(spans):
+    """The per-request timing summary written to session state."""
+    root = next((span for span in spans if span.parent_id is None), None)
+    llm = [span for span in spans if span.kind == "llm"]
+    tools = [span for span in spans if span.kind == "tool"]
+    return {
+        "total_seconds": round(root.duration_seconds, 3) if root else None,
+        "stages": {
+            span.name: round(span.duration_seconds, 3)
+            for span in spans if span.kind == "agent" and span.attributes.get("stage")
+        },
+        "llm_calls": len(llm),
+        "llm_seconds": round(sum(span.duration_seconds for span in llm), 3),
+        "prompt_tokens": sum(span.attributes.get("prompt_tokens", 0) for span in llm),
+        "output_tokens": sum(span.attributes.get("output_tokens", 0) for span in llm),
+        "cached_tokens": sum(span.attributes.get("cached_tokens", 0) for span in llm),
+        "llm_first_token_seconds": round(
+            sum(span.attributes.get("first_token_seconds", 0) for span in llm) / len(llm), 3
+        ) if llm else None,
+        "tool_calls": len(tools),
+        "tool_seconds": round(sum(span.duration_seconds for span in tools), 3),
+        "loop_iterations": max((span.attributes.get("loop_iteration", 0) for span in spans), default=0),
+        "bytes_processed": sum(span.attributes.get("bytes_processed", 0) for span in tools),
+    }
+
+
+def _with_callback(existing, callback, first=True):
+    callbacks = existing if isinstance(existing, list) else ([existing] if existing else [])
+    return [callback, *callbacks] if first else [*callbacks, callback]
+
+
+_active_tracer = None
+
+
+def instrument(agent, tracer):
+    """
+    Adds `tracer`'s callbacks to `agent` and all its sub-agents, ahead of any
+    existing callbacks so they run even when those short-circuit, and routes
+    code-path MCP calls to it.
+    """
+    global _active_tracer
+    _active_tracer = tracer
+    agent.before_agent_callback = _with_callback(agent.before_agent_callback, tracer.before_agent)
+    agent.after_agent_callback = _with_callback(agent.after_agent_callback, tracer.after_agent)
+    if isinstance(agent, LlmAgent):
+        agent.before_model_callback = _with_callback(agent.before_model_callback, tracer.before_model)
+        agent.after_model_callback = _with_callback(agent.after_model_callback, tracer.after_model)
+        agent.before_tool_callback = _with_callback(agent.before_tool_callback, tracer.before_tool)
+        agent.after_tool_callback = _with_callback(agent.after_tool_callback, tracer.after_tool)
+    for sub_agent in agent.sub_agents:
+        instrument(sub_agent, tracer)
+    return agent
+
+
+def start_tool_span(tool_name, args, tool_context):
+    """Used by `run_mcp_tool`; a no-op unless a tracer is installed."""
+    if _active_tracer is None or tool_context is None:
+        return None
+    return _active_tracer.start_tool(tool_name, args, tool_context)
+
+
+def end_tool_span(key, tool_context, result):
+    if _active_tracer is not None and key is not None:
+        _active_tracer.end_tool(key, tool_context, result)
+
+
+def create_pipeline_tracer(exporter="none", jsonl_path=".cache/traces.jsonl"):
+    exporters = []
+    if exporter in ("jsonl", "both"):
+        exporters.append(JsonLinesExporter(jsonl_path))
+    if exporter in ("otel", "both"):
+        exporters.append(OpenTelemetryExporter())
+    return PipelineTracer(exporters)
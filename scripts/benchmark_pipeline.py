@@ -0,0 +1,529 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Runs the full `root_agent` pipeline offline and reports per-stage wall time,
+LLM calls, prompt/output tokens, SQL loop iterations and tool calls as JSON.
+
+The MCP toolbox is replaced by a local MCP server that serves `list_tables`,
+`get_table_info`, `execute_sql`, `search_entries` and `lookup_entry` from a
+fixture file. Gemini is replaced by a scripted model that answers each agent
+the way a well-behaved model would, with the gold SQL from the test cases.
+Token counts are estimated at four characters per token. Pass `--baseline`
+with an earlier report to fail when LLM calls, tokens, tool calls or loop
+iterations increased.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "tests", "test_cases_dataplex.md")
+DEFAULT_FIXTURES = os.path.join(REPO_ROOT, "tests", "fixtures", "benchmark_dataplex.json")
+COMPARED_METRICS = ("llm_calls", "prompt_tokens", "output_tokens", "tool_calls", "loop_iterations")
+
+_CASE_RE = re.compile(
+    r"### (?P<name>.+?)\n.*?\*\*User Query:\*\* \"(?P<question>.+?)\".*?```sql\n(?P<sql>.*?)```",
+    re.DOTALL,
+)
+
+
+def parse_test_cases(path):
+    """Scenarios (name, question, gold SQL) from a tests/test_cases_*.md file."""
+    with open(path) as f:
+        text = f.read()
+    return [
+        {"name": m["name"].strip(), "question": m["question"], "sql": m["sql"].strip()}
+        for m in _CASE_RE.finditer(text)
+    ]
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Benchmark:
+    """State shared by the fake toolbox, the scripted model and the plugin."""
+
+    def __init__(self, fixtures, llm_latency=0.0):
+        self.fixtures = fixtures
+        self.project = fixtures["project"]
+        self.location = fixtures.get("location", "us")
+        self.llm_latency = llm_latency
+        self.scenario = None
+        self.stage = None
+        self.stages = {}
+
+    def start(self, scenario):
+        self.scenario = {**scenario, **self.fixtures["scenarios"].get(scenario["question"], {})}
+        # The test cases omit the project; the prevalidator requires full backticked paths.
+        for ref in self.fixtures["tables"]:
+            self.scenario["sql"] = self.scenario["sql"].replace(f"`{ref}`", f"`{self.project}.{ref}`")
+        self.stage = None
+        self.stages = {}
+
+    def stage_stats(self, stage=None):
+        return self.stages.setdefault(stage or self.stage or "root", {
+            "wall_seconds": 0.0,
+            "llm_calls": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "tool_calls": Counter(),
+            "loop_iterations": 0,
+        })
+
+    def record_tool_call(self, name):
+        self.stage_stats()["tool_calls"][name] += 1
+
+    # Fixture data in toolbox shapes.
+
+    def tables(self):
+        return {f"{self.project}.{ref}": table for ref, table in self.fixtures["tables"].items()}
+
+    def table_info(self, ref):
+        table = self.tables()[ref]
+        return {
+            "tableReference": dict(zip(("projectId", "datasetId", "tableId"), ref.split("."))),
+            "description": table["description"],
+            "lastModifiedTime": "1735689600000",
+            "etag": f"etag-{ref}",
+            "schema": {"fields": [
+                {"name": name, "type": type_, "mode": "NULLABLE"}
+                for name, type_ in table["columns"].items()
+            ]},
+        }
+
+    def entry(self, ref, full=False):
+        project, dataset, table_id = ref.split(".")
+        table = self.tables()[ref]
+        entry = {
+            "name": (
+                f"projects/{project}/locations/{self.location}/entryGroups/@bigquery/entries/"
+                f"bigquery.googleapis.com/projects/{project}/datasets/{dataset}/tables/{table_id}"
+            ),
+            "fullyQualifiedName": f"bigquery:{ref}",
+            "updateTime": "2025-01-01T00:00:00Z",
+            "entrySource": {"description": table["description"]},
+        }
+        if full:
+            entry["aspects"] = {
+                f"{project}.{self.location}.{column.replace('_', '-')}-aspect-type": {
+                    "path": f"schema.fields.{column}", "data": data,
+                }
+                for column, data in table.get("aspects", {}).items()
+            }
+        return entry
+
+    def search(self, query):
+        words = [word.rstrip("s") for word in re.findall(r"\w+", query.lower()) if len(word) > 2]
+        results = []
+        for ref, table in self.tables().items():
+            text = json.dumps([ref, table]).lower().replace("_", " ")
+            if any(word in text for word in words):
+                results.append({"dataplexEntry": self.entry(ref)})
+        return results
+
+    def scenario_tables(self):
+        from agents.sql_agent.result_cache import referenced_tables
+
+        refs = []
+        for name in referenced_tables(self.scenario["sql"]) or []:
+            refs += [ref for ref in self.tables() if ref.endswith(f".{name}") or ref == name]
+        return refs
+
+
+def create_fake_toolbox(bench):
+    from mcp.server.fastmcp import FastMCP
+    from agents.sql_agent.result_cache import referenced_tables
+
+    server = FastMCP("benchmark-toolbox", log_level="WARNING")
+
+    @server.tool()
+    def list_tables(project: str, dataset: str) -> str:
+        bench.record_tool_call("list_tables")
+        prefix = f"{project}.{dataset}."
+        return json.dumps([ref.removeprefix(prefix) for ref in bench.tables() if ref.startswith(prefix)])
+
+    @server.tool()
+    def get_table_info(project: str, dataset: str, table: str) -> str:
+        bench.record_tool_call("get_table_info")
+        ref = f"{project}.{dataset}.{table}"
+        if ref not in bench.tables():
+            raise ValueError(f"Not found: Table {ref}")
+        return json.dumps(bench.table_info(ref))
+
+    @server.tool()
+    def execute_sql(sql: str, dry_run: bool = False) -> str:
+        bench.record_tool_call("execute_sql_dry_run" if dry_run else "execute_sql")
+        known = {ref.split(".", 1)[1] for ref in bench.tables()} | set(bench.tables())
+        for name in referenced_tables(sql) or []:
+            if name not in known:
+                raise ValueError(f"Not found: Table {name} was not found in location {bench.location}")
+        if dry_run:
+            return json.dumps({"statistics": {"totalBytesProcessed": "1048576"}})
+        return json.dumps(bench.scenario.get("rows", []))
+
+    @server.tool()
+    def search_entries(query: str, pageSize: int = 10) -> str:
+        bench.record_tool_call("search_entries")
+        return json.dumps(bench.search(query)[:pageSize])
+
+    @server.tool()
+    def lookup_entry(name: str, entry: str, view: int = 2, aspectTypes: list[str] | None = None) -> str:
+        bench.record_tool_call("lookup_entry")
+        for ref in bench.tables():
+            if bench.entry(ref)["name"] == entry:
+                return json.dumps(bench.entry(ref, full=True))
+        raise ValueError(f"Entry {entry} not found")
+
+    return server
+
+
+def start_server(app, port):
+    """Serves an ASGI app from a background thread; set `should_exit` on the result to stop it."""
+    import uvicorn
+
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    uvicorn_server.thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    uvicorn_server.thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.01)
+    return uvicorn_server
+
+
+def start_toolbox(server, port):
+    return start_server(server.streamable_http_app(), port)
+
+
+def _function_responses(llm_request):
+    """Function responses in the request's last turn, as [(name, text)]."""
+    from agents.sql_agent.mcp_tools import McpToolError, tool_result_text
+
+    last = llm_request.contents[-1] if llm_request.contents else None
+    responses = []
+    for part in (last.parts if last and last.parts else []):
+        if part.function_response:
+            response = part.function_response.response or {}
+            try:
+                text = tool_result_text(response) if "content" in response else json.dumps(response)
+            except McpToolError as e:
+                text = str(e)
+            responses.append((part.function_response.name, text))
+    return responses
+
+
+def scripted_parts(bench, agent_name, llm_request):
+    """What a well-behaved model would answer `agent_name` with, as Parts."""
+    from google.genai.types import FunctionCall, Part
+    from agents.sql_agent.dataplex_metadata import (
+        build_semantic_context, describe_entry, table_entries, table_ref
+    )
+    from agents.sql_agent.mcp_tools import parse_json_text
+
+    def text(value):
+        return [Part(text=value)]
+
+    def calls(name, args_list):
+        return [Part(function_call=FunctionCall(name=name, args=args)) for args in args_list]
+
+    scenario = bench.scenario
+    responses = _function_responses(llm_request)
+    called = {name for name, _ in responses}
+
+    if agent_name.startswith("term_extractor"):
+        return text(json.dumps(scenario.get("terms", [])))
+
+    if agent_name.startswith("dataplex_searcher"):
+        if not called:
+            return calls("search_entries", [{"query": term, "pageSize": 10} for term in scenario.get("terms", [])])
+        if "search_entries" in called:
+            entries = {}
+            for _, result in responses:
+                entries.update(table_entries(result))
+            return calls("lookup_entry", [
+                {"name": "/".join(name.split("/")[:4]), "entry": name, "view": 2} for name in entries
+            ])
+        tables = {}
+        for _, result in responses:
+            entry = parse_json_text(result)
+            if isinstance(entry, dict) and entry.get("fullyQualifiedName"):
+                tables[table_ref(entry)] = describe_entry(entry)
+        return text(build_semantic_context(tables))
+
+    if agent_name.startswith("schema_inspector"):
+        refs = bench.scenario_tables()
+        if "get_table_info" not in called:
+            return calls("get_table_info", [
+                dict(zip(("project", "dataset", "table"), ref.split("."))) for ref in refs
+            ])
+        schema = {ref: parse_json_text(result) for ref, (_, result) in zip(refs, responses)}
+        return text(json.dumps(schema))
+
+    if agent_name.startswith("sql_generator"):
+        return text(f"```sql\n{scenario['sql']}\n```")
+
+    if agent_name == "sql_validator":
+        if not called:
+            return calls("execute_sql", [{"sql": scenario["sql"], "dry_run": True}])
+        return text(f"dry_run succeeded\n{responses[0][1]}")
+
+    if agent_name.startswith("sql_reviewer"):
+        if not called:
+            return calls("report_validation_result", [{"valid": True}])
+        return text("SQL is valid.")
+
+    if agent_name == "final_responder":
+        if not called:
+            return calls("execute_sql", [{"sql": scenario["sql"]}])
+        return text(f"Here are the results:\n{responses[0][1]}")
+
+    if agent_name == "final_responder_llm":
+        return text(f"The query returned {len(scenario.get('rows', []))} rows answering the question.")
+
+    return text("OK")
+
+
+def request_text(llm_request):
+    pieces = [str(llm_request.config.system_instruction or "")]
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                pieces.append(part.text)
+            if part.function_call:
+                pieces.append(json.dumps(part.function_call.args or {}))
+            if part.function_response:
+                pieces.append(json.dumps(part.function_response.response or {}, default=str))
+    return "\n".join(pieces)
+
+
+def register_scripted_model(bench):
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.models.registry import LLMRegistry
+    from google.genai.types import Content, GenerateContentResponseUsageMetadata
+
+    class ScriptedLlm(BaseLlm):
+        """Stands in for every `gemini-*` model."""
+
+        @classmethod
+        def supported_models(cls):
+            return [r"gemini-.*"]
+
+        async def generate_content_async(self, llm_request, stream=False):
+            if bench.llm_latency:
+                await asyncio.sleep(bench.llm_latency)
+            agent_name = (llm_request.config.labels or {}).get("adk_agent_name", "")
+            content = Content(role="model", parts=scripted_parts(bench, agent_name, llm_request))
+            prompt_tokens = estimate_tokens(request_text(llm_request))
+            output_tokens = estimate_tokens(
+                "".join(part.text or json.dumps(part.function_call.args) for part in content.parts)
+            )
+            yield LlmResponse(content=content, usage_metadata=GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ))
+
+    LLMRegistry.register(ScriptedLlm)
+    LLMRegistry.resolve.cache_clear()
+
+
+def create_benchmark_plugin(bench, root_name):
+    from google.adk.plugins.base_plugin import BasePlugin
+
+    class BenchmarkPlugin(BasePlugin):
+        """Times the root agent's stages and counts LLM calls and tokens per stage."""
+
+        def __init__(self):
+            super().__init__(name="benchmark")
+            self._started = {}
+
+        async def before_agent_callback(self, *, agent, callback_context):
+            if agent.parent_agent is not None and agent.parent_agent.name == root_name:
+                bench.stage = agent.name
+                self._started[agent.name] = time.perf_counter()
+            if agent.name in ("sql_validator", "sql_candidates"):
+                bench.stage_stats()["loop_iterations"] += 1
+
+        async def after_agent_callback(self, *, agent, callback_context):
+            if agent.name in self._started:
+                elapsed = time.perf_counter() - self._started.pop(agent.name)
+                bench.stage_stats(agent.name)["wall_seconds"] += elapsed
+
+        async def after_model_callback(self, *, callback_context, llm_response):
+            stats = bench.stage_stats()
+            stats["llm_calls"] += 1
+            usage = llm_response.usage_metadata
+            if usage:
+                stats["prompt_tokens"] += usage.prompt_token_count or 0
+                stats["output_tokens"] += usage.candidates_token_count or 0
+
+    return BenchmarkPlugin()
+
+
+def _totals(stages):
+    totals = {key: 0 for key in COMPARED_METRICS}
+    for stats in stages.values():
+        for key in ("llm_calls", "prompt_tokens", "output_tokens", "loop_iterations"):
+            totals[key] += stats[key]
+        totals["tool_calls"] += sum(stats["tool_calls"].values())
+    return totals
+
+
+async def run_scenario(bench, runner, scenario, run):
+    from google.genai.types import Content, Part
+    from agents.sql_agent.result_cache import normalize_sql
+
+    bench.start(scenario)
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="benchmark")
+    started = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id="benchmark",
+        session_id=session.id,
+        new_message=Content(role="user", parts=[Part(text=scenario["question"])]),
+    ):
+        pass
+    wall_seconds = time.perf_counter() - started
+
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id="benchmark", session_id=session.id
+    )
+    valid_sql = session.state.get("valid_sql") or ""
+    stages = {
+        name: {**stats, "wall_seconds": round(stats["wall_seconds"], 4), "tool_calls": dict(stats["tool_calls"])}
+        for name, stats in bench.stages.items()
+    }
+    return {
+        "name": scenario["name"],
+        "question": scenario["question"],
+        "run": run,
+        "wall_seconds": round(wall_seconds, 4),
+        **_totals(bench.stages),
+        "sql_matches_gold": bool(valid_sql) and normalize_sql(valid_sql) == normalize_sql(bench.scenario["sql"]),
+        "stages": stages,
+    }
+
+
+async def run_benchmark(scenarios, fixtures, runs, llm_latency):
+    from google.adk.runners import InMemoryRunner
+    import agents.sql_agent.agent as agent_module
+    from agents.sql_agent.mcp_pool import close_mcp_pools, mcp_pool_metrics
+
+    bench = Benchmark(fixtures, llm_latency=llm_latency)
+    toolbox = start_toolbox(create_fake_toolbox(bench), int(os.environ["TOOLBOX_PORT"]))
+    register_scripted_model(bench)
+
+    root_agent = agent_module.root_agent
+    runner = InMemoryRunner(
+        agent=root_agent, app_name="benchmark", plugins=[create_benchmark_plugin(bench, root_agent.name)]
+    )
+    results = []
+    try:
+        for run in range(1, runs + 1):
+            for scenario in scenarios:
+                results.append(await run_scenario(bench, runner, scenario, run))
+        pool_metrics = mcp_pool_metrics()
+    finally:
+        await close_mcp_pools()
+        toolbox.should_exit = True
+
+    totals = {key: sum(result[key] for result in results) for key in COMPARED_METRICS}
+    totals["wall_seconds"] = round(sum(result["wall_seconds"] for result in results), 4)
+    totals["sql_matches_gold"] = sum(result["sql_matches_gold"] for result in results)
+    totals["mcp_handshakes"] = sum(metrics["handshakes"] for metrics in pool_metrics.values())
+    return {"scenarios": results, "totals": totals}
+
+
+def compare(report, baseline):
+    """Metrics that increased against `baseline`, as human-readable lines."""
+    regressions = []
+    for key in COMPARED_METRICS:
+        before, after = baseline["totals"].get(key), report["totals"][key]
+        if before is not None and after > before:
+            regressions.append(f"{key}: {before} -> {after}")
+    return regressions
+
+
+def configure_environment(overrides, work_dir):
+    os.environ.update({
+        "DATAPLEX_ENABLED": "true",
+        "TOOLBOX_HOST": "127.0.0.1",
+        "TOOLBOX_PORT": str(_free_port()),
+        "SCHEMA_CACHE_DIR": os.path.join(work_dir, "schema"),
+        "RESULT_CACHE_DIR": os.path.join(work_dir, "results"),
+        "DATAPLEX_INDEX_PATH": os.path.join(work_dir, "dataplex_index.sqlite"),
+        # The scripted model has no context cache to create.
+        "PROMPT_CACHE_ENABLED": "false",
+    })
+    os.environ.update(overrides)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--runs", type=int, default=1,
+                        help="Replays of every scenario; later runs show cache effects.")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Simulated latency per model call.")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Configuration override, e.g. SEMANTIC_ENRICHER_MODE=llm.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    parser.add_argument("--baseline", help="Fail if any compared metric increased against this report.")
+    args = parser.parse_args()
+
+    overrides = dict(item.split("=", 1) for item in args.set)
+    with open(args.fixtures) as f:
+        fixtures = json.load(f)
+    scenarios = parse_test_cases(args.cases)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(overrides, work_dir)
+        report = asyncio.run(run_benchmark(scenarios, fixtures, args.runs, args.llm_latency_ms / 1000))
+    report["config"] = overrides
+    report["runs"] = args.runs
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f))
+        if regressions:
+            print("Regressions against the baseline: " + "; ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures what context caching saves on SQL generator calls, against the
+real Gemini API (it needs the same credentials as the agent).
+
+The generator's instruction is built with a schema in it (by default the
+tables of the offline benchmark fixture). Each test-case question is then
+sent `--calls` times with the instruction inline and `--calls` times through
+a `PromptCache` cache. The calls are streamed, to time the first token. The
+report gives mean prompt, cached and billed-equivalent prompt tokens, with
+cached tokens weighted by `--cached-price-ratio`, and p50/p95
+time-to-first-token for each mode. Gemini's implicit caching can make the
+inline calls report cached tokens as well.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmark_pipeline import DEFAULT_CASES, DEFAULT_FIXTURES, Benchmark, parse_test_cases
+
+
+def generator_template():
+    """The SQL generator's instruction, with its `{schema?}` placeholder."""
+    from agents.sql_agent.sql_generator_loop import create_sql_generator_loop
+
+    return create_sql_generator_loop().sub_agents[0].instruction
+
+
+def generator_instruction(schema, schema_format=None):
+    """The instruction as the generator sends it for `schema`, in `schema_format` (default: SCHEMA_PROMPT_FORMAT)."""
+    from agents.sql_agent.config import SCHEMA_PROMPT_FORMAT
+    from agents.sql_agent.schema_format import compact_schema
+
+    text = json.dumps(schema)
+    if (schema_format or SCHEMA_PROMPT_FORMAT) == "compact":
+        text = compact_schema(schema) or text
+    return generator_template().replace("{schema?}", text)
+
+
+async def timed_call(client, model, question, config):
+    started = time.perf_counter()
+    first_token, usage = None, None
+    async for chunk in await client.aio.models.generate_content_stream(
+        model=model, contents=question, config=config
+    ):
+        if first_token is None and chunk.text:
+            first_token = time.perf_counter() - started
+        usage = chunk.usage_metadata or usage
+    return {
+        "first_token_seconds": first_token if first_token is not None else time.perf_counter() - started,
+        "prompt_tokens": (usage.prompt_token_count or 0) if usage else 0,
+        "cached_tokens": (usage.cached_content_token_count or 0) if usage else 0,
+    }
+
+
+def summarize(calls, cached_price_ratio):
+    ttft = sorted(call["first_token_seconds"] for call in calls)
+    prompt = statistics.mean(call["prompt_tokens"] for call in calls)
+    cached = statistics.mean(call["cached_tokens"] for call in calls)
+    return {
+        "calls": len(calls),
+        "prompt_tokens": round(prompt, 1),
+        "cached_tokens": round(cached, 1),
+        "billed_prompt_tokens": round(prompt - cached + cached * cached_price_ratio, 1),
+        "first_token_p50_seconds": round(ttft[len(ttft) // 2], 3),
+        "first_token_p95_seconds": round(ttft[min(len(ttft) - 1, int(len(ttft) * 0.95))], 3),
+    }
+
+
+async def run(model, instruction, questions, calls, ttl_seconds, cached_price_ratio):
+    from google import genai
+    from google.genai.types import GenerateContentConfig
+    from agents.sql_agent.prompt_cache import PromptCache
+
+    client = genai.Client()
+    cache = PromptCache(client=client, ttl_seconds=ttl_seconds, min_tokens=0)
+    name = await cache.cached_content(model, instruction)
+    if name is None:
+        raise SystemExit("Could not create cached content; see the warning above.")
+    try:
+        results = {"inline": [], "cached": []}
+        for question in questions:
+            for _ in range(calls):
+                results["inline"].append(await timed_call(
+                    client, model, question, GenerateContentConfig(system_instruction=instruction)
+                ))
+                results["cached"].append(await timed_call(
+                    client, model, question, GenerateContentConfig(cached_content=name)
+                ))
+    finally:
+        await client.aio.caches.delete(name=name)
+
+    report = {mode: summarize(mode_calls, cached_price_ratio) for mode, mode_calls in results.items()}
+    inline, cached = report["inline"], report["cached"]
+    report["reduction"] = {
+        "billed_prompt_tokens": round(1 - cached["billed_prompt_tokens"] / inline["billed_prompt_tokens"], 3),
+        "first_token_p50_seconds": round(1 - cached["first_token_p50_seconds"] / inline["first_token_p50_seconds"], 3),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gemini-2.5-pro")
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--schema", help="JSON file with a `schema` state value to use instead of the fixture.")
+    parser.add_argument("--calls", type=int, default=3, help="Calls per question and mode.")
+    parser.add_argument("--ttl-seconds", type=int, default=600)
+    parser.add_argument("--cached-price-ratio", type=float, default=0.25,
+                        help="Price of a cached input token relative to an uncached one.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    if args.schema:
+        with open(args.schema) as f:
+            schema = json.load(f)
+    else:
+        with open(args.fixtures) as f:
+            bench = Benchmark(json.load(f))
+        schema = {ref: bench.table_info(ref) for ref in bench.tables()}
+    instruction = generator_instruction(schema)
+    questions = [case["question"] for case in parse_test_cases(args.cases)]
+
+    report = asyncio.run(run(
+        args.model, instruction, questions, args.calls, args.ttl_seconds, args.cached_price_ratio
+    ))
+    report["config"] = {
+        "model": args.model, "instruction_characters": len(instruction), "questions": len(questions),
+        "calls": args.calls, "cached_price_ratio": args.cached_price_ratio,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the JSON and compact schema formats of the SQL generator's prompt
+and reports the results as JSON.
+
+The schema is every table of the benchmark fixture in `get_table_info`
+shape, as the schema inspector leaves it in state. Tokens of the schema
+text and of the whole instruction are estimated offline at four characters
+per token for each format. With `--model`, the Gemini API also counts them
+exactly, and every test-case question is sent to the generator prompt in
+each format. A generated query is accurate when it passes the offline
+pre-validation and reads the same tables and columns as the gold SQL. That
+part needs the same credentials as the agent.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmark_pipeline import DEFAULT_CASES, DEFAULT_FIXTURES, Benchmark, estimate_tokens, parse_test_cases
+from benchmark_prompt_cache import generator_instruction
+
+FORMATS = ("json", "compact")
+
+
+def referenced(sql):
+    """Lower-cased table and column names `sql` reads, or None when it doesn't parse."""
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import SqlglotError
+
+    try:
+        expression = sqlglot.parse_one(sql, dialect="bigquery")
+    except SqlglotError:
+        return None
+    if expression is None:
+        return None
+    return (
+        {table.name.lower() for table in expression.find_all(exp.Table)},
+        {column.name.lower() for column in expression.find_all(exp.Column)},
+    )
+
+
+def score(sql, gold_sql, schema):
+    from agents.sql_agent.sql_prevalidator import check_sql
+
+    prevalidated = bool(sql) and not check_sql(sql, schema)
+    return {
+        "prevalidated": prevalidated,
+        "accurate": prevalidated and referenced(sql) is not None and referenced(sql) == referenced(gold_sql),
+    }
+
+
+def compare_tokens(schema):
+    """Estimated tokens of the schema text and of the whole generator instruction, per format."""
+    from agents.sql_agent.schema_format import compact_schema
+
+    texts = {"json": json.dumps(schema), "compact": compact_schema(schema)}
+    return {
+        name: {
+            "schema_tokens": estimate_tokens(texts[name]),
+            "instruction_tokens": estimate_tokens(generator_instruction(schema, name)),
+        }
+        for name in FORMATS
+    }
+
+
+async def generate(model, instructions, scenarios, bench, schema):
+    from google import genai
+    from google.genai.types import GenerateContentConfig
+    from agents.sql_agent.mcp_tools import strip_code_fence
+
+    client = genai.Client()
+    report = {}
+    for name, instruction in instructions.items():
+        counted = await client.aio.models.count_tokens(model=model, contents=instruction)
+        results = []
+        for scenario in scenarios:
+            bench.start(scenario)
+            response = await client.aio.models.generate_content(
+                model=model, contents=scenario["question"],
+                config=GenerateContentConfig(system_instruction=instruction, temperature=0),
+            )
+            sql = strip_code_fence(response.text or "")
+            results.append({
+                "name": scenario["name"],
+                **score(sql, bench.scenario["sql"], schema),
+                "prompt_tokens": response.usage_metadata.prompt_token_count if response.usage_metadata else None,
+            })
+        report[name] = {
+            "counted_instruction_tokens": counted.total_tokens,
+            "accuracy": round(statistics.mean(r["accurate"] for r in results), 3),
+            "prevalidation_pass_rate": round(statistics.mean(r["prevalidated"] for r in results), 3),
+            "scenarios": results,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--model", help="Also measure exact tokens and accuracy with this Gemini model.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        bench = Benchmark(json.load(f))
+    schema = {ref: bench.table_info(ref) for ref in bench.tables()}
+    report = {"formats": compare_tokens(schema)}
+    json_tokens, compact_tokens = (report["formats"][name]["schema_tokens"] for name in FORMATS)
+    report["schema_token_reduction"] = round(1 - compact_tokens / json_tokens, 3)
+
+    if args.model:
+        instructions = {name: generator_instruction(schema, name) for name in FORMATS}
+        scenarios = parse_test_cases(args.cases)
+        measured = asyncio.run(generate(args.model, instructions, scenarios, bench, json.dumps(schema)))
+        for name, results in measured.items():
+            report["formats"][name].update(results)
+    report["config"] = {"fixtures": args.fixtures, "tables": len(schema), "model": args.model}
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
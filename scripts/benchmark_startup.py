@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures cold start in fresh interpreters: importing third-party
+dependencies, importing the agent package, and building `root_agent`.
+Prints a JSON report; exits non-zero if the package's own import time
+exceeds `--budget-ms`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import google.adk.agents, google.genai, mcp, sqlglot, dotenv
+deps = time.perf_counter()
+import agents.sql_agent.agent as agent_module
+imported = time.perf_counter()
+agent_module.root_agent
+built = time.perf_counter()
+print(json.dumps({
+    "dependencies_ms": (deps - started) * 1000,
+    "package_import_ms": (imported - deps) * 1000,
+    "root_agent_build_ms": (built - imported) * 1000,
+    "total_ms": (built - started) * 1000,
+}))
+"""
+
+
+def run_probe(repo_root):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=repo_root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    report = {}
+    for key in samples[0]:
+        values = [sample[key] for sample in samples]
+        report[key] = {
+            "median": round(statistics.median(values), 2),
+            "min": round(min(values), 2),
+            "max": round(max(values), 2),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail if the median package import time exceeds this.")
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = summarize([run_probe(repo_root) for _ in range(args.runs)])
+    report["runs"] = args.runs
+    print(json.dumps(report, indent=2))
+
+    if args.budget_ms is not None and report["package_import_ms"]["median"] > args.budget_ms:
+        print(f"Package import exceeded the {args.budget_ms} ms budget.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
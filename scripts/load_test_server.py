@@ -0,0 +1,168 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Load-tests the HTTP serving entry point (`agents/sql_agent/server.py`)
+offline and reports throughput, p50/p95/p99 latency and rejections as JSON.
+
+The server runs in-process against the same stand-in toolbox and scripted
+model as `benchmark_pipeline.py`. `--concurrency` clients send
+`--requests` questions in total, each one a new session. The SQL and result
+caches and question coalescing are off unless re-enabled with `--set`, so
+every request runs the whole pipeline; `--set SINGLE_FLIGHT_ENABLED=true`
+shows a dashboard refresh instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmark_pipeline import (
+    DEFAULT_CASES,
+    DEFAULT_FIXTURES,
+    Benchmark,
+    _free_port,
+    configure_environment,
+    create_fake_toolbox,
+    parse_test_cases,
+    register_scripted_model,
+    start_server,
+    start_toolbox,
+)
+
+_LOAD_TEST_DEFAULTS = {
+    "SQL_CACHE_ENABLED": "false", "RESULT_CACHE_ENABLED": "false", "SINGLE_FLIGHT_ENABLED": "false",
+}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values`, or None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+async def send_requests(base_url, question, requests, concurrency):
+    import httpx
+
+    remaining = iter(range(requests))
+    outcomes = []
+
+    async def client(client_id, http):
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await http.post(
+                    "/query", json={"question": question, "user_id": f"load-{client_id}"}
+                )
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            outcomes.append((status, time.perf_counter() - started))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(i, http) for i in range(concurrency)))
+        wall_seconds = time.perf_counter() - started
+        metrics = (await http.get("/metrics")).json()
+    return outcomes, wall_seconds, metrics
+
+
+def summarize(outcomes, wall_seconds):
+    latencies = [seconds * 1000 for status, seconds in outcomes if status == 200]
+    return {
+        "requests": len(outcomes),
+        "succeeded": len(latencies),
+        "rejected": sum(status in (429, 503) for status, _ in outcomes),
+        "errors": sum(status not in (200, 429, 503) for status, _ in outcomes),
+        "wall_seconds": round(wall_seconds, 4),
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": {
+            name: round(value, 1) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", max(latencies, default=None)),
+            )
+        },
+    }
+
+
+def run_load_test(scenario, fixtures, requests, concurrency, llm_latency):
+    from agents.sql_agent.server import create_app
+
+    bench = Benchmark(fixtures, llm_latency=llm_latency)
+    bench.start(scenario)
+    toolbox = start_toolbox(create_fake_toolbox(bench), int(os.environ["TOOLBOX_PORT"]))
+    register_scripted_model(bench)
+    port = _free_port()
+    server = start_server(create_app(), port)
+    try:
+        outcomes, wall_seconds, metrics = asyncio.run(
+            send_requests(f"http://127.0.0.1:{port}", scenario["question"], requests, concurrency)
+        )
+    finally:
+        # Stopping the server drains it and closes the MCP pool before the toolbox goes away.
+        server.should_exit = True
+        server.thread.join(timeout=30)
+        toolbox.should_exit = True
+    return {**summarize(outcomes, wall_seconds), "server_metrics": metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--scenario", type=int, default=0, help="Index of the test case whose question is sent.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="Clients sending requests back to back.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0,
+                        help="Simulated latency per model call.")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Configuration override, e.g. SERVE_MAX_CONCURRENT_REQUESTS=8.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    overrides = {**_LOAD_TEST_DEFAULTS, **dict(item.split("=", 1) for item in args.set)}
+    with open(args.fixtures) as f:
+        fixtures = json.load(f)
+    scenario = parse_test_cases(args.cases)[args.scenario]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(overrides, work_dir)
+        report = run_load_test(
+            scenario, fixtures, args.requests, args.concurrency, args.llm_latency_ms / 1000
+        )
+    report["config"] = {
+        **overrides, "requests": args.requests, "concurrency": args.concurrency,
+        "llm_latency_ms": args.llm_latency_ms, "question": scenario["question"],
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    if report["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pulls BigQuery table entries and their aspects from Dataplex into the local
+index used by `SEMANTIC_ENRICHER_MODE=index`. Run it on a schedule; after the
+first run only entries updated since the previous sync are looked up.
+"""
+
+import argparse
+import os
+import sys
+from google.cloud import dataplex_v1
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.sql_agent.config import DATAPLEX_INDEX_PATH
+from agents.sql_agent.dataplex_index import DataplexIndex, sync_index
+from agents.sql_agent.dataplex_metadata import entry_parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index", default=DATAPLEX_INDEX_PATH)
+    parser.add_argument("--query", default="system=bigquery type=table")
+    parser.add_argument("--full", action="store_true", help="Ignore the last sync time.")
+    args = parser.parse_args()
+
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    if not project_id:
+        print("Error: GOOGLE_CLOUD_PROJECT environment variable not set.")
+        sys.exit(1)
+
+    client = dataplex_v1.CatalogServiceClient()
+    index = DataplexIndex(args.index)
+    if args.full:
+        index.set_state("last_sync", "")
+
+    def search(query):
+        results = client.search_entries(
+            request={"name": f"projects/{project_id}/locations/global", "query": query}
+        )
+        return [dataplex_v1.SearchEntriesResult.to_dict(result) for result in results]
+
+    def lookup(name):
+        entry = client.lookup_entry(request={
+            "name": entry_parent(name),
+            "entry": name,
+            "view": dataplex_v1.EntryView.ALL,
+        })
+        return dataplex_v1.Entry.to_dict(entry)
+
+    written = sync_index(index, search, lookup, query=args.query)
+    print(f"Synced {written} entries; the index now holds {len(index)} tables.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import InvocationContext
+from google.adk.agents.run_config import RunConfig
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai.types import Content, Part
+
+
+class FakeTool:
+    def __init__(self, name, handler):
+        self.name = name
+        self.handler = handler
+        self.calls = []
+
+    async def run_async(self, *, args, tool_context):
+        self.calls.append(args)
+        result = self.handler(**args) if callable(self.handler) else self.handler
+        if isinstance(result, Exception):
+            return {"content": [{"type": "text", "text": str(result)}], "isError": True}
+        if not isinstance(result, str):
+            result = json.dumps(result)
+        return {"content": [{"type": "text", "text": result}]}
+
+
+class FakeToolset:
+    """Stands in for an McpToolset, serving canned results per tool name."""
+
+    def __init__(self, handlers):
+        self.tools = {name: FakeTool(name, handler) for name, handler in handlers.items()}
+
+    async def get_tools(self, readonly_context=None):
+        return list(self.tools.values())
+
+
+@pytest.fixture
+def fake_toolset():
+    return FakeToolset
+
+
+@pytest.fixture
+def make_context():
+    async def _make_context(agent, state=None, question=None):
+        session_service = InMemorySessionService()
+        session = await session_service.create_session(
+            app_name="test-app", user_id="test-user", state=state or {}
+        )
+        return InvocationContext(
+            invocation_id="test-invocation",
+            agent=agent,
+            session=session,
+            session_service=session_service,
+            user_content=Content(role="user", parts=[Part(text=question)]) if question else None,
+            run_config=RunConfig()
+        )
+    return _make_context
+
+
+@pytest.fixture
+def run_agent():
+    async def _run_agent(agent, context):
+        events = []
+        async for event in agent.run_async(context):
+            if event.actions.state_delta:
+                context.session.state.update(event.actions.state_delta)
+            events.append(event)
+        return events
+    return _run_agent
@@ -24,6 +24,7 @@ def agent_modules():
 def test_root_agent_structure_dataplex_disabled(monkeypatch, agent_modules):
     agent_module, config_module = agent_modules
     monkeypatch.setenv("DATAPLEX_ENABLED", "false")
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "false")
     importlib.reload(config_module)
     importlib.reload(agent_module)
     root_agent = agent_module.create_root_agent()
@@ -37,6 +38,7 @@ def test_root_agent_structure_dataplex_disabled(monkeypatch, agent_modules):
 def test_root_agent_structure_dataplex_enabled(monkeypatch, agent_modules):
     agent_module, config_module = agent_modules
     monkeypatch.setenv("DATAPLEX_ENABLED", "true")
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "false")
     importlib.reload(config_module)
     importlib.reload(agent_module)
     root_agent = agent_module.create_root_agent()
@@ -48,18 +50,44 @@ def test_root_agent_structure_dataplex_enabled(monkeypatch, agent_modules):
     assert root_agent.sub_agents[2].name == "sql_loop"
     assert root_agent.sub_agents[3].name == "final_responder"
 
+def test_root_agent_structure_schema_pruning_enabled(monkeypatch, agent_modules):
+    agent_module, config_module = agent_modules
+    monkeypatch.setenv("DATAPLEX_ENABLED", "false")
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "true")
+    importlib.reload(config_module)
+    importlib.reload(agent_module)
+    root_agent = agent_module.create_root_agent()
+
+    assert len(root_agent.sub_agents) == 4
+    assert root_agent.sub_agents[0].name == "schema_inspector"
+    assert root_agent.sub_agents[1].name == "schema_pruner"
+    assert root_agent.sub_agents[2].name == "sql_loop"
+    assert root_agent.sub_agents[3].name == "final_responder"
+
 def test_loop_agent_structure(monkeypatch, agent_modules):
     agent_module, config_module = agent_modules
     # The loop agent is always present, just its index changes.
     # We can test with either setting, it should be the same.
     monkeypatch.setenv("DATAPLEX_ENABLED", "false")
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "false")
     importlib.reload(config_module)
     importlib.reload(agent_module)
     root_agent = agent_module.create_root_agent()
     loop_agent = root_agent.sub_agents[1] # Index when disabled
 
     assert isinstance(loop_agent, LoopAgent)
-    assert len(loop_agent.sub_agents) == 3
+    assert len(loop_agent.sub_agents) == 4
     assert loop_agent.sub_agents[0].name == "sql_generator"
     assert loop_agent.sub_agents[1].name == "sql_validator"
     assert loop_agent.sub_agents[2].name == "sql_reviewer"
+    assert loop_agent.sub_agents[3].name == "loop_controller"
+
+def test_agents_are_built_lazily_once(agent_modules):
+    agent_module, config_module = agent_modules
+    importlib.reload(config_module)
+    importlib.reload(agent_module)
+    assert "root_agent" not in vars(agent_module)
+
+    root_agent = agent_module.root_agent
+    assert isinstance(root_agent, SequentialAgent)
+    assert agent_module.root_agent is root_agent
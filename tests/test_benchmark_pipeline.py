@@ -0,0 +1,47 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPO_ROOT, "scripts", "benchmark_pipeline.py")
+
+
+def test_benchmark_replays_dataplex_cases_offline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"totals": {"llm_calls": 0}}))
+
+    completed = subprocess.run(
+        [sys.executable, SCRIPT, "--output", str(tmp_path / "report.json"), "--baseline", str(baseline)],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=300,
+    )
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert [s["name"] for s in report["scenarios"]] == [
+        "Test Case 1: Business Rule Application",
+        "Test Case 2: Obscure Column Name Resolution",
+        "Test Case 3: Multiple Obscure Terms",
+    ]
+    assert report["totals"]["sql_matches_gold"] == 3
+    first = report["scenarios"][0]
+    assert first["loop_iterations"] == 1
+    assert first["stages"]["sql_loop"]["tool_calls"] == {"execute_sql_dry_run": 1}
+    assert first["stages"]["final_responder"]["tool_calls"]["execute_sql"] == 1
+    assert first["stages"]["semantic_enricher"]["llm_calls"] == 1
+    # Any LLM call is a regression against a zero-call baseline.
+    assert completed.returncode == 1
+    assert "llm_calls: 0 ->" in completed.stderr
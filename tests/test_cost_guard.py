@@ -0,0 +1,58 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from agents.sql_agent.cost_guard import ByteBudget, cost_guidance
+
+SCHEMA = {
+    "bigquery-public-data.google_trends.top_terms": {
+        "Schema": [{"Name": "term"}, {"Name": "refresh_date"}],
+        "TimePartitioning": {"Field": "refresh_date"},
+    },
+}
+
+
+def test_cost_guidance_is_specific():
+    filtered = "SELECT term FROM `bigquery-public-data.google_trends.top_terms` WHERE refresh_date = '2024-01-01'"
+    assert "partition column" not in cost_guidance(filtered, SCHEMA)
+    assert "SELECT *" not in cost_guidance(filtered, SCHEMA)
+
+    unfiltered = "SELECT term FROM `bigquery-public-data.google_trends.top_terms`"
+    assert "partition column `refresh_date`" in cost_guidance(unfiltered, SCHEMA)
+    assert "narrower range" in cost_guidance("not sql at all (", SCHEMA)
+
+
+def test_cost_guidance_reads_table_layouts():
+    # The LLM's consolidated schema dropped the partitioning; get_table_info kept it.
+    schema = {"top_terms": [{"name": "term"}, {"name": "refresh_date"}, {"name": "dma_id"}]}
+    layouts = {"top_terms": {"TimePartitioning": {"Field": "refresh_date"}, "Clustering": {"Fields": ["dma_id"]}}}
+    unfiltered = "SELECT term FROM `bigquery-public-data.google_trends.top_terms`"
+
+    assert "partition column" not in cost_guidance(unfiltered, schema)
+    guidance = cost_guidance(unfiltered, schema, layouts)
+    assert "partition column `refresh_date`" in guidance
+    assert "cluster column `dma_id`" in guidance
+    assert "cluster column" not in cost_guidance(f"{unfiltered} WHERE dma_id = 501", schema, layouts)
+
+
+def test_user_budget_counts_charged_queries():
+    budget = ByteBudget(max_user_bytes=1000, window_seconds=60)
+    assert budget.check(800, "alice") is None
+    budget.charge("alice", 800)
+
+    assert "only 200 B of this user's" in budget.check(300, "alice")
+    assert budget.check(300, "bob") is None
+    assert budget.check(None, "alice") is None
+
+    budget.window_seconds = 0
+    assert budget.spent("alice") == 0
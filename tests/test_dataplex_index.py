@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import pytest
+from agents.sql_agent.dataplex_index import DataplexIndex, sync_index
+from agents.sql_agent.semantic_enricher import DataplexEnricher
+
+
+def _entry(table, update_time="2025-10-01T00:00:00Z", column="refund_amount", term="Refund Processing Fee"):
+    name = f"projects/123/locations/us/entryGroups/@bigquery/entries/{table}"
+    return {
+        "name": name,
+        "fullyQualifiedName": f"bigquery:p.sales_domain.{table}",
+        "updateTime": update_time,
+        "entrySource": {"description": f"Sales {table}."},
+        "aspects": {
+            "p.us.refund-amount-aspect-type": {
+                "path": f"schema.fields.{column}",
+                "data": {"business_term": term, "rule_description": "Adds a fee.", "rule_formula": "+ 15.00"},
+            },
+        },
+    }
+
+
+def test_search_matches_terms_and_falls_back_to_embeddings(tmp_path):
+    index = DataplexIndex(str(tmp_path / "index.sqlite"))
+    index.upsert(_entry("transactions"))
+    index.upsert(_entry("customers", column="ltv", term="Customer Lifetime Value"))
+
+    tables = index.search(["refunds"])
+    assert list(tables) == ["p.sales_domain.transactions"]
+    description, columns, rules = tables["p.sales_domain.transactions"]
+    assert description == "Sales transactions."
+    assert columns == {"refund_amount": "Refund Processing Fee"}
+    assert rules == {"refund_amount": "Adds a fee. Formula: `refund_amount + 15.00`."}
+
+    assert list(index.search(["customr"])) == ["p.sales_domain.customers"]
+    assert index.search(["zzzz qqqq"], min_similarity=0.5) == {}
+    assert not index.upsert({"name": "x", "fullyQualifiedName": "gcs:bucket"})
+
+
+def test_sync_is_incremental(tmp_path):
+    index = DataplexIndex(str(tmp_path / "index.sqlite"))
+    entries = {e["name"]: e for e in (_entry("transactions"), _entry("customers"))}
+    queries, lookups = [], []
+
+    def search(query):
+        queries.append(query)
+        return [{"dataplexEntry": entry} for entry in entries.values()]
+
+    def lookup(name):
+        lookups.append(name)
+        return entries[name]
+
+    now = datetime.datetime(2025, 10, 2, tzinfo=datetime.timezone.utc)
+    assert sync_index(index, search, lookup, now=now) == 2
+    assert len(index) == 2
+
+    changed = _entry("customers", update_time="2025-10-02T12:00:00Z")
+    entries[changed["name"]] = changed
+    lookups.clear()
+    assert sync_index(index, search, lookup, now=now) == 1
+    assert lookups == [changed["name"]]
+    assert queries[-1] == "system=bigquery type=table updatetime>=2025-10-02"
+
+
+@pytest.mark.asyncio
+async def test_enricher_answers_from_index_and_fills_it_on_a_miss(tmp_path, fake_toolset, make_context, run_agent):
+    entry = _entry("transactions")
+    toolset = fake_toolset({
+        "search_entries": [{"dataplexEntry": entry}],
+        "lookup_entry": entry,
+    })
+    enricher = DataplexEnricher(
+        name="dataplex_searcher", toolset=toolset, index=DataplexIndex(str(tmp_path / "index.sqlite"))
+    )
+
+    context = await make_context(enricher, state={"extracted_terms": '["refunds"]'})
+    await run_agent(enricher, context)
+    assert context.session.state["semantic_source"] == "live"
+    assert len(enricher.index) == 1
+
+    context = await make_context(enricher, state={"extracted_terms": '["refunds"]'})
+    await run_agent(enricher, context)
+    assert context.session.state["semantic_source"] == "index"
+    assert context.session.state["filtered_table_list"] == ["p.sales_domain.transactions"]
+    assert len(toolset.tools["search_entries"].calls) == 1
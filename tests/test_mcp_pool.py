@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from contextlib import AsyncExitStack
+from types import SimpleNamespace
+import pytest
+from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
+from agents.sql_agent.mcp_pool import McpSessionPool, PooledMcpToolset
+
+PARAMS = StreamableHTTPConnectionParams(url="http://toolbox.test/mcp")
+
+
+class FakeSession:
+    def __init__(self):
+        self._read_stream = SimpleNamespace(_closed=False)
+        self._write_stream = SimpleNamespace(_closed=False)
+        self.ping_fails = False
+        self.pings = 0
+
+    async def send_ping(self):
+        self.pings += 1
+        if self.ping_fails:
+            raise ConnectionError("gone")
+
+
+class FakePool(McpSessionPool):
+    async def _connect(self, merged_headers):
+        return FakeSession(), AsyncExitStack()
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_sessions_round_robin():
+    pool = FakePool(PARAMS, size=2)
+    first, second = await pool.create_session(), await pool.create_session()
+    assert first is not second
+    assert [await pool.create_session() for _ in range(3)] == [first, second, first]
+
+    metrics = pool.metrics()
+    assert metrics["pool_size"] == 2
+    assert metrics["handshakes"] == 2
+    assert metrics["reuses"] == 3
+
+@pytest.mark.asyncio
+async def test_pool_reconnects_closed_and_unhealthy_sessions():
+    pool = FakePool(PARAMS, size=1, health_check_seconds=0)
+    session = await pool.create_session()
+    session.ping_fails = True
+
+    replacement = await pool.create_session()
+    assert replacement is not session
+    replacement._read_stream._closed = True
+    assert await pool.create_session() is not replacement
+
+    metrics = pool.metrics()
+    assert metrics["reconnects"] == 2
+    assert metrics["health_check_failures"] == 1
+    assert metrics["pool_size"] == 1
+
+@pytest.mark.asyncio
+async def test_pooled_toolsets_share_the_pool():
+    pool = FakePool(PARAMS, size=1)
+    sql_tools = PooledMcpToolset(pool=pool, tool_filter=["execute_sql"])
+    schema_tools = PooledMcpToolset(pool=pool, tool_filter=["list_tables"])
+
+    assert sql_tools._mcp_session_manager is schema_tools._mcp_session_manager is pool
+    await sql_tools.close()
+    await pool.create_session()
+    await pool.create_session()
+    assert pool.metrics()["handshakes"] == 1
+
+@pytest.mark.asyncio
+async def test_pool_coalesces_identical_calls_and_limits_concurrency():
+    import asyncio
+
+    class CountingSession(FakeSession):
+        calls, running, peak = 0, 0, 0
+
+        async def call_tool(self, name, arguments=None, **kwargs):
+            type(self).calls += 1
+            type(self).running += 1
+            type(self).peak = max(self.peak, self.running)
+            await asyncio.sleep(0.01)
+            type(self).running -= 1
+            return f"{name} {arguments}"
+
+    pool = McpSessionPool(PARAMS, max_concurrent_calls=2, coalesced_tools=["get_table_info"])
+    session = pool._wrap_calls(CountingSession())
+
+    args = {"project": "p", "dataset": "d", "table": "t"}
+    results = await asyncio.gather(*(session.call_tool("get_table_info", arguments=args) for _ in range(5)))
+    assert len(set(results)) == 1
+    assert CountingSession.calls == 1
+    assert pool.metrics()["calls_coalesced"] == 4
+
+    await asyncio.gather(*(session.call_tool("execute_sql", arguments={"sql": "SELECT 1"}) for _ in range(5)))
+    assert CountingSession.calls == 6
+    assert CountingSession.peak == 2
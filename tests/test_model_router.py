@@ -0,0 +1,101 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event, EventActions
+from agents.sql_agent.model_router import ModelRouter, create_model_router_callbacks, question_complexity
+
+TOP_TERMS = {"schema": {"fields": [{"name": "term", "type": "STRING"}, {"name": "rank", "type": "INTEGER"}]}}
+NESTED = {"schema": {"fields": [{"name": "terms", "type": "RECORD", "mode": "REPEATED", "fields": [
+    {"name": "term", "type": "STRING"},
+]}]}}
+
+
+def test_routes_by_complexity_and_fast_failure_rate():
+    router = ModelRouter(min_samples=2, window=2)
+    one_table = {"google_trends.top_terms": TOP_TERMS}
+
+    assert router.route(question_complexity("What are today's top terms?", one_table)) == ("fast", "gemini-2.5-flash")
+    assert router.route(question_complexity("Rank terms by their growth", one_table))[0] == "strong"
+    assert router.route(question_complexity(
+        "What are today's top terms?", {**one_table, "google_trends.top_rising_terms": TOP_TERMS}
+    ))[0] == "strong"
+    assert router.route(question_complexity("Which terms are there?", {"google_trends.nested": NESTED}))[0] == "strong"
+    assert question_complexity("Top terms", json.dumps(one_table))["tables"] == 1
+
+    router.record("fast", valid=True, escalated=True, iterations=2, seconds=3.0)
+    router.record("fast", valid=False, escalated=False, iterations=5, seconds=9.0)
+    assert router.fast_failure_rate() == 1.0
+    assert router.route(question_complexity("What are today's top terms?", one_table))[0] == "strong"
+    assert router.metrics()["fast"] == {
+        "questions": 2, "valid": 1, "escalated": 1, "iterations": 7, "seconds": 12.0,
+        "accuracy": 0.5, "mean_seconds": 6.0, "mean_iterations": 3.5,
+    }
+
+
+class Noop(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_escalates_after_failed_validation(make_context):
+    router = ModelRouter()
+    route_question, escalate_after_failure, record_route = create_model_router_callbacks(router)
+    ctx = await make_context(
+        Noop(name="sql_generator"),
+        state={"schema": json.dumps({"google_trends.top_terms": TOP_TERMS})},
+        question="What are today's top terms?",
+    )
+    callback_context = CallbackContext(ctx)
+
+    def validated(result):
+        ctx.session.events.append(Event(
+            invocation_id=ctx.invocation_id, author="sql_validator",
+            actions=EventActions(state_delta={"validation_result": result}),
+        ))
+
+    route_question(callback_context)
+    assert ctx.session.state["sql_generator_model"] == "gemini-2.5-flash"
+    escalate_after_failure(callback_context, None)
+    assert ctx.session.state["sql_generator_model"] == "gemini-2.5-flash"
+
+    validated("dry_run failed: Unrecognized name: trem")
+    escalate_after_failure(callback_context, None)
+    assert ctx.session.state["sql_generator_model"] == "gemini-2.5-pro"
+    assert ctx.session.state["model_route"]["escalated"]
+
+    validated("dry_run succeeded\n{}")
+    record_route(callback_context)
+    route = ctx.session.state["model_route"]
+    assert (route["route"], route["valid"], route["iterations"]) == ("fast", True, 2)
+    assert router.stats["fast"]["escalated"] == 1
+
+@pytest.mark.asyncio
+async def test_sql_loop_forgets_the_previous_route(make_context):
+    from agents.sql_agent.sql_generator_loop import create_sql_generator_loop, reset_loop_state
+
+    assert create_sql_generator_loop().before_agent_callback[0] is reset_loop_state
+    ctx = await make_context(Noop(name="sql_loop"), state={
+        "model_route": {"route": "strong", "valid": True}, "sql_generator_model": "gemini-2.5-pro",
+    })
+
+    # Runs before the SQL cache lookup, which skips the router on a hit.
+    reset_loop_state(CallbackContext(ctx))
+
+    assert ctx.session.state["model_route"] is None
+    assert ctx.session.state["sql_generator_model"] is None
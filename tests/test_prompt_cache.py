@@ -0,0 +1,126 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+from types import SimpleNamespace
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai.types import GenerateContentConfig
+from agents.sql_agent.prompt_cache import PromptCache, create_prompt_cache_callback, min_cache_tokens, prompt_fingerprint
+
+PROMPT = "You are the SQL Generator.\n" + "schema " * 200
+
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created, self.updated = [], []
+
+    async def create(self, model, config):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("caching is not enabled for this project")
+        self.created.append((model, config.system_instruction, config.ttl))
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    async def update(self, name, config):
+        self.updated.append((name, config.ttl))
+
+
+def fake_client(caches):
+    return SimpleNamespace(aio=SimpleNamespace(caches=caches))
+
+
+@pytest.mark.asyncio
+async def test_prompt_is_cached_once_and_refreshed_before_expiry():
+    caches = FakeCaches()
+    cache = PromptCache(client=fake_client(caches), ttl_seconds=600, min_tokens=100, refresh_seconds=60)
+
+    names = await asyncio.gather(*(cache.cached_content("gemini-2.5-pro", PROMPT) for _ in range(3)))
+    assert names == ["cachedContents/1"] * 3
+    assert caches.created == [("gemini-2.5-pro", PROMPT, "600s")]
+
+    assert await cache.cached_content("gemini-2.5-flash", PROMPT) == "cachedContents/2"
+    assert await cache.cached_content("gemini-2.5-pro", "short prompt") is None
+
+    next(iter(cache._entries.values()))["expires"] -= 590
+    assert await cache.cached_content("gemini-2.5-pro", PROMPT) == "cachedContents/1"
+    assert caches.updated == [("cachedContents/1", "600s")]
+    assert cache.stats == {"hits": 0, "created": 2, "refreshed": 1, "skipped": 1, "fallbacks": 0}
+
+
+@pytest.mark.asyncio
+async def test_callback_falls_back_to_the_uncached_prompt():
+    caches = FakeCaches(fail=True)
+    cache = PromptCache(client=fake_client(caches), min_tokens=100)
+    use_cached_prompt = create_prompt_cache_callback(cache)
+
+    request = LlmRequest(model="gemini-2.5-pro", config=GenerateContentConfig(system_instruction=PROMPT))
+    await use_cached_prompt(None, request)
+    assert request.config.system_instruction == PROMPT
+    assert request.config.cached_content is None
+
+    caches.fail = False
+    await use_cached_prompt(None, request)  # Still within the retry delay.
+    assert caches.created == []
+    assert cache.stats["fallbacks"] == 2
+
+    cache._retry_after.clear()
+    await use_cached_prompt(None, request)
+    assert request.config.cached_content == "cachedContents/1"
+    assert request.config.system_instruction is None
+
+
+def test_cache_key_and_minimum_per_model():
+    template = "You are the SQL Generator.\n\n`schema`:\n"
+    spaced = template + '{"t": [{"name": "a"}]}'
+    compact = template + '{"t":[{"name":"a"}]}'
+    assert prompt_fingerprint("m", spaced, spaced[len(template):]) == prompt_fingerprint("m", compact, compact[len(template):])
+    assert prompt_fingerprint("m", spaced, '{"t": []}') != prompt_fingerprint("m", spaced, '{"u": []}')
+
+    assert min_cache_tokens("gemini-2.5-flash") == min_cache_tokens("models/gemini-2.5-flash-lite") == 1024
+    assert min_cache_tokens("gemini-2.5-pro") == 4096
+    assert min_cache_tokens("gemini-2.5-pro", {"gemini-2.5-pro": 2048}) == 2048
+
+
+@pytest.mark.asyncio
+async def test_generator_prompt_is_cached_with_default_settings(monkeypatch):
+    from agents.sql_agent import sql_generator_loop
+    from agents.sql_agent.config import SQL_ROUTER_FAST_MODEL
+
+    caches = FakeCaches()
+    cache = sql_generator_loop.prompt_cache
+    monkeypatch.setattr(cache, "_client", fake_client(caches))
+    monkeypatch.setattr(cache, "_entries", {})
+    monkeypatch.setattr(cache, "stats", dict.fromkeys(cache.stats, 0))
+    generator = sql_generator_loop.create_sql_generator_loop().sub_agents[0]
+    callbacks = [
+        callback for callback in generator.before_model_callback
+        if callback.__name__ in ("use_compact_schema", "use_cached_prompt")
+    ]
+    schema = '{"top_terms": [{"name": "term", "type": "STRING"}, {"name": "week", "type": "DATE"}]}'
+
+    for _ in range(2):
+        request = LlmRequest(model=SQL_ROUTER_FAST_MODEL, config=GenerateContentConfig(
+            system_instruction=generator.instruction.replace("{schema?}", schema),
+        ))
+        for callback in callbacks:
+            result = callback(SimpleNamespace(state={"schema": schema}), request)
+            if inspect.isawaitable(result):
+                await result
+        assert request.config.cached_content == "cachedContents/1"
+
+    assert len(caches.created) == 1
+    assert cache.stats["hits"] == 1
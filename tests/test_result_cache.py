@@ -0,0 +1,93 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.tools.tool_context import ToolContext
+from agents.sql_agent.result_cache import (
+    ResultCache,
+    bytes_processed,
+    create_result_cache_callbacks,
+    is_cacheable,
+    normalize_sql,
+)
+
+SQL = "SELECT term FROM `bigquery-public-data.google_trends.top_terms` LIMIT 5"
+RESULT = {"content": [{"type": "text", "text": '[{"term": "pizza"}]'}]}
+
+
+class ExecuteSql:
+    name = "execute_sql"
+
+
+def test_normalize_sql():
+    assert normalize_sql(f"```sql\n{SQL.lower()}\n```") == normalize_sql(SQL)
+
+def test_bytes_processed():
+    assert bytes_processed('dry_run succeeded\n{"statistics": {"totalBytesProcessed": "2048"}}') == 2048
+    assert bytes_processed("dry_run failed: boom") is None
+
+def test_current_date_queries_are_keyed_by_day():
+    sql = "SELECT term FROM `bigquery-public-data.google_trends.top_terms` WHERE refresh_date = CURRENT_DATE()"
+    fingerprints = {"bigquery-public-data.google_trends.top_terms": "1|a"}
+    day = datetime.datetime(2025, 3, 1, 12, tzinfo=datetime.timezone.utc)
+    next_day = day + datetime.timedelta(days=1)
+    assert ResultCache.make_key(sql, fingerprints, day) == ResultCache.make_key(sql, fingerprints, day)
+    assert ResultCache.make_key(sql, fingerprints, day) != ResultCache.make_key(sql, fingerprints, next_day)
+    # 03:00 UTC is still the previous day in Los Angeles, the timezone the prompt assumes.
+    los_angeles = sql.replace("CURRENT_DATE()", "CURRENT_DATE('America/Los_Angeles')")
+    early, late = day.replace(hour=3), day.replace(hour=9)
+    assert ResultCache.make_key(los_angeles, fingerprints, early) != ResultCache.make_key(los_angeles, fingerprints, late)
+
+def test_volatile_functions_are_not_cacheable():
+    assert is_cacheable("SELECT CURRENT_DATE()")
+    assert not is_cacheable("SELECT CURRENT_TIMESTAMP()")
+    assert not is_cacheable("SELECT GENERATE_UUID()")
+
+def test_ttl_and_memory_cap(tmp_path, monkeypatch):
+    cache = ResultCache(cache_dir=str(tmp_path), ttl_seconds=10, max_memory_bytes=200)
+    cache.put("a", RESULT)
+    cache.put("b", RESULT)
+    assert list(cache._entries) == ["b"]
+    assert cache.get("a")["result"] == RESULT  # Reloaded from disk.
+
+    monkeypatch.setattr("agents.sql_agent.result_cache.time.time", lambda: 1e12)
+    assert cache.get("b") is None
+
+def test_disk_cap(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path), max_disk_bytes=200)
+    cache.put("a", RESULT)
+    cache.put("b", RESULT)
+    assert len(list(tmp_path.iterdir())) == 1
+
+@pytest.mark.asyncio
+async def test_result_cache_callbacks(fake_toolset, make_context):
+    toolset = fake_toolset({"get_table_info": {"lastModifiedTime": "1700000000", "etag": "e1"}})
+    before, after = create_result_cache_callbacks(ResultCache(), toolset)
+    context = await make_context(BaseAgent(name="final_responder"), state={
+        "sql": SQL, "valid_sql": SQL,
+        "validation_result": 'dry_run succeeded {"totalBytesProcessed": "4096"}',
+    })
+    args = {"sql": SQL, "dry_run": False}
+
+    tool_context = ToolContext(context)
+    assert await before(ExecuteSql(), args, tool_context) is None
+    after(ExecuteSql(), args, tool_context, RESULT)
+    context.session.state.update(tool_context.state.to_dict())
+
+    tool_context = ToolContext(context)
+    assert await before(ExecuteSql(), args, tool_context) == RESULT
+    assert tool_context.state["result_cache_stats"] == {"hits": 1, "misses": 1, "bytes_saved": 4096}
+    assert await before(ExecuteSql(), {"sql": SQL, "dry_run": True}, tool_context) is None
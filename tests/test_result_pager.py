@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from agents.sql_agent.final_responder import StreamingResponder
+from agents.sql_agent.result_pager import (
+    ResultPager, create_continuation_callback, parse_rows, summarize_rows, take_rows
+)
+
+ROWS = [{"term": f"term {i}", "score": i} for i in range(10)]
+
+
+class ScriptedNarrator(BaseAgent):
+    runs: int = 0
+
+    async def _run_async_impl(self, ctx):
+        self.runs += 1
+        yield Event(author=self.name)
+
+
+def test_parse_rows():
+    assert parse_rows(json.dumps(ROWS)) == ROWS
+    assert parse_rows("\n".join(json.dumps(row) for row in ROWS[:2])) == ROWS[:2]
+    assert parse_rows("Query OK, 3 rows affected") is None
+
+def test_take_rows_row_and_byte_caps():
+    assert take_rows(ROWS, 4, 10_000) == (ROWS[:4], ROWS[4:])
+    delivered, remaining = take_rows(ROWS, 10, 60)
+    assert len(delivered) == 2 and remaining == ROWS[2:]
+    # A single oversized row is still delivered.
+    assert take_rows(ROWS, 10, 1)[0] == ROWS[:1]
+
+def test_summarize_rows():
+    summary = summarize_rows(ROWS + [{"term": None, "score": 3}])
+    assert summary["row_count"] == 11
+    assert summary["columns"]["score"] == {"nulls": 0, "distinct": 10, "min": 0.0, "max": 9.0, "mean": 4.3636}
+    assert summary["columns"]["term"]["nulls"] == 1
+
+@pytest.mark.asyncio
+async def test_streaming_responder_caps_pages_and_bounds_llm_input(fake_toolset, make_context, run_agent):
+    toolset = fake_toolset({"execute_sql": ROWS})
+    narrator = ScriptedNarrator(name="final_responder_llm")
+    pager = ResultPager()
+    responder = StreamingResponder(
+        name="final_responder", toolset=toolset, pager=pager,
+        page_rows=2, max_rows=4, sample_rows=3, sub_agents=[narrator]
+    )
+    context = await make_context(responder, state={"valid_sql": "```sql\nSELECT 1\n```"}, question="Top terms?")
+
+    events = await run_agent(responder, context)
+
+    texts = [e.content.parts[0].text for e in events if e.content and e.author == "final_responder"]
+    assert texts[0].startswith("Rows 1-2 of 10:")
+    assert texts[1].startswith("Rows 3-4 of 10:")
+    token = context.session.state["result_page"]["continuation_token"]
+    assert f"Reply `more {token}`" in texts[2]
+    assert toolset.tools["execute_sql"].calls == [{"sql": "SELECT 1", "dry_run": False}]
+    assert len(json.loads(context.session.state["result_sample"])) == 3
+    assert json.loads(context.session.state["result_summary"])["row_count"] == 10
+    assert narrator.runs == 1
+
+    continuation = create_continuation_callback(pager, max_rows=4, max_bytes=10_000)
+    more_context = await make_context(responder, question=f"more {token}")
+    content = continuation(CallbackContext(more_context))
+    assert content.parts[0].text.startswith("Rows 5-8 of 10:")
+    assert "8 of 10 rows shown" in content.parts[0].text
+    assert "expired" in continuation(CallbackContext(more_context)).parts[0].text
+
+@pytest.mark.asyncio
+async def test_streaming_responder_reports_errors(fake_toolset, make_context, run_agent):
+    toolset = fake_toolset({"execute_sql": RuntimeError("Access Denied")})
+    narrator = ScriptedNarrator(name="final_responder_llm")
+    responder = StreamingResponder(
+        name="final_responder", toolset=toolset, pager=ResultPager(), sub_agents=[narrator]
+    )
+    context = await make_context(responder, state={"valid_sql": "SELECT 1"})
+
+    await run_agent(responder, context)
+
+    assert context.session.state["result_error"] == "Access Denied"
+    assert narrator.runs == 1
@@ -0,0 +1,85 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from agents.sql_agent.final_responder import StreamingResponder
+from agents.sql_agent.result_pager import ResultPager
+from agents.sql_agent.result_renderer import infer_column_types, render_rows, requested_format
+
+ROWS = [
+    {"term": "pizza", "score": 1234567, "ratio": 0.5, "week": "2024-01-07", "refreshed": "2024-01-08T03:04:05Z"},
+    {"term": "tacos | burritos", "score": 89, "ratio": 12.3456, "week": "2024-01-14", "refreshed": None},
+]
+
+
+class ScriptedNarrator(BaseAgent):
+    runs: int = 0
+
+    async def _run_async_impl(self, ctx):
+        self.runs += 1
+        yield Event(author=self.name)
+
+
+def test_infer_column_types():
+    assert infer_column_types(ROWS) == {
+        "term": "STRING", "score": "INT64", "ratio": "FLOAT64", "week": "DATE", "refreshed": "TIMESTAMP"
+    }
+
+def test_render_markdown_formats_by_type():
+    lines = render_rows(ROWS).splitlines()
+    assert lines[0] == "| term | score | ratio | week | refreshed |"
+    assert lines[1] == "| --- | ---: | ---: | --- | --- |"
+    assert lines[2] == "| pizza | 1,234,567 | 0.5 | 2024-01-07 | 2024-01-08 03:04:05 UTC |"
+    assert lines[3] == "| tacos \\| burritos | 89 | 12.35 | 2024-01-14 |  |"
+
+def test_render_csv_and_json_keep_raw_values():
+    assert render_rows(ROWS[:1], "csv") == (
+        "```csv\nterm,score,ratio,week,refreshed\npizza,1234567,0.5,2024-01-07,2024-01-08T03:04:05Z\n```"
+    )
+    rendered = render_rows(ROWS, "json")
+    assert json.loads(rendered.removeprefix("```json\n").removesuffix("\n```"))[0]["score"] == 1234567
+
+def test_render_keeps_strings_and_plain_years():
+    rows = [{"zip": "02139", "signup_year": 2024, "customer_id": 10023, "new_customers": 1041}]
+    assert infer_column_types(rows)["zip"] == "STRING"
+    assert render_rows(rows).splitlines()[2] == "| 02139 | 2024 | 10023 | 1,041 |"
+    assert render_rows(rows, "csv") == (
+        "```csv\nzip,signup_year,customer_id,new_customers\n02139,2024,10023,1041\n```"
+    )
+    rendered = render_rows(rows, "json")
+    assert json.loads(rendered.removeprefix("```json\n").removesuffix("\n```")) == rows
+
+def test_requested_format():
+    assert requested_format("Top 10 terms as CSV") == "csv"
+    assert requested_format("Top 10 terms in json please") == "json"
+    assert requested_format("Top 10 terms") is None
+
+@pytest.mark.asyncio
+async def test_responder_without_narrative_skips_llm(fake_toolset, make_context, run_agent):
+    narrator = ScriptedNarrator(name="final_responder_llm")
+    responder = StreamingResponder(
+        name="final_responder", toolset=fake_toolset({"execute_sql": ROWS}), pager=ResultPager(), sub_agents=[narrator]
+    )
+    context = await make_context(
+        responder, state={"valid_sql": "SELECT 1", "result_narrative": False}, question="Top terms as csv"
+    )
+
+    events = await run_agent(responder, context)
+
+    assert narrator.runs == 0
+    assert "```csv\nterm,score" in events[0].content.parts[0].text
+    assert context.session.state["result_page"]["format"] == "csv"
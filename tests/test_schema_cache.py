@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from agents.sql_agent.schema_cache import SchemaCache, table_fingerprint
+from agents.sql_agent.schema_inspector import CachedSchemaInspector
+
+TOP_TERMS_SCHEMA = [{"name": "term", "type": "STRING"}, {"name": "week", "type": "DATE"}]
+
+
+class ScriptedInspector(BaseAgent):
+    output: str = ""
+    runs: int = 0
+
+    async def _run_async_impl(self, ctx):
+        self.runs += 1
+        yield Event(author=self.name, actions=EventActions(state_delta={"schema": self.output}))
+
+
+def make_toolset(fake_toolset, etag="etag-1", schema=TOP_TERMS_SCHEMA):
+    return fake_toolset({
+        "list_tables": ["top_terms"],
+        "get_table_info": {
+            "LastModifiedTime": "1700000000", "ETag": etag, "NumRows": 42, "Schema": schema,
+            "TimePartitioning": {"Field": "week"},
+        },
+    })
+
+
+def test_table_fingerprint():
+    assert table_fingerprint({"lastModifiedTime": "1", "etag": "x"}) == "1|x"
+    assert table_fingerprint({"Schema": []}) is None
+    assert table_fingerprint(None) is None
+
+def test_schema_cache_fingerprint_mismatch_is_a_miss():
+    cache = SchemaCache()
+    cache.put("ds/t", "1|a", {"col": "STRING"})
+    assert cache.get("ds/t", "1|a") == {"col": "STRING"}
+    assert cache.get("ds/t", "2|a") is None
+
+def test_schema_cache_lru_eviction_and_disk_store(tmp_path):
+    cache = SchemaCache(cache_dir=str(tmp_path), max_entries=1)
+    cache.put("ds/a", "1|a", "schema-a")
+    cache.put("ds/b", "1|b", "schema-b")
+    assert list(cache._entries) == ["ds/b"]
+    # Evicted from memory but still served from disk.
+    assert cache.get("ds/a", "1|a") == "schema-a"
+    assert SchemaCache(cache_dir=str(tmp_path)).get("ds/b", "1|b") == "schema-b"
+
+@pytest.mark.asyncio
+async def test_cached_schema_inspector_builds_schema_from_table_info(fake_toolset, make_context, run_agent):
+    cache = SchemaCache()
+    llm = ScriptedInspector(name="schema_inspector_llm")
+    inspector = CachedSchemaInspector(
+        name="schema_inspector", toolset=make_toolset(fake_toolset), cache=cache, sub_agents=[llm]
+    )
+    context = await make_context(inspector)
+
+    await run_agent(inspector, context)
+
+    table = {"Schema": TOP_TERMS_SCHEMA, "TimePartitioning": {"Field": "week"}}
+    assert llm.runs == 0
+    assert json.loads(context.session.state["schema"]) == {"top_terms": table}
+    assert context.session.state["table_layouts"] == {"top_terms": {"TimePartitioning": {"Field": "week"}}}
+    assert cache.get("bigquery-public-data.google_trends/top_terms", "1700000000|etag-1") == table
+
+@pytest.mark.asyncio
+async def test_cached_schema_inspector_hit_skips_llm(fake_toolset, make_context, run_agent):
+    cache = SchemaCache()
+    cache.put("bigquery-public-data.google_trends/top_terms", "1700000000|etag-1", TOP_TERMS_SCHEMA)
+    llm = ScriptedInspector(name="schema_inspector_llm")
+    inspector = CachedSchemaInspector(
+        name="schema_inspector", toolset=make_toolset(fake_toolset, schema=None), cache=cache, sub_agents=[llm]
+    )
+    context = await make_context(inspector)
+
+    await run_agent(inspector, context)
+
+    assert llm.runs == 0
+    assert json.loads(context.session.state["schema"]) == {"top_terms": TOP_TERMS_SCHEMA}
+    assert context.session.state["table_layouts"] == {"top_terms": {"TimePartitioning": {"Field": "week"}}}
+
+@pytest.mark.asyncio
+async def test_cached_schema_inspector_miss_runs_llm_and_fills_cache(fake_toolset, make_context, run_agent):
+    cache = SchemaCache()
+    cache.put("bigquery-public-data.google_trends/top_terms", "1700000000|stale", TOP_TERMS_SCHEMA)
+    llm = ScriptedInspector(
+        name="schema_inspector_llm", output="```json\n" + json.dumps({"top_terms": TOP_TERMS_SCHEMA}) + "\n```"
+    )
+    inspector = CachedSchemaInspector(
+        name="schema_inspector", toolset=make_toolset(fake_toolset, schema=None), cache=cache, sub_agents=[llm]
+    )
+    context = await make_context(inspector)
+
+    await run_agent(inspector, context)
+
+    assert llm.runs == 1
+    assert cache.get("bigquery-public-data.google_trends/top_terms", "1700000000|etag-1") == TOP_TERMS_SCHEMA
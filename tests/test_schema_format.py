@@ -0,0 +1,82 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+from google.adk.models.llm_request import LlmRequest
+from google.genai.types import GenerateContentConfig
+from agents.sql_agent.schema_format import COMPACT_SCHEMA_LEGEND, compact_schema, create_schema_format_callback
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_TERMS = {
+    "tableReference": {"projectId": "bigquery-public-data", "datasetId": "google_trends", "tableId": "top_terms"},
+    "description": "Daily top 25 terms\nper DMA.",
+    "etag": "abc",
+    "timePartitioning": {"type": "DAY", "field": "refresh_date"},
+    "clustering": {"fields": ["dma_id"]},
+    "schema": {"fields": [
+        {"name": "term", "type": "STRING", "mode": "NULLABLE", "description": "The search term."},
+        {"name": "refresh_date", "type": "DATE", "mode": "NULLABLE"},
+        {"name": "regions", "type": "RECORD", "mode": "REPEATED", "fields": [
+            {"name": "name", "type": "STRING"},
+            {"name": "score", "type": "INTEGER"},
+        ]},
+        {"name": "tags", "type": "STRING", "mode": "REPEATED"},
+    ]},
+}
+
+
+def test_compact_schema_is_ddl_like():
+    assert compact_schema(json.dumps({"top_terms": TOP_TERMS})).split("\n") == [
+        COMPACT_SCHEMA_LEGEND,
+        "TABLE `bigquery-public-data.google_trends.top_terms` PARTITION BY refresh_date CLUSTER BY dma_id"
+        " -- Daily top 25 terms per DMA.",
+        "  term STR -- The search term.",
+        "  refresh_date DATE",
+        "  regions[].name STR",
+        "  regions[].score INT",
+        "  tags[] STR",
+    ]
+    assert compact_schema({"t": {"columns": {"id": "INT64"}}}).endswith("TABLE `t`\n  id INT")
+    assert compact_schema({"t": "not a schema"}) is None
+    assert compact_schema("not json") is None
+
+
+def test_callback_replaces_the_injected_schema():
+    schema = json.dumps({"top_terms": TOP_TERMS})
+    request = LlmRequest(model="gemini-2.5-pro", config=GenerateContentConfig(
+        system_instruction=f"Write SQL.\n\n`schema`:\n{schema}\n",
+    ))
+
+    create_schema_format_callback()(SimpleNamespace(state={"schema": schema}), request)
+
+    assert request.config.system_instruction.startswith(f"Write SQL.\n\n`schema`:\n{COMPACT_SCHEMA_LEGEND}\n")
+    assert '"etag"' not in request.config.system_instruction
+
+
+def test_benchmark_compares_formats_offline(tmp_path):
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, "scripts", "benchmark_schema_format.py"),
+         "--output", str(tmp_path / "report.json")],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=300, check=True,
+    )
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    formats = report["formats"]
+    assert formats["compact"]["schema_tokens"] < formats["json"]["schema_tokens"]
+    assert formats["compact"]["instruction_tokens"] < formats["json"]["instruction_tokens"]
+    assert report["schema_token_reduction"] > 0.5
@@ -0,0 +1,95 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from agents.sql_agent.schema_pruner import (
+    SchemaPruner, parse_column_descriptions, prune_schema, reexpand_schema
+)
+
+ORDERS_COLUMNS = [
+    "order_id", "customer_id", "order_date", "region", "refund_amount", "sku",
+    "quantity", "unit_price", "discount", "channel", "warehouse", "carrier",
+    "tracking_number", "coupon_code", "notes",
+]
+SCHEMA = {
+    "shop.sales.orders": {
+        "TimePartitioning": {"Field": "order_date"},
+        "Schema": [{"name": name, "type": "STRING"} for name in ORDERS_COLUMNS],
+    },
+    "shop.sales.employees": [{"name": "employee_id", "type": "STRING"}, {"name": "salary", "type": "INT64"}],
+}
+
+
+def test_prune_schema_keeps_relevant_and_partition_columns():
+    pruned_schema, pruned = prune_schema(SCHEMA, "Total refunds by region last month", max_columns=12)
+
+    columns = [field["name"] for field in pruned_schema["shop.sales.orders"]["Schema"]]
+    assert columns == ["order_date", "region", "refund_amount"]
+    assert pruned_schema["shop.sales.orders"]["TimePartitioning"] == {"Field": "order_date"}
+    assert "shop.sales.employees" not in pruned_schema
+    assert pruned["shop.sales.employees"] is None
+    assert "notes" in pruned["shop.sales.orders"]
+
+def test_prune_schema_uses_dataplex_descriptions():
+    descriptions = parse_column_descriptions("## Column Descriptions\n- `channel`: Where the customer purchased.")
+    pruned_schema, _ = prune_schema(SCHEMA, "Orders per purchase region", descriptions)
+
+    columns = [field["name"] for field in pruned_schema["shop.sales.orders"]["Schema"]]
+    assert "channel" in columns
+
+def test_prune_schema_keeps_everything_without_a_match():
+    pruned_schema, pruned = prune_schema(SCHEMA, "xyzzy")
+    assert pruned_schema == SCHEMA
+    assert pruned == {}
+
+def test_reexpand_schema_on_pruned_column_error():
+    state = {"full_schema": json.dumps(SCHEMA), "pruned_columns": {"shop.sales.orders": ["carrier"]}}
+
+    assert reexpand_schema(state, "dry_run failed: Unrecognized name: quantityy") == {}
+    restored = reexpand_schema(state, "prevalidation failed: Column `carrier` does not exist in the schema.")
+    assert restored == {"schema": json.dumps(SCHEMA), "pruned_columns": None, "schema_reexpanded": ["carrier"]}
+
+@pytest.mark.asyncio
+async def test_validator_restores_pruned_schema(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import DryRunValidator
+
+    toolset = fake_toolset({"execute_sql": RuntimeError("Unrecognized name: carrier at [1:8]")})
+    validator = DryRunValidator(name="sql_validator", toolset=toolset)
+    context = await make_context(validator, state={
+        "sql": "SELECT carrier FROM `shop.sales.orders`",
+        "schema": "{}",
+        "full_schema": json.dumps(SCHEMA),
+        "pruned_columns": {"shop.sales.orders": ["carrier"]},
+    })
+
+    await run_agent(validator, context)
+
+    assert context.session.state["schema"] == json.dumps(SCHEMA)
+    assert context.session.state["pruned_columns"] is None
+    assert context.session.state["validation_result"].endswith("The full schema has been restored, including `carrier`.")
+
+@pytest.mark.asyncio
+async def test_schema_pruner_agent_writes_state(make_context, run_agent):
+    pruner = SchemaPruner(name="schema_pruner")
+    context = await make_context(
+        pruner, state={"schema": json.dumps(SCHEMA)}, question="Refund amount by region"
+    )
+
+    await run_agent(pruner, context)
+
+    state = context.session.state
+    assert state["full_schema"] == json.dumps(SCHEMA)
+    assert "carrier" not in state["schema"]
+    assert "carrier" in state["pruned_columns"]["shop.sales.orders"]
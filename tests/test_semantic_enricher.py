@@ -112,4 +112,80 @@ async def test_dataplex_searcher(mock_autoflow_class):
 
     # Assert the output
     assert context.session.state["semantic_context"] == test_case["expected_semantic_context"]
-    assert context.session.state["filtered_table_list"] == test_case["expected_filtered_table_list"]
\ No newline at end of file
+    assert context.session.state["filtered_table_list"] == test_case["expected_filtered_table_list"]
+
+ENTRY_NAME = (
+    "projects/123/locations/us/entryGroups/@bigquery/entries/"
+    "bigquery.googleapis.com/projects/p/datasets/sales_domain/tables/transactions"
+)
+SEARCH_RESULT = [{
+    "dataplexEntry": {
+        "name": ENTRY_NAME,
+        "fullyQualifiedName": "bigquery:p.sales_domain.transactions",
+        "entrySource": {"description": "Sales transactions."},
+    }
+}]
+LOOKUP_RESULT = {
+    "name": ENTRY_NAME,
+    "fullyQualifiedName": "bigquery:p.sales_domain.transactions",
+    "entrySource": {"description": "Sales transactions."},
+    "aspects": {
+        "p.us.refund-amount-aspect-type": {
+            "path": "schema.fields.refund_amount",
+            "data": {
+                "business_term": "Refund Processing Fee",
+                "rule_description": "A $15.00 processing fee is added to the cost of every refund.",
+                "rule_formula": "+ 15.00",
+            },
+        },
+    },
+}
+
+
+def test_parse_terms():
+    from agents.sql_agent.semantic_enricher import parse_terms
+
+    assert parse_terms('```json\n["cost", "refunds", "cost"]\n```') == ["cost", "refunds"]
+    assert parse_terms("cost, refunds") == ["cost", "refunds"]
+
+@pytest.mark.asyncio
+async def test_dataplex_enricher_builds_context_in_code(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.semantic_enricher import DataplexEnricher
+
+    toolset = fake_toolset({
+        "search_entries": lambda query, pageSize: SEARCH_RESULT if query == "refunds" else SEARCH_RESULT + [{
+            "dataplexEntry": {"name": "projects/123/locations/us/entryGroups/g/entries/bucket",
+                              "fullyQualifiedName": "gcs:bucket"}
+        }],
+        "lookup_entry": LOOKUP_RESULT,
+    })
+    enricher = DataplexEnricher(
+        name="dataplex_searcher", toolset=toolset, aspect_types=["p.us.refund-amount-aspect-type"]
+    )
+    context = await make_context(enricher, state={"extracted_terms": '["cost", "refunds"]'})
+
+    await run_agent(enricher, context)
+
+    assert len(toolset.tools["search_entries"].calls) == 2
+    assert toolset.tools["lookup_entry"].calls == [{
+        "name": "projects/123/locations/us", "entry": ENTRY_NAME,
+        "view": 3, "aspectTypes": ["p.us.refund-amount-aspect-type"],
+    }]
+    state = context.session.state
+    assert state["filtered_table_list"] == ["p.sales_domain.transactions"]
+    assert "- `p.sales_domain.transactions`: Sales transactions." in state["semantic_context"]
+    assert "- `refund_amount`: Refund Processing Fee (table `transactions`)" in state["semantic_context"]
+    assert "Formula: `refund_amount + 15.00`." in state["semantic_context"]
+
+@pytest.mark.asyncio
+async def test_dataplex_enricher_tolerates_search_errors(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.semantic_enricher import DataplexEnricher
+
+    toolset = fake_toolset({"search_entries": RuntimeError("quota"), "lookup_entry": {}})
+    enricher = DataplexEnricher(name="dataplex_searcher", toolset=toolset)
+    context = await make_context(enricher, state={"extracted_terms": '["cost"]'})
+
+    await run_agent(enricher, context)
+
+    assert context.session.state["filtered_table_list"] == []
+    assert context.session.state["semantic_context"] == ""
@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.genai.types import Content, Part
+
+
+class EchoAgent(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        question = ctx.user_content.parts[0].text
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=Content(role="model", parts=[Part(text=f"You asked: {question}")]),
+            actions=EventActions(state_delta={"valid_sql": "SELECT 1"}),
+        )
+
+
+def test_query_runs_the_agent_and_keeps_the_session():
+    from agents.sql_agent.server import create_app
+
+    with TestClient(create_app(EchoAgent(name="echo"), max_llm_calls=0)) as client:
+        response = client.post("/query", json={"question": "top terms?", "user_id": "ana"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["answer"] == "You asked: top terms?"
+        assert body["sql"] == "SELECT 1"
+
+        again = client.post("/query", json={"question": "more", "user_id": "ana", "session_id": body["session_id"]})
+        assert again.json()["session_id"] == body["session_id"]
+        assert client.get("/metrics").json()["requests"]["completed"] == 2
+        assert client.get("/healthz").json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_admission_queues_then_rejects_and_drains():
+    from agents.sql_agent.server import AdmissionController, Overloaded
+
+    admission = AdmissionController(max_concurrent=1, max_queued=1, queue_timeout=5)
+    release = asyncio.Event()
+
+    async def request():
+        async with admission.slot():
+            await release.wait()
+
+    running = asyncio.create_task(request())
+    queued = asyncio.create_task(request())
+    await asyncio.sleep(0.01)
+    assert (admission.in_flight, admission.queued) == (1, 1)
+
+    with pytest.raises(Overloaded) as rejected:
+        async with admission.slot():
+            pass
+    assert rejected.value.reason == "queue full"
+
+    drained = asyncio.create_task(admission.drain(timeout=5))
+    await asyncio.sleep(0.01)
+    assert not drained.done()
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert await drained
+    assert admission.metrics()["completed"] == 2
+
+
+def test_load_test_script_reports_latency_percentiles(tmp_path):
+    import json
+    import os
+    import subprocess
+    import sys
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, os.path.join(repo_root, "scripts", "load_test_server.py"),
+         "--requests", "6", "--concurrency", "3", "--llm-latency-ms", "0",
+         "--output", str(tmp_path / "report.json")],
+        cwd=repo_root, capture_output=True, text=True, timeout=300,
+    )
+
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert report["succeeded"] == 6
+    assert set(report["latency_ms"]) == {"p50", "p95", "p99", "max"}
+    assert report["server_metrics"]["requests"]["admitted"] == 6
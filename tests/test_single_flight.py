@@ -0,0 +1,205 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import pytest
+from google.adk.agents import BaseAgent, SequentialAgent
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai.types import Content, Part
+from agents.sql_agent.result_pager import ResultPager, continuation_note, continuation_tokens
+from agents.sql_agent.single_flight import SingleFlight, SingleFlightAgent, create_single_flight_callbacks
+
+
+@pytest.mark.asyncio
+async def test_do_shares_results_and_errors():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    assert await asyncio.gather(*(flight.do("k", fetch) for _ in range(4))) == [1, 1, 1, 1]
+    assert await flight.do("k", fetch) == 2  # Nothing in flight any more.
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("k", fail) for _ in range(2)), return_exceptions=True)
+    assert [type(r) for r in results] == [ValueError, ValueError]
+
+
+class SlowResponder(BaseAgent):
+    runs: int = 0
+
+    async def _run_async_impl(self, ctx):
+        self.runs += 1
+        await asyncio.sleep(0.05)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=Content(role="model", parts=[Part(text="42 refunds")]),
+            actions=EventActions(state_delta={"valid_sql": "SELECT 42"}),
+        )
+
+
+@pytest.mark.asyncio
+async def test_duplicate_questions_wait_for_one_run():
+    responder = SlowResponder(name="final_responder")
+    join_in_flight, share_result = create_single_flight_callbacks(SingleFlight(max_age=5), "test", 5)
+    root = SequentialAgent(
+        name="sql_agent", sub_agents=[responder],
+        before_agent_callback=join_in_flight, after_agent_callback=share_result,
+    )
+    runner = InMemoryRunner(agent=root, app_name="test")
+
+    async def ask(user_id, question):
+        session = await runner.session_service.create_session(app_name="test", user_id=user_id)
+        texts = [
+            part.text
+            async for event in runner.run_async(
+                user_id=user_id, session_id=session.id,
+                new_message=Content(role="user", parts=[Part(text=question)]),
+            )
+            if event.content and event.content.parts
+            for part in event.content.parts if part.text
+        ]
+        session = await runner.session_service.get_session(app_name="test", user_id=user_id, session_id=session.id)
+        return texts, session.state
+
+    results = await asyncio.gather(
+        ask("a", "How many refunds?"), ask("b", "how many refunds"), ask("c", "How many orders?")
+    )
+
+    assert responder.runs == 2
+    (_, leader_state), (follower_texts, follower_state), _ = results
+    assert follower_texts == ["42 refunds"]
+    assert follower_state["valid_sql"] == "SELECT 42"
+    assert follower_state["coalesced"] is True
+    assert not leader_state.get("coalesced")
+
+
+async def ask(runner, user_id, question):
+    session = await runner.session_service.create_session(app_name="test", user_id=user_id)
+    return [
+        part.text
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session.id,
+            new_message=Content(role="user", parts=[Part(text=question)]),
+        )
+        if event.content and event.content.parts
+        for part in event.content.parts if part.text
+    ]
+
+
+def coalescing_runner(responder, flight, **kwargs):
+    join_in_flight, share_result = create_single_flight_callbacks(flight, "test", 30, **kwargs)
+    root = SingleFlightAgent(
+        name="sql_agent", sub_agents=[responder], flight=flight,
+        before_agent_callback=join_in_flight, after_agent_callback=share_result,
+    )
+    return InMemoryRunner(agent=root, app_name="test")
+
+
+@pytest.mark.asyncio
+async def test_waiters_rerun_at_once_when_the_leader_is_cancelled():
+    responder = SlowResponder(name="final_responder")
+    flight = SingleFlight(max_age=30)
+    runner = coalescing_runner(responder, flight)
+
+    leader = asyncio.create_task(asyncio.wait_for(ask(runner, "a", "How many refunds?"), 0.02))
+    await asyncio.sleep(0.01)
+    started = asyncio.get_running_loop().time()
+    follower = await ask(runner, "b", "how many refunds")
+
+    with pytest.raises(asyncio.TimeoutError):
+        await leader
+    assert follower == ["42 refunds"]
+    assert responder.runs == 2
+    assert asyncio.get_running_loop().time() - started < 5  # Not the 30 s wait.
+
+
+class FailingResponder(SlowResponder):
+    async def _run_async_impl(self, ctx):
+        if self.runs == 0:
+            self.runs += 1
+            await asyncio.sleep(0.05)
+            raise ConnectionError("MCP session lost")
+        async for event in super()._run_async_impl(ctx):
+            yield event
+
+
+@pytest.mark.asyncio
+async def test_waiters_rerun_at_once_when_the_leader_fails():
+    responder = FailingResponder(name="final_responder")
+    flight = SingleFlight(max_age=30)
+    runner = coalescing_runner(responder, flight)
+
+    leader = asyncio.create_task(ask(runner, "a", "How many refunds?"))
+    await asyncio.sleep(0.01)
+    started = asyncio.get_running_loop().time()
+    follower = await ask(runner, "b", "how many refunds")
+
+    with pytest.raises(ConnectionError):
+        await leader
+    assert follower == ["42 refunds"]
+    assert responder.runs == 2
+    assert asyncio.get_running_loop().time() - started < 5  # Not the 30 s wait.
+
+
+@pytest.mark.asyncio
+async def test_abandon_fails_the_owners_runs():
+    flight = SingleFlight()
+    assert flight.lead("k", owner="a/1")
+    waiter = asyncio.create_task(flight.wait("k"))
+    await asyncio.sleep(0)
+    flight.abandon("a/1", ValueError("MCP session lost"))
+    with pytest.raises(ValueError):
+        await waiter
+    assert flight.lead("k")
+
+
+class PagedResponder(BaseAgent):
+    pager: ResultPager
+
+    async def _run_async_impl(self, ctx):
+        await asyncio.sleep(0.05)
+        token = self.pager.put([{"n": 3}], 2)
+        text = f"Rows 1-2 of 3\n\n{continuation_note(2, 3, token)}"
+        yield Event(invocation_id=ctx.invocation_id, author=self.name, content=Content(role="model", parts=[Part(text=text)]))
+
+
+@pytest.mark.asyncio
+async def test_waiters_get_their_own_continuation_tokens():
+    pager = ResultPager()
+    runner = coalescing_runner(PagedResponder(name="final_responder", pager=pager), SingleFlight(), pager=pager)
+
+    leader, follower = await asyncio.gather(ask(runner, "a", "All refunds"), ask(runner, "b", "all refunds"))
+
+    (leader_token,), (follower_token,) = continuation_tokens(leader[0]), continuation_tokens(follower[0])
+    assert leader_token != follower_token
+    assert pager.pop(leader_token) == pager.pop(follower_token) == ([{"n": 3}], 2, "markdown", None)
+
+
+@pytest.mark.asyncio
+async def test_per_user_flights_keep_users_apart():
+    responder = SlowResponder(name="final_responder")
+    runner = coalescing_runner(responder, SingleFlight(), per_user=True)
+
+    await asyncio.gather(ask(runner, "a", "How many refunds?"), ask(runner, "b", "How many refunds?"))
+
+    assert responder.runs == 2
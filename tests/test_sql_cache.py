@@ -0,0 +1,91 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from agents.sql_agent.sql_cache import (
+    SqlCache,
+    create_sql_cache_callbacks,
+    hashed_embedding,
+    normalize_question,
+)
+
+SCHEMA = '{"top_terms": [{"name": "term", "type": "STRING"}]}'
+CHANGED_SCHEMA = '{"top_terms": [{"name": "term", "type": "STRING"}, {"name": "rank", "type": "INTEGER"}]}'
+SQL = "SELECT term FROM `bigquery-public-data.google_trends.top_terms` LIMIT 5"
+QUESTION = "What were the top 5 Google Trends terms last week?"
+
+
+def put(cache, question=QUESTION, schema=SCHEMA):
+    cache.put(question, schema, SQL, hashed_embedding(question))
+
+def test_normalize_question():
+    assert normalize_question("Show me the Top 5 terms, please!") == normalize_question("top 5 terms")
+
+def test_exact_and_semantic_hits():
+    cache = SqlCache()
+    put(cache)
+    assert cache.get("what were the TOP 5 google trends terms last week", SCHEMA) == (SQL, "exact", 1.0)
+
+    reworded = "Show me the top 5 google trends terms from last week"
+    sql, match, similarity = cache.get(reworded, SCHEMA, hashed_embedding(reworded))
+    assert (sql, match) == (SQL, "semantic") and similarity >= cache.similarity_threshold
+
+def test_semantic_hit_requires_matching_literals():
+    cache = SqlCache()
+    put(cache)
+    question = "What were the top 10 Google Trends terms last week?"
+    assert cache.get(question, SCHEMA, hashed_embedding(question)) is None
+
+@pytest.mark.parametrize("question", [
+    "top rising search terms in New York last month",
+    "top rising search terms in New York this week",
+    "least rising search terms in New York last week",
+    "top rising search terms in Boston last week",
+])
+def test_semantic_hit_requires_matching_qualifiers_and_entities(question):
+    # A low threshold, so only the qualifier and entity checks can reject these near misses.
+    cache = SqlCache(similarity_threshold=0.5)
+    put(cache, "top rising search terms in New York last week")
+    assert cache.get(question, SCHEMA, hashed_embedding(question)) is None
+
+def test_schema_change_and_size_limit_evict():
+    cache = SqlCache(max_entries=1)
+    put(cache)
+    assert cache.get(QUESTION, CHANGED_SCHEMA) is None
+    assert cache.get(QUESTION, SCHEMA) is None
+
+    put(cache, "first question")
+    put(cache, "second question")
+    assert cache.get("first question", SCHEMA) is None
+    assert cache.get("second question", SCHEMA) is not None
+
+@pytest.mark.asyncio
+async def test_sql_cache_callbacks(make_context):
+    cache = SqlCache()
+    lookup, store = create_sql_cache_callbacks(cache)
+    agent = BaseAgent(name="sql_loop")
+
+    context = await make_context(agent, state={"schema": SCHEMA}, question=QUESTION)
+    assert await lookup(CallbackContext(context)) is None
+    context.session.state["valid_sql"] = SQL
+    await store(CallbackContext(context))
+
+    context = await make_context(agent, state={"schema": SCHEMA}, question=QUESTION.upper())
+    callback_context = CallbackContext(context)
+    content = await lookup(callback_context)
+    assert SQL in content.parts[0].text
+    assert callback_context.state["valid_sql"] == SQL
+    assert callback_context.state["sql_cache"]["match"] == "exact"
@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import importlib
 import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.genai.types import Content, Part
 
 @pytest.fixture
 def sql_generator_loop_modules():
@@ -47,3 +51,313 @@ def test_generator_prompt_dataplex_enabled(monkeypatch, sql_generator_loop_modul
     assert "Read `guidance` from session state" in generator.instruction
     # Assert that the Dataplex-specific instruction is present
     assert "Read the `semantic_context` from the session state" in generator.instruction
+
+def test_validator_mode(monkeypatch, sql_generator_loop_modules):
+    sql_generator_loop_module, config_module = sql_generator_loop_modules
+    monkeypatch.setenv("SQL_VALIDATOR_MODE", "llm")
+    importlib.reload(config_module)
+    importlib.reload(sql_generator_loop_module)
+    loop = sql_generator_loop_module.create_sql_generator_loop()
+    assert loop.sub_agents[1].instruction == sql_generator_loop_module.VALIDATOR_SYSTEM_PROMPT
+
+    monkeypatch.delenv("SQL_VALIDATOR_MODE")
+    importlib.reload(config_module)
+    importlib.reload(sql_generator_loop_module)
+    loop = sql_generator_loop_module.create_sql_generator_loop()
+    assert isinstance(loop.sub_agents[1], sql_generator_loop_module.DryRunValidator)
+
+@pytest.mark.asyncio
+async def test_dry_run_validator(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import DryRunValidator
+
+    toolset = fake_toolset({"execute_sql": {"statistics": {"totalBytesProcessed": "1024"}}})
+    validator = DryRunValidator(name="sql_validator", toolset=toolset)
+    context = await make_context(validator, state={"sql": "```sql\nSELECT 1\n```"})
+
+    await run_agent(validator, context)
+
+    assert toolset.tools["execute_sql"].calls == [{"sql": "SELECT 1", "dry_run": True}]
+    assert context.session.state["validation_result"].startswith("dry_run succeeded")
+
+@pytest.mark.asyncio
+async def test_dry_run_validator_reports_errors(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import DryRunValidator
+
+    toolset = fake_toolset({"execute_sql": RuntimeError("Unrecognized name: trem at [1:8]")})
+    validator = DryRunValidator(name="sql_validator", toolset=toolset)
+    context = await make_context(validator, state={"sql": "SELECT trem FROM t"})
+
+    await run_agent(validator, context)
+
+    assert context.session.state["validation_result"] == "dry_run failed: Unrecognized name: trem at [1:8]"
+
+@pytest.mark.asyncio
+async def test_dry_run_validator_repairs_before_regenerating(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import DryRunValidator
+
+    def execute_sql(sql, dry_run):
+        if "trem" in sql:
+            return RuntimeError("Unrecognized name: trem; Did you mean term? at [1:8]")
+        return {"statistics": {"totalBytesProcessed": "1024"}}
+
+    toolset = fake_toolset({"execute_sql": execute_sql})
+    validator = DryRunValidator(name="sql_validator", toolset=toolset, repair_attempts=2)
+    context = await make_context(validator, state={
+        "schema": '{"top_terms": [{"name": "term", "type": "STRING"}]}',
+        "sql": "SELECT trem FROM `bigquery-public-data.google_trends.top_terms`",
+    })
+
+    await run_agent(validator, context)
+
+    assert len(toolset.tools["execute_sql"].calls) == 2
+    assert context.session.state["validation_result"].startswith("dry_run succeeded")
+    assert "SELECT\n  term\nFROM" in context.session.state["sql"]
+    assert context.session.state["sql_repair"] == {"fixes": ["column `trem` -> `term`"], "repaired": True}
+
+class ScriptedReviewer(BaseAgent):
+    runs: int = 0
+
+    async def _run_async_impl(self, ctx):
+        self.runs += 1
+        yield Event(author=self.name, actions=EventActions(state_delta={"guidance": "Use `term`."}))
+
+@pytest.mark.asyncio
+async def test_hybrid_reviewer_fast_path(make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import HybridReviewer
+
+    llm = ScriptedReviewer(name="sql_reviewer_llm")
+    reviewer = HybridReviewer(name="sql_reviewer", sub_agents=[llm])
+    context = await make_context(
+        reviewer, state={"sql": "SELECT 1", "validation_result": "dry_run succeeded\n{}"}
+    )
+
+    events = await run_agent(reviewer, context)
+
+    assert llm.runs == 0
+    assert events[-1].actions.escalate
+    assert context.session.state["valid_sql"] == "SELECT 1"
+    assert reviewer.stats == {"fast_path": 1, "prevalidation": 0, "budget": 0, "llm": 0}
+
+@pytest.mark.asyncio
+async def test_hybrid_reviewer_uses_llm_on_failure(make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import HybridReviewer
+
+    llm = ScriptedReviewer(name="sql_reviewer_llm")
+    reviewer = HybridReviewer(name="sql_reviewer", sub_agents=[llm])
+    context = await make_context(
+        reviewer, state={"sql": "SELECT trem", "validation_result": "dry_run failed: Unrecognized name"}
+    )
+
+    events = await run_agent(reviewer, context)
+
+    assert llm.runs == 1
+    assert not any(event.actions.escalate for event in events)
+    assert context.session.state["guidance"] == "Use `term`."
+    assert context.session.state["reviewer_stats"] == {"fast_path": 0, "prevalidation": 0, "budget": 0, "llm": 1}
+
+@pytest.mark.asyncio
+async def test_prevalidation_skips_dry_run(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import DryRunValidator, HybridReviewer
+
+    toolset = fake_toolset({"execute_sql": {}})
+    validator = DryRunValidator(name="sql_validator", toolset=toolset, prevalidate=True)
+    llm = ScriptedReviewer(name="sql_reviewer_llm")
+    reviewer = HybridReviewer(name="sql_reviewer", sub_agents=[llm])
+    context = await make_context(validator, state={
+        "schema": '{"top_terms": [{"name": "term", "type": "STRING"}]}',
+        "sql": "SELECT trem FROM `bigquery-public-data.google_trends.top_terms`",
+    })
+
+    await run_agent(validator, context)
+    await run_agent(reviewer, context)
+
+    assert toolset.tools["execute_sql"].calls == []
+    assert llm.runs == 0
+    assert context.session.state["guidance"] == "Column `trem` does not exist in the schema. Did you mean `term`?"
+
+@pytest.mark.asyncio
+async def test_over_budget_dry_run_gets_cost_guidance(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.cost_guard import ByteBudget
+    from agents.sql_agent.sql_generator_loop import DryRunValidator, HybridReviewer
+
+    budget = ByteBudget(max_query_bytes=10 * 1024**3)
+    toolset = fake_toolset({"execute_sql": {"statistics": {"totalBytesProcessed": str(2 * 1024**4)}}})
+    validator = DryRunValidator(name="sql_validator", toolset=toolset, budget=budget)
+    llm = ScriptedReviewer(name="sql_reviewer_llm")
+    reviewer = HybridReviewer(name="sql_reviewer", sub_agents=[llm], budget=budget)
+    context = await make_context(validator, state={
+        "schema": '{"top_terms": {"Schema": [{"Name": "term"}], "TimePartitioning": {"Field": "refresh_date"}}}',
+        "sql": "SELECT * FROM `bigquery-public-data.google_trends.top_terms`",
+    })
+
+    await run_agent(validator, context)
+    events = await run_agent(reviewer, context)
+
+    assert context.session.state["validation_result"].startswith("budget exceeded")
+    assert llm.runs == 0
+    assert not any(event.actions.escalate for event in events)
+    guidance = context.session.state["guidance"]
+    assert "2.0 TiB, over the 10.0 GiB per-query budget" in guidance
+    assert "partition column `refresh_date` of `top_terms`" in guidance
+    assert "instead of `SELECT *`" in guidance
+    assert reviewer.stats["budget"] == 1
+
+@pytest.mark.asyncio
+async def test_fast_path_checks_budget_of_llm_validated_sql(make_context, run_agent):
+    from agents.sql_agent.cost_guard import ByteBudget
+    from agents.sql_agent.sql_generator_loop import HybridReviewer
+
+    llm = ScriptedReviewer(name="sql_reviewer_llm")
+    reviewer = HybridReviewer(name="sql_reviewer", sub_agents=[llm], budget=ByteBudget(max_query_bytes=10 * 1024**3))
+    # The LLM validator writes the raw dry-run result without checking the budget.
+    context = await make_context(reviewer, state={
+        "schema": '{"top_terms": {"Schema": [{"Name": "term"}], "TimePartitioning": {"Field": "refresh_date"}}}',
+        "sql": "SELECT * FROM `bigquery-public-data.google_trends.top_terms`",
+        "validation_result": 'dry_run succeeded\n{"statistics": {"totalBytesProcessed": "%d"}}' % (2 * 1024**4),
+    })
+
+    events = await run_agent(reviewer, context)
+
+    assert llm.runs == 0
+    assert not any(event.actions.escalate for event in events)
+    assert context.session.state.get("valid_sql") is None
+    assert "2.0 TiB, over the 10.0 GiB per-query budget" in context.session.state["guidance"]
+    assert "partition column `refresh_date` of `top_terms`" in context.session.state["guidance"]
+    assert reviewer.stats["budget"] == 1 and reviewer.stats["fast_path"] == 0
+
+def test_parallel_generation_mode(monkeypatch, sql_generator_loop_modules):
+    sql_generator_loop_module, config_module = sql_generator_loop_modules
+    with monkeypatch.context() as m:
+        m.setenv("SQL_GENERATION_MODE", "parallel")
+        m.setenv("SQL_CANDIDATES", "3")
+        importlib.reload(config_module)
+        importlib.reload(sql_generator_loop_module)
+        loop = sql_generator_loop_module.create_sql_generator_loop()
+    importlib.reload(config_module)
+    importlib.reload(sql_generator_loop_module)
+
+    assert [agent.name for agent in loop.sub_agents] == ["sql_candidates", "sql_reviewer", "loop_controller"]
+    temperatures = [g.generate_content_config.temperature for g in loop.sub_agents[0].sub_agents]
+    assert temperatures == [0.0, 0.5, 1.0]
+
+class ScriptedGenerator(BaseAgent):
+    sql_output: str = ""
+    delay: float = 0.0
+
+    async def _run_async_impl(self, ctx):
+        await asyncio.sleep(self.delay)
+        yield Event(author=self.name, content=Content(parts=[Part(text=self.sql_output)]))
+
+@pytest.mark.asyncio
+async def test_parallel_generator_picks_cheapest_valid_candidate(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import ParallelSqlGenerator
+
+    def execute_sql(sql, dry_run):
+        if "bad" in sql:
+            return RuntimeError("Unrecognized name: bad")
+        return {"statistics": {"totalBytesProcessed": str(len(sql) * 1000)}}
+
+    candidates = ParallelSqlGenerator(
+        name="sql_candidates",
+        toolset=fake_toolset({"execute_sql": execute_sql}),
+        selection_window=0.05,
+        sub_agents=[
+            ScriptedGenerator(name="g0", sql_output="```sql\nSELECT bad\n```"),
+            ScriptedGenerator(name="g1", sql_output="```sql\nSELECT term, score, week\n```"),
+            ScriptedGenerator(name="g2", sql_output="```sql\nSELECT term\n```"),
+            ScriptedGenerator(name="g3", sql_output="```sql\nSELECT 1\n```", delay=10),
+        ],
+    )
+    context = await make_context(candidates)
+
+    events = await run_agent(candidates, context)
+
+    assert [event.author for event in events[:-1]] == ["g0", "g1", "g2"]
+    assert context.session.state["sql"] == "```sql\nSELECT term\n```"
+    assert context.session.state["validation_result"].startswith("dry_run succeeded")
+    summary = {c["generator"]: c["valid"] for c in context.session.state["sql_candidates"]}
+    assert summary == {"g0": False, "g1": True, "g2": True}  # g3 was cancelled.
+
+class FailingGenerator(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        raise RuntimeError("503 model overloaded")
+        yield
+
+@pytest.mark.asyncio
+async def test_parallel_generator_survives_a_failed_candidate(fake_toolset, make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import ParallelSqlGenerator
+
+    candidates = ParallelSqlGenerator(
+        name="sql_candidates",
+        toolset=fake_toolset({"execute_sql": {"statistics": {"totalBytesProcessed": "1024"}}}),
+        sub_agents=[
+            FailingGenerator(name="g0"),
+            ScriptedGenerator(name="g1", sql_output="```sql\nSELECT term\n```", delay=0.01),
+        ],
+    )
+    context = await make_context(candidates)
+
+    await run_agent(candidates, context)
+
+    assert context.session.state["sql"] == "```sql\nSELECT term\n```"
+    summary = {c["generator"]: c["valid"] for c in context.session.state["sql_candidates"]}
+    assert summary == {"g0": False, "g1": True}
+
+def test_generator_prompt_injects_schema(sql_generator_loop_modules):
+    sql_generator_loop_module, _ = sql_generator_loop_modules
+    loop = sql_generator_loop_module.create_sql_generator_loop()
+    assert "{schema?}" in loop.sub_agents[0].instruction
+
+@pytest.mark.asyncio
+async def test_loop_controller_widens_schema_then_stops_on_repetition(make_context, run_agent):
+    from agents.sql_agent.sql_generator_loop import LoopController
+
+    controller = LoopController(
+        name="loop_controller", strategies=["widen_schema", "switch_model"], fallback_model=""
+    )
+    state = {
+        "sql": "SELECT trem FROM t",
+        "validation_result": "dry_run failed: Unrecognized name: trem at [1:8]",
+        "schema": '{"t": ["term"]}',
+        "full_schema": '{"t": ["term", "rank"]}',
+        "pruned_columns": {"t": ["rank"]},
+    }
+    context = await make_context(controller, state=state)
+
+    events = await run_agent(controller, context)
+    assert not events[-1].actions.escalate
+
+    # Same error at a different position, after a different query: the schema is widened once.
+    context.session.state.update(
+        sql="select trem from t where 1=1",
+        validation_result="dry_run failed: Unrecognized name: trem at [1:12]",
+    )
+    events = await run_agent(controller, context)
+    assert not events[-1].actions.escalate
+    assert context.session.state["schema"] == '{"t": ["term", "rank"]}'
+    assert context.session.state["loop_strategies"] == ["widen_schema"]
+    assert "full schema has been restored" in context.session.state["guidance"]
+
+    # No strategy left (no fallback model configured): stop.
+    events = await run_agent(controller, context)
+    assert events[-1].actions.escalate
+    assert context.session.state["loop_termination"] == "repeated_sql"
+
+@pytest.mark.asyncio
+async def test_loop_controller_enforces_deadline_and_token_budget(make_context, run_agent):
+    import time
+    from google.genai.types import GenerateContentResponseUsageMetadata
+    from agents.sql_agent.sql_generator_loop import LoopController
+
+    controller = LoopController(name="loop_controller", deadline_seconds=60, token_budget=1000)
+    context = await make_context(controller, state={"sql": "SELECT 1", "validation_result": "dry_run failed: x"})
+    context.session.events.append(Event(
+        invocation_id=context.invocation_id, author="sql_generator", timestamp=time.time() - 5,
+        usage_metadata=GenerateContentResponseUsageMetadata(total_token_count=1500),
+    ))
+    await run_agent(controller, context)
+    assert context.session.state["loop_termination"] == "token_budget"
+
+    context.session.events[0].timestamp = time.time() - 120
+    await run_agent(controller, context)
+    assert context.session.state["loop_termination"] == "deadline"
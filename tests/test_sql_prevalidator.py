@@ -0,0 +1,57 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from agents.sql_agent.sql_prevalidator import check_sql
+
+TABLE = "`bigquery-public-data.google_trends.top_terms`"
+SCHEMA = json.dumps({
+    "top_terms": [
+        {"name": "term", "type": "STRING"},
+        {"name": "score", "type": "INTEGER"},
+        {"name": "refresh_date", "type": "DATE"},
+        {"name": "tags", "type": "RECORD", "mode": "REPEATED", "fields": [{"name": "label", "type": "STRING"}]},
+    ]
+})
+
+@pytest.mark.parametrize("sql", [
+    f"SELECT term, score FROM {TABLE} WHERE refresh_date = CURRENT_DATE()",
+    f"```sql\nSELECT tg.label FROM {TABLE} t LEFT JOIN UNNEST(t.tags) AS tg\n```",
+    f"WITH x AS (SELECT term, SUM(score) AS s FROM {TABLE} GROUP BY 1) SELECT term, s FROM x",
+    f"SELECT term, score AS sc FROM {TABLE} QUALIFY ROW_NUMBER() OVER (ORDER BY sc DESC) <= 5",
+    "this is not SQL (((",
+])
+def test_valid_or_unparseable_sql_passes(sql):
+    assert check_sql(sql, SCHEMA) == []
+
+def test_unknown_column():
+    assert check_sql(f"SELECT t.trem FROM {TABLE} t", SCHEMA) == [
+        "Column `trem` does not exist in the schema. Did you mean `term`?"
+    ]
+
+def test_unknown_and_unqualified_tables():
+    assert "is not in the schema" in check_sql(
+        "SELECT term FROM `bigquery-public-data.google_trends.top_termz`", SCHEMA
+    )[0]
+    assert check_sql("SELECT term FROM top_terms", SCHEMA) == [
+        "Table `top_terms` must use the full backticked path `bigquery-public-data.google_trends.top_terms`."
+    ]
+
+def test_bad_unnest_usage():
+    assert "is an ARRAY column" in check_sql(f"SELECT t.tags.label FROM {TABLE} t", SCHEMA)[0]
+    assert "is not an ARRAY column" in check_sql(f"SELECT x FROM {TABLE} t, UNNEST(t.term) AS x", SCHEMA)[0]
+
+def test_missing_schema_is_skipped():
+    assert check_sql("SELECT trem FROM t", None) == []
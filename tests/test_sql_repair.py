@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from agents.sql_agent.sql_prevalidator import check_sql
+from agents.sql_agent.sql_repair import repair_sql
+
+TABLE = "`bigquery-public-data.google_trends.top_terms`"
+SCHEMA = json.dumps({
+    "top_terms": [
+        {"name": "term", "type": "STRING"},
+        {"name": "score", "type": "INTEGER"},
+        {"name": "refresh_date", "type": "DATE"},
+        {"name": "tags", "type": "RECORD", "mode": "REPEATED", "fields": [{"name": "label", "type": "STRING"}]},
+        {"name": "regions", "type": "RECORD", "mode": "REPEATED", "fields": [{"name": "code", "type": "STRING"}]},
+    ]
+})
+
+@pytest.mark.parametrize("sql, error, fixed", [
+    (
+        "SELECT term FROM top_terms",
+        'dry_run failed: Table "top_terms" missing dataset while no default dataset is set in the request.',
+        f"SELECT term FROM {TABLE}",
+    ),
+    (
+        "SELECT term FROM bigquery-public-data.google_trends.top_term",
+        "prevalidation failed: Table `bigquery-public-data.google_trends.top_term` is not in the schema.",
+        f"SELECT term FROM {TABLE} AS top_term",
+    ),
+    (
+        f"SELECT trem, refresh_dat FROM {TABLE}",
+        "dry_run failed: Unrecognized name: trem; Did you mean term? at [1:8]"
+        " Unrecognized name: refresh_dat at [1:14]",
+        f"SELECT term, refresh_date FROM {TABLE}",
+    ),
+    (
+        f"SELECT CAST(term AS INT64) FROM {TABLE}",
+        'dry_run failed: Could not cast literal "x" to type INT64',
+        f"SELECT SAFE_CAST(term AS INT64) FROM {TABLE}",
+    ),
+    (
+        f"SELECT t.tags.label FROM {TABLE} t, UNNEST(t.regions) AS r WHERE r.code = 'US'",
+        "dry_run failed: Cannot access field label on a value with type ARRAY<STRUCT<label STRING>> at [1:17]",
+        f"SELECT tags_item.label FROM {TABLE} AS t CROSS JOIN UNNEST(t.regions) AS r"
+        " LEFT JOIN UNNEST(t.tags) AS tags_item WHERE r.code = 'US'",
+    ),
+    (
+        f"SELECT t.tags.label FROM {TABLE} t WHERE t.tags.label IS NOT NULL",
+        "prevalidation failed: `tags` is an ARRAY column; `tags.label` can't be read directly.",
+        f"SELECT tags_item.label FROM {TABLE} AS t LEFT JOIN UNNEST(t.tags) AS tags_item"
+        " WHERE NOT tags_item.label IS NULL",
+    ),
+])
+def test_repairs_mechanical_errors(sql, error, fixed):
+    repaired, fixes = repair_sql(sql, error, SCHEMA)
+    assert fixes
+    assert " ".join(repaired.split()) == fixed
+    assert check_sql(repaired, SCHEMA) == []
+
+@pytest.mark.parametrize("sql, error", [
+    (f"SELECT rank FROM {TABLE}", "dry_run failed: Unrecognized name: rank"),
+    (f"SELECT term FROM {TABLE}", "dry_run failed: Access Denied: Table"),
+    ("this is not SQL (((", "dry_run failed: Syntax error: Unexpected \"(\""),
+    (
+        f"SELECT tg.label FROM {TABLE} t, UNNEST(t.tags) AS tg WHERE tg.label = 1",
+        "dry_run failed: No matching signature for operator = for argument types: STRING, INT64."
+        " Supported signature: ANY = ANY at [1:80] (UNNEST)",
+    ),
+])
+def test_leaves_other_errors_to_the_generator(sql, error):
+    assert repair_sql(sql, error, SCHEMA) == (None, [])
+
+def test_unnest_repair_rewrites_only_the_array_the_error_names():
+    sql = f"SELECT t.tags.label, t.regions.code FROM {TABLE} t"
+    error = "prevalidation failed: `tags` is an ARRAY column; `tags.label` can't be read directly."
+
+    repaired, fixes = repair_sql(sql, error, SCHEMA)
+
+    assert fixes == ["`t.tags` read through LEFT JOIN UNNEST AS tags_item"]
+    assert " ".join(repaired.split()) == (
+        f"SELECT tags_item.label, t.regions.code FROM {TABLE} AS t LEFT JOIN UNNEST(t.tags) AS tags_item"
+    )
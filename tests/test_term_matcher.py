@@ -0,0 +1,78 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from agents.sql_agent.dataplex_index import DataplexIndex
+from agents.sql_agent.term_matcher import Glossary, GlossaryTermExtractor, load_glossary
+
+
+def test_glossary_matches_phrases_synonyms_and_typos():
+    glossary = Glossary(
+        ["Refund Processing Fee", "customer_lifetime_value"],
+        synonyms={"refund_amount": ["money returned"]},
+    )
+
+    assert glossary.match("What is the refund processing fee per store?") == ["Refund Processing Fee"]
+    assert glossary.match("Total money returned last quarter") == ["refund_amount"]
+    assert glossary.match("Top stores by customer lifetme value") == ["customer_lifetime_value"]
+    # Single significant words of a phrase match on their own, as written in the question.
+    assert glossary.match("What was the total cost of refunds last quarter?") == ["refunds"]
+    assert glossary.match("How many rows are there?") == []
+
+
+def test_load_glossary_reads_index_and_file(tmp_path):
+    index = DataplexIndex(str(tmp_path / "index.sqlite"))
+    index.upsert({
+        "name": "projects/1/locations/us/entryGroups/@bigquery/entries/t",
+        "fullyQualifiedName": "bigquery:p.d.transactions",
+        "aspects": {"a": {"path": "schema.fields.refund_amount", "data": {"business_term": "Refund Fee"}}},
+    })
+    glossary_file = tmp_path / "glossary.json"
+    glossary_file.write_text(json.dumps({"terms": ["churn"], "synonyms": {"churn": ["attrition"]}}))
+
+    glossary = load_glossary(str(tmp_path / "index.sqlite"), str(glossary_file))
+
+    assert glossary.match("refund_amount and attrition by month") == ["refund_amount", "churn"]
+    assert len(load_glossary(str(tmp_path / "missing.sqlite"), str(tmp_path / "missing.json"))) == 0
+
+
+class _ScriptedExtractor(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            actions=EventActions(state_delta={"extracted_terms": '["stores"]'}),
+        )
+
+
+@pytest.mark.asyncio
+async def test_extractor_only_calls_llm_when_nothing_matches(make_context, run_agent):
+    extractor = GlossaryTermExtractor(
+        name="term_extractor",
+        glossary=Glossary(["refund_amount"]),
+        sub_agents=[_ScriptedExtractor(name="term_extractor_llm")],
+    )
+
+    context = await make_context(extractor, question="Sum of refund amount by region")
+    await run_agent(extractor, context)
+    assert context.session.state["extracted_terms"] == '["refund_amount"]'
+    assert context.session.state["term_source"] == "glossary"
+
+    context = await make_context(extractor, question="How many stores opened?")
+    await run_agent(extractor, context)
+    assert context.session.state["extracted_terms"] == '["stores"]'
+    assert context.session.state["term_source"] == "llm"
@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from google.adk.agents import LlmAgent, LoopAgent, SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event, EventActions
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from agents.sql_agent.sql_generator_loop import DryRunValidator
+from agents.sql_agent.tracing import JsonLinesExporter, PipelineTracer, instrument
+
+
+class _StopAfter(DryRunValidator):
+    """Dry-runs like the validator, then leaves the loop on the second pass."""
+
+    async def _run_async_impl(self, ctx):
+        async for event in super()._run_async_impl(ctx):
+            yield event
+        passes = ctx.session.state.get("passes", 0) + 1
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            actions=EventActions(state_delta={"passes": passes}, escalate=passes == 2),
+        )
+
+
+@pytest.mark.asyncio
+async def test_tracer_records_spans_and_writes_summary(tmp_path, fake_toolset, make_context, run_agent):
+    toolset = fake_toolset({"execute_sql": {"statistics": {"totalBytesProcessed": "2048"}}})
+    root = SequentialAgent(name="sql_agent", sub_agents=[
+        LoopAgent(name="sql_loop", max_iterations=5, sub_agents=[
+            _StopAfter(name="sql_validator", toolset=toolset),
+        ]),
+    ])
+    path = tmp_path / "traces.jsonl"
+    instrument(root, PipelineTracer([JsonLinesExporter(str(path))]))
+    context = await make_context(root, state={"sql": "SELECT 1"})
+
+    await run_agent(root, context)
+
+    summary = context.session.state["timing_summary"]
+    assert set(summary["stages"]) == {"sql_loop"}
+    assert summary["tool_calls"] == 2
+    assert summary["bytes_processed"] == 4096
+    assert summary["loop_iterations"] == 2
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    tools = [span for span in spans if span["kind"] == "tool"]
+    assert [span["attributes"]["loop_iteration"] for span in tools] == [1, 2]
+    assert all(span["attributes"]["dry_run"] for span in tools)
+    by_id = {span["span_id"]: span for span in spans}
+    assert by_id[tools[0]["parent_id"]]["name"] == "sql_validator"
+    assert [span["name"] for span in spans if span["parent_id"] is None] == ["sql_agent"]
+
+
+@pytest.mark.asyncio
+async def test_llm_span_records_the_routed_model(tmp_path, make_context):
+    path = tmp_path / "traces.jsonl"
+    tracer = PipelineTracer([JsonLinesExporter(str(path))])
+    generator = LlmAgent(name="sql_generator", model="gemini-2.5-pro")
+    callback_context = CallbackContext(await make_context(generator))
+    request = LlmRequest(model="gemini-2.5-pro")
+
+    tracer.before_agent(callback_context)
+    tracer.before_model(callback_context, request)
+    request.model = "gemini-2.5-flash"  # As the model router, which runs after the tracer, does.
+    tracer.after_model(callback_context, LlmResponse())
+    tracer.after_agent(callback_context)
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["attributes"]["model"] for span in spans if span["kind"] == "llm"] == ["gemini-2.5-flash"]